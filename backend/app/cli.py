@@ -0,0 +1,242 @@
+"""
+Command line entry points for maintenance jobs.
+
+Usage (from the backend directory):
+    python -m app.cli ingest [--path DIR] [--force]
+    python -m app.cli backfill-stats
+    python -m app.cli ask-batch FILE [--url URL] [--concurrency N] [--no-persist] [--output OUT]
+    python -m app.cli warmup [--url URL] [--no-wait]
+    python -m app.cli export [--format ndjson|csv] [--gzip] [--output OUT] [--from DATE] [--to DATE]
+    python -m app.cli purge --days N [--no-archive] [--batch-size N] [--dry-run]
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from .database import SessionLocal, init_db
+
+
+def _cmd_init_db(args: argparse.Namespace) -> int:
+    # main() has already run init_db(); this command exists for deploy scripts
+    print("Database schema is up to date")
+    return 0
+
+
+def _cmd_build_index(args: argparse.Namespace) -> int:
+    from . import config
+    from .services import retrieval
+
+    if not config.SHARED_INDEX_ENABLED:
+        print("SHARED_INDEX_ENABLED is off; workers build their own index in memory", file=sys.stderr)
+        return 1
+    db = SessionLocal()
+    try:
+        chunks = retrieval.load_document_chunks(db)
+    finally:
+        db.close()
+    print(json.dumps({"path": retrieval.section_index.file, "version": retrieval.knowledge_version(),
+                      "document_chunks": chunks, "bytes": retrieval.section_index.size()}, indent=2))
+    return 0
+
+
+def _cmd_ingest(args: argparse.Namespace) -> int:
+    from .services.ingestion import ingest_directory
+
+    db = SessionLocal()
+    try:
+        report = ingest_directory(db, root=args.path, force=args.force)
+    finally:
+        db.close()
+    print(json.dumps(report, indent=2))
+    return 1 if report["failed"] else 0
+
+
+def _cmd_backfill_stats(args: argparse.Namespace) -> int:
+    from .services.analytics import backfill
+
+    db = SessionLocal()
+    try:
+        report = backfill(db, hours_per_batch=args.hours_per_batch)
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def _read_batch_items(path: str, language: str) -> list[dict]:
+    """One question per line; lines starting with "{" are {"question", "language", "id"} objects."""
+    items = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            items.append(json.loads(line) if line.startswith("{") else {"question": line, "language": language})
+    return items
+
+
+def _admin_headers(token: str | None) -> dict:
+    """Bearer header for the admin API: --token, or one signed with this host's ADMIN_SECRET_KEY."""
+    from .services import admin_auth
+
+    if token is None and admin_auth.enabled():
+        token = admin_auth.issue_token("cli", ttl=3600)
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+def _cmd_ask_batch(args: argparse.Namespace) -> int:
+    import httpx #type: ignore
+
+    items = _read_batch_items(args.file, args.language)
+    body = {"items": items, "concurrency": args.concurrency, "persist": not args.no_persist}
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    summary = {}
+    try:
+        with httpx.Client(timeout=None, headers=_admin_headers(args.token)) as client:
+            with client.stream("POST", args.url.rstrip("/") + "/ask/batch", json=body) as response:
+                if response.status_code != 200:
+                    response.read()
+                    print(f"Batch rejected ({response.status_code}): {response.text}", file=sys.stderr)
+                    return 1
+                for line in response.iter_lines():
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if "summary" in record:
+                        summary = record["summary"]
+                        continue
+                    out.write(line.rstrip("\n") + "\n")
+                    out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if summary.get("errors") or not summary else 0
+
+
+def _cmd_warmup(args: argparse.Namespace) -> int:
+    import httpx #type: ignore
+
+    base = args.url.rstrip("/")
+    with httpx.Client(timeout=30, headers=_admin_headers(args.token)) as client:
+        response = client.post(base + "/admin/warmup")
+        if response.status_code not in (200, 409):
+            print(f"Warm-up rejected ({response.status_code}): {response.text}", file=sys.stderr)
+            return 1
+        while not args.no_wait:
+            status = client.get(base + "/admin/warmup").json()["data"]
+            print(f"{status['state']}: {status['done'] + status['failed']}/{status['total']} ({status['failed']} failed)",
+                  file=sys.stderr)
+            if status["state"] != "running":
+                print(json.dumps(status, indent=2))
+                return 0 if status["state"] == "done" else 1
+            time.sleep(args.poll)
+    return 0
+
+
+def _parse_date(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date/datetime: {value!r}")
+
+
+def _cmd_export(args: argparse.Namespace) -> int:
+    from .services.export import export_stream
+
+    chunks = export_stream(args.format, compress=args.gzip, date_from=args.date_from, date_to=args.date_to,
+                           language=args.language, feedback=args.feedback, after_id=args.after_id)
+    if args.output:
+        with open(args.output, "wb") as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+    else:
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
+    return 0
+
+
+def _cmd_purge(args: argparse.Namespace) -> int:
+    from .services.retention import PurgeInProgress, purge_conversations
+
+    try:
+        report = purge_conversations(args.days, archive=not args.no_archive, batch_size=args.batch_size,
+                                     pause_ms=args.pause_ms, dry_run=args.dry_run)
+    except PurgeInProgress as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="SIH Bot maintenance commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    schema = sub.add_parser("init-db", help="Create missing tables, columns and indexes (run once per deploy)")
+    schema.set_defaults(func=_cmd_init_db)
+
+    index = sub.add_parser("build-index", help="Compile the shared knowledge index file (SHARED_INDEX_ENABLED)")
+    index.set_defaults(func=_cmd_build_index)
+
+    ingest = sub.add_parser("ingest", help="Chunk text/markdown/PDF files into the knowledge base")
+    ingest.add_argument("--path", help="Directory to ingest (default: INGEST_DIR, backend/data)")
+    ingest.add_argument("--force", action="store_true", help="Re-chunk files even if unchanged")
+    ingest.set_defaults(func=_cmd_ingest)
+
+    backfill = sub.add_parser("backfill-stats", help="Rebuild the analytics rollups from existing conversations")
+    backfill.add_argument("--hours-per-batch", type=int, default=24,
+                          help="Hourly buckets rebuilt per transaction (default 24)")
+    backfill.set_defaults(func=_cmd_backfill_stats)
+
+    batch = sub.add_parser("ask-batch", help="Answer a file of questions through a running server's /ask/batch")
+    batch.add_argument("file", help="Questions, one per line (or JSON objects with question/language/id)")
+    batch.add_argument("--url", default="http://127.0.0.1:8000", help="Server base URL")
+    batch.add_argument("--language", default="auto", help="Language for plain-text lines")
+    batch.add_argument("--concurrency", type=int, help="Questions in flight (default: ASK_BATCH_CONCURRENCY)")
+    batch.add_argument("--no-persist", action="store_true", help="Do not save conversations (keeps the batch out of analytics)")
+    batch.add_argument("--output", help="Write NDJSON results here instead of stdout")
+    batch.add_argument("--token", help="Admin bearer token (default: signed with ADMIN_SECRET_KEY)")
+    batch.set_defaults(func=_cmd_ask_batch, remote=True)
+
+    warm = sub.add_parser("warmup", help="Precompute FAQ and top-question answers on a running server")
+    warm.add_argument("--url", default="http://127.0.0.1:8000", help="Server base URL")
+    warm.add_argument("--poll", type=float, default=2.0, help="Seconds between progress checks")
+    warm.add_argument("--no-wait", action="store_true", help="Start the warm-up and return immediately")
+    warm.add_argument("--token", help="Admin bearer token (default: signed with ADMIN_SECRET_KEY)")
+    warm.set_defaults(func=_cmd_warmup, remote=True)
+
+    dump = sub.add_parser("export", help="Stream conversations as NDJSON or CSV (constant memory)")
+    dump.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    dump.add_argument("--gzip", action="store_true", help="Gzip the output")
+    dump.add_argument("--output", help="Write here instead of stdout")
+    dump.add_argument("--from", dest="date_from", type=_parse_date, help="Only conversations at or after this time (UTC)")
+    dump.add_argument("--to", dest="date_to", type=_parse_date, help="Only conversations before this time (UTC)")
+    dump.add_argument("--language", help="Only this detected language code")
+    dump.add_argument("--feedback", type=int, choices=(-1, 0, 1), help="Only this feedback value")
+    dump.add_argument("--after-id", type=int, default=0, help="Resume after this conversation id")
+    dump.set_defaults(func=_cmd_export)
+
+    purge = sub.add_parser("purge", help="Archive and delete conversations older than N days, in small batches")
+    purge.add_argument("--days", type=int, required=True)
+    purge.add_argument("--no-archive", action="store_true", help="Delete without writing an archive file")
+    purge.add_argument("--batch-size", type=int, help="Rows per delete transaction (default: RETENTION_BATCH_SIZE)")
+    purge.add_argument("--pause-ms", type=int, help="Pause between batches (default: RETENTION_PAUSE_MS)")
+    purge.add_argument("--dry-run", action="store_true", help="Only count the rows that would be purged")
+    purge.set_defaults(func=_cmd_purge)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    if not getattr(args, "remote", False):
+        init_db()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
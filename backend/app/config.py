@@ -0,0 +1,188 @@
+"""
+Runtime configuration read from the environment (and backend/.env)
+
+This is the only place .env files are loaded; every module reads settings
+after importing it.
+"""
+import os
+from dotenv import load_dotenv #type: ignore
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_BACKEND_DIR = os.path.abspath(os.path.join(_APP_DIR, '..'))
+# backend/.env first, then backend/app/.env; real environment variables always win
+for _candidate in (os.path.join(_BACKEND_DIR, '.env'), os.path.join(_APP_DIR, '.env')):
+    if os.path.exists(_candidate):
+        load_dotenv(dotenv_path=_candidate, override=False)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Admin API auth: /admin/* answers 503 until ADMIN_SECRET_KEY is set; POST /admin/login
+# exchanges ADMIN_USERNAME / ADMIN_PASSWORD for a bearer token valid ADMIN_TOKEN_TTL seconds
+ADMIN_SECRET_KEY = os.getenv("ADMIN_SECRET_KEY", "")
+ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
+ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "")
+ADMIN_TOKEN_TTL = _env_int("ADMIN_TOKEN_TTL", 86400)
+
+# Shared async HTTP connection pool (one per worker)
+HTTP_MAX_CONNECTIONS = _env_int("HTTP_MAX_CONNECTIONS", 200)
+HTTP_MAX_KEEPALIVE = _env_int("HTTP_MAX_KEEPALIVE", 50)
+HTTP_CONNECT_TIMEOUT = _env_float("HTTP_CONNECT_TIMEOUT", 5.0)
+
+# Groq (GROQ_BASE_URL can point at any OpenAI-compatible server, e.g. bench/fake_upstreams.py)
+GROQ_TIMEOUT = _env_float("GROQ_TIMEOUT", 10.0)
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+
+# LLM routing: providers in order of preference (groq, gemini, local), EWMA smoothing and circuit breaker
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "groq,gemini,local")
+GEMINI_TIMEOUT = _env_float("GEMINI_TIMEOUT", 10.0)
+GEMINI_MAX_CONCURRENCY = max(1, _env_int("GEMINI_MAX_CONCURRENCY", 8))  # threads for the blocking Gemini SDK
+ROUTER_EWMA_ALPHA = _env_float("ROUTER_EWMA_ALPHA", 0.2)
+ROUTER_BREAKER_FAILURES = _env_int("ROUTER_BREAKER_FAILURES", 3)
+ROUTER_BREAKER_COOLDOWN = _env_float("ROUTER_BREAKER_COOLDOWN", 30.0)
+
+# Translation
+TRANSLATE_DETECT_TIMEOUT = _env_float("TRANSLATE_DETECT_TIMEOUT", 5.0)
+TRANSLATE_TIMEOUT = _env_float("TRANSLATE_TIMEOUT", 8.0)
+# The async /ask path calls Google's unofficial, undocumented "gtx" web endpoint directly (the one
+# googletrans scrapes); it has no SLA or published quota. Only the sync helpers use googletrans itself
+TRANSLATE_BASE_URL = os.getenv("TRANSLATE_BASE_URL", "https://translate.googleapis.com/translate_a/single")
+# Answers are translated as sentence/list-item segments (grouped up to SEGMENT_CHARS),
+# POOL_SIZE at a time, each with its own timeout; a segment that fails stays in English
+TRANSLATE_POOL_SIZE = _env_int("TRANSLATE_POOL_SIZE", 4)
+TRANSLATE_SEGMENT_CHARS = _env_int("TRANSLATE_SEGMENT_CHARS", 400)
+TRANSLATE_SEGMENT_TIMEOUT = _env_float("TRANSLATE_SEGMENT_TIMEOUT", 4.0)
+
+# Section-level retrieval over COLLEGE_INFO for the system prompt
+RETRIEVAL_ENABLED = _env_bool("RETRIEVAL_ENABLED", True)
+RETRIEVAL_TOP_K = _env_int("RETRIEVAL_TOP_K", 3)
+RETRIEVAL_TOKEN_BUDGET = _env_int("RETRIEVAL_TOKEN_BUDGET", 900)
+RETRIEVAL_MIN_SCORE = _env_float("RETRIEVAL_MIN_SCORE", 1.0)
+
+# Multi-worker mode: the retrieval index is compiled to one file that every worker memory-maps;
+# builds are written next to SHARED_INDEX_PATH as versioned files named by a ".current" pointer
+# file, and workers check the pointer every SHARED_INDEX_REFRESH_INTERVAL seconds
+SHARED_INDEX_ENABLED = _env_bool("SHARED_INDEX_ENABLED", False)
+SHARED_INDEX_PATH = os.getenv("SHARED_INDEX_PATH", os.path.join(_BACKEND_DIR, "data", "knowledge_index.bin"))
+SHARED_INDEX_REFRESH_INTERVAL = _env_float("SHARED_INDEX_REFRESH_INTERVAL", 5.0)
+
+# Document ingestion (backend/data -> documents / document_chunks)
+INGEST_DIR = os.getenv("INGEST_DIR", os.path.join(_BACKEND_DIR, "data"))
+INGEST_CHUNK_SIZE = _env_int("INGEST_CHUNK_SIZE", 1200)
+INGEST_CHUNK_OVERLAP = _env_int("INGEST_CHUNK_OVERLAP", 200)
+INGEST_BATCH_SIZE = _env_int("INGEST_BATCH_SIZE", 500)
+
+# Answer cache in front of the LLM (in-process LRU + optional SQLite tier)
+ANSWER_CACHE_ENABLED = _env_bool("ANSWER_CACHE_ENABLED", True)
+ANSWER_CACHE_SIZE = _env_int("ANSWER_CACHE_SIZE", 2048)
+ANSWER_CACHE_TTL = _env_float("ANSWER_CACHE_TTL", 6 * 3600)
+ANSWER_CACHE_PERSIST = _env_bool("ANSWER_CACHE_PERSIST", False)
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", os.path.join(_BACKEND_DIR, "data", "cache.db"))
+ANSWER_CACHE_MAX_ROWS = _env_int("ANSWER_CACHE_MAX_ROWS", 50_000)
+
+# Translation memo (detect/translate results; timeout fallbacks are never stored)
+TRANSLATION_CACHE_ENABLED = _env_bool("TRANSLATION_CACHE_ENABLED", True)
+TRANSLATION_CACHE_SIZE = _env_int("TRANSLATION_CACHE_SIZE", 10_000)
+TRANSLATION_CACHE_TTL = _env_float("TRANSLATION_CACHE_TTL", 30 * 24 * 3600)
+TRANSLATION_CACHE_PERSIST = _env_bool("TRANSLATION_CACHE_PERSIST", True)
+TRANSLATION_CACHE_MAX_ROWS = _env_int("TRANSLATION_CACHE_MAX_ROWS", 200_000)
+TRANSLATION_CACHE_WARM = _env_int("TRANSLATION_CACHE_WARM", 5_000)
+
+# Identical concurrent Groq/translation calls share one upstream request
+COALESCE_ENABLED = _env_bool("COALESCE_ENABLED", True)
+
+# Admission control in front of Groq and Google Translate (off by default; set the limits of your
+# API tier before enabling): account-wide rate limits (0 = no limit; Groq tokens/minute is
+# GROQ_TPM_LIMIT), split evenly over SCHEDULER_WORKERS processes (default WEB_CONCURRENCY, the
+# uvicorn/gunicorn worker count), queue size and how long a call may wait for a slot
+SCHEDULER_ENABLED = _env_bool("SCHEDULER_ENABLED", False)
+SCHEDULER_WORKERS = max(1, _env_int("SCHEDULER_WORKERS", _env_int("WEB_CONCURRENCY", 1)))
+GROQ_RPM_LIMIT = _env_int("GROQ_RPM_LIMIT", 30)
+GROQ_QUEUE_SIZE = _env_int("GROQ_QUEUE_SIZE", 64)
+GROQ_QUEUE_TIMEOUT = _env_float("GROQ_QUEUE_TIMEOUT", 5.0)
+TRANSLATE_RPM_LIMIT = _env_int("TRANSLATE_RPM_LIMIT", 600)
+TRANSLATE_QUEUE_SIZE = _env_int("TRANSLATE_QUEUE_SIZE", 256)
+TRANSLATE_QUEUE_TIMEOUT = _env_float("TRANSLATE_QUEUE_TIMEOUT", 2.0)
+SCHEDULER_SESSION_QUEUE = _env_int("SCHEDULER_SESSION_QUEUE", 4)  # waiting calls per session
+SCHEDULER_BATCH_TIMEOUT = _env_float("SCHEDULER_BATCH_TIMEOUT", 60.0)  # /ask/batch and warm-up wait longer
+
+# /ask/batch: questions answered concurrently per batch, and batch size limit
+ASK_BATCH_CONCURRENCY = _env_int("ASK_BATCH_CONCURRENCY", 8)
+ASK_BATCH_MAX_CONCURRENCY = _env_int("ASK_BATCH_MAX_CONCURRENCY", 32)
+ASK_BATCH_MAX_ITEMS = _env_int("ASK_BATCH_MAX_ITEMS", 2000)
+
+# Startup warm-up: precompute answers for the FAQ and the most asked questions
+WARMUP_ENABLED = _env_bool("WARMUP_ENABLED", False)
+WARMUP_LANGUAGES = os.getenv("WARMUP_LANGUAGES", "en,hi")
+WARMUP_TOP_N = _env_int("WARMUP_TOP_N", 50)
+WARMUP_HISTORY_ROWS = _env_int("WARMUP_HISTORY_ROWS", 50_000)
+WARMUP_CONCURRENCY = _env_int("WARMUP_CONCURRENCY", 4)
+
+# Offline language detection; below this confidence the remote detector is used
+LOCAL_DETECT_ENABLED = _env_bool("LOCAL_DETECT_ENABLED", True)
+LOCAL_DETECT_MIN_CONFIDENCE = _env_float("LOCAL_DETECT_MIN_CONFIDENCE", 0.8)
+
+# Tier 0: local intent engine answers without an LLM call above this confidence
+TIER0_ENABLED = _env_bool("TIER0_ENABLED", True)
+TIER0_MIN_CONFIDENCE = _env_float("TIER0_MIN_CONFIDENCE", 0.85)
+
+# Admin overrides (hot announcements) answered before translation and the LLM
+OVERRIDES_ENABLED = _env_bool("OVERRIDES_ENABLED", True)
+OVERRIDE_REFRESH_INTERVAL = _env_float("OVERRIDE_REFRESH_INTERVAL", 10.0)
+
+# Workers create missing tables at startup; turn off when deploys run `python -m app.cli init-db` once instead
+DB_INIT_ON_STARTUP = _env_bool("DB_INIT_ON_STARTUP", True)
+
+# Write-behind conversation persistence: ids are reserved up front and rows
+# are inserted in batches by a background writer (also enables SQLite WAL)
+WRITE_BEHIND_ENABLED = _env_bool("WRITE_BEHIND_ENABLED", False)
+WRITE_BEHIND_BATCH_SIZE = _env_int("WRITE_BEHIND_BATCH_SIZE", 200)
+WRITE_BEHIND_FLUSH_MS = _env_int("WRITE_BEHIND_FLUSH_MS", 250)
+WRITE_BEHIND_ID_BLOCK = _env_int("WRITE_BEHIND_ID_BLOCK", 1000)
+
+# Hourly analytics rollups behind /admin/stats (counters are flushed in batches)
+ANALYTICS_ENABLED = _env_bool("ANALYTICS_ENABLED", True)
+ANALYTICS_FLUSH_INTERVAL = _env_float("ANALYTICS_FLUSH_INTERVAL", 5.0)
+
+# Per-session multi-turn memory (ring buffer of recent turns, LRU across sessions)
+SESSION_MEMORY_ENABLED = _env_bool("SESSION_MEMORY_ENABLED", True)
+SESSION_MEMORY_TURNS = _env_int("SESSION_MEMORY_TURNS", 6)
+SESSION_MEMORY_MAX_SESSIONS = _env_int("SESSION_MEMORY_MAX_SESSIONS", 10_000)
+SESSION_MEMORY_MAX_BYTES = _env_int("SESSION_MEMORY_MAX_BYTES", 32 * 1024 * 1024)
+SESSION_HISTORY_TOKEN_BUDGET = _env_int("SESSION_HISTORY_TOKEN_BUDGET", 400)
+
+# LLM token accounting (in-memory counters flushed to token_usage)
+USAGE_FLUSH_INTERVAL = _env_float("USAGE_FLUSH_INTERVAL", 30.0)
+GROQ_TPM_LIMIT = _env_int("GROQ_TPM_LIMIT", 6000)  # tokens/minute allowed for the key's model tier
+
+# Info-level logging of question/answer text on every request (off saves real time under load)
+LOG_PAYLOADS = _env_bool("LOG_PAYLOADS", True)
+
+# Conversation export (rows read per keyset page) and retention
+# (RETENTION_DAYS=0 keeps everything; purges archive to gzipped NDJSON first)
+EXPORT_BATCH_SIZE = _env_int("EXPORT_BATCH_SIZE", 1000)
+RETENTION_DAYS = _env_int("RETENTION_DAYS", 0)
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", os.path.join(_BACKEND_DIR, "data", "archive"))
+RETENTION_BATCH_SIZE = _env_int("RETENTION_BATCH_SIZE", 500)
+RETENTION_PAUSE_MS = _env_int("RETENTION_PAUSE_MS", 50)
+RETENTION_INTERVAL = _env_float("RETENTION_INTERVAL", 3600.0)
@@ -1,6 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker
 from .models.database import Base
+from . import config
 import os
 
 # Database URL - SQLite for development with absolute path
@@ -13,13 +14,40 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
 )
 
+if config.WRITE_BEHIND_ENABLED and DATABASE_URL.startswith("sqlite"):
+    # Batched writes pair with WAL: readers never block the writer, and
+    # synchronous=NORMAL fsyncs on checkpoints instead of every commit
+    @event.listens_for(engine, "connect")
+    def _sqlite_write_behind_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _add_missing_columns():
+    """create_all never alters existing tables; add new nullable columns and indexes to older databases."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}'))
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
 # Initialize database tables
 def init_db():
     """Initialize database tables. Called when needed."""
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
 
 # Dependency for getting DB session
 def get_db():
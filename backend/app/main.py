@@ -1,35 +1,154 @@
 from fastapi import FastAPI, Depends, HTTPException, Request #type: ignore
-from fastapi.responses import HTMLResponse #type: ignore
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse #type: ignore
 from fastapi.middleware.cors import CORSMiddleware #type: ignore
+from fastapi.concurrency import run_in_threadpool #type: ignore
+from fastapi.encoders import jsonable_encoder #type: ignore
 # from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel #type: ignore
 from sqlalchemy.orm import Session #type: ignore
-from .database import get_db, init_db
+from .database import SessionLocal, get_db, init_db
 from .models.database import Conversation
+from .services.gemini_service import gemini_service
 from .services.groq_service import groq_service
+from .services.llm_router import llm_router
 from .services.translation import translator_service
+from .services import admin_auth, http_client, leases, retention, retrieval, scheduler, transliterate
+from .services.answer_cache import answer_cache
+from .services.ultra_fast_chat_service import ultra_fast_chat_service
+from .services.overrides import override_matcher
+from .services.conversation_writer import conversation_writer
+from .services.analytics import rollups
+from .services.session_memory import is_follow_up, session_memory
+from .services.usage import usage_ledger
+from .services.warmup import precomputed_answers, warmup_runner
+from .services import metrics
+from .services.metrics import stage
+from . import config
+from .routes import admin
+from contextlib import asynccontextmanager
+import asyncio
+import time
 import uuid
+import json
+import re
 from datetime import datetime
-from dotenv import load_dotenv #type: ignore
-import os
+from sqlalchemy import text #type: ignore
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables from backend directory
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
-import os
-from dotenv import load_dotenv #type: ignore
+# Set once the lifespan startup has finished; /health/ready answers 503 until then
+_started = False
 
-# Load environment variables
-load_dotenv()
+def _load_document_index():
+    db = SessionLocal()
+    try:
+        if config.SHARED_INDEX_ENABLED:
+            # Map the index file other workers (or `app.cli build-index`) compiled
+            retrieval.attach_shared_index(db)
+        else:
+            retrieval.load_document_chunks(db)
+    finally:
+        db.close()
 
-app = FastAPI(title="SIH Bot API", version="0.1.0")
+def _refresh_overrides():
+    db = SessionLocal()
+    try:
+        override_matcher.refresh(db)
+    finally:
+        db.close()
 
-# Initialize database tables
-init_db()
+async def _periodic_flush(flush, interval: float):
+    """Write in-memory counters (analytics, token usage) in the background so /ask never touches their tables."""
+    while True:
+        await asyncio.sleep(interval)
+        await run_in_threadpool(flush)
+
+async def _shared_index_refresher():
+    """Pick up a knowledge index rebuilt by another worker or the CLI (atomic file swap)."""
+    while True:
+        await asyncio.sleep(config.SHARED_INDEX_REFRESH_INTERVAL)
+        try:
+            await run_in_threadpool(retrieval.refresh_shared_index)
+        except Exception as e:
+            logger.error(f"Shared knowledge index refresh failed: {e}")
+
+async def _override_refresher():
+    """Poll the override table's change signature so edits made by other workers show up."""
+    while True:
+        await asyncio.sleep(config.OVERRIDE_REFRESH_INTERVAL)
+        try:
+            await run_in_threadpool(_refresh_overrides)
+        except Exception as e:
+            logger.error(f"Admin override refresh failed: {e}")
+
+async def _retention_job():
+    """Archive and delete conversations older than RETENTION_DAYS, in small batches, every RETENTION_INTERVAL.
+
+    Every worker starts this loop, but only the one holding the "retention-schedule"
+    lease purges; it renews the lease each round, and another worker takes over
+    if it stops for two intervals.
+    """
+    while True:
+        try:
+            if await run_in_threadpool(leases.acquire, "retention-schedule", 2 * config.RETENTION_INTERVAL):
+                await run_in_threadpool(retention.purge_conversations, config.RETENTION_DAYS)
+        except retention.PurgeInProgress:
+            logger.info("Conversation retention skipped: a purge is already running")
+        except Exception as e:
+            logger.error(f"Conversation retention failed: {e}")
+        await asyncio.sleep(config.RETENTION_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """Everything slow or stateful happens here, not at import, so a new worker's import stays short."""
+    global _started
+    # Create/upgrade tables (the CLI does this itself for its commands)
+    if config.DB_INIT_ON_STARTUP:
+        await run_in_threadpool(init_db)
+    groq_service.start()
+    # Imports google-generativeai (slow) only when GEMINI_API_KEY is set
+    await run_in_threadpool(gemini_service.start)
+    # One keep-alive connection pool per worker, shared by Groq and translation calls
+    await http_client.startup()
+    # Make previously ingested documents searchable
+    await run_in_threadpool(_load_document_index)
+    await run_in_threadpool(translator_service.memo.warm)
+    if conversation_writer.enabled:
+        conversation_writer.start()
+    background = []
+    if config.SHARED_INDEX_ENABLED:
+        background.append(asyncio.create_task(_shared_index_refresher()))
+    if config.OVERRIDES_ENABLED:
+        await run_in_threadpool(_refresh_overrides)
+        background.append(asyncio.create_task(_override_refresher()))
+    if rollups.enabled:
+        background.append(asyncio.create_task(_periodic_flush(rollups.flush, config.ANALYTICS_FLUSH_INTERVAL)))
+    background.append(asyncio.create_task(_periodic_flush(usage_ledger.flush, config.USAGE_FLUSH_INTERVAL)))
+    if config.RETENTION_DAYS > 0:
+        background.append(asyncio.create_task(_retention_job()))
+    if warmup_runner.enabled:
+        # /health?ready=true answers 503 until this finishes
+        warmup_runner.start()
+    _started = True
+    try:
+        yield
+    finally:
+        _started = False
+        warmup_runner.cancel()
+        for task in background:
+            task.cancel()
+        await http_client.shutdown()
+        # Drain queued conversations before the process exits
+        await run_in_threadpool(conversation_writer.stop)
+        await run_in_threadpool(rollups.flush)
+        await run_in_threadpool(usage_ledger.flush)
+        answer_cache.close()
+        translator_service.memo.close()
+
+app = FastAPI(title="SIH Bot API", version="0.1.0", lifespan=lifespan)
 
 # Allow local dev frontends
 app.add_middleware(
@@ -40,6 +159,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.include_router(admin.auth_router)
+app.include_router(admin.router)
+
 # Serve uploaded files - disabled for now
 # app.mount("/files", StaticFiles(directory="data"), name="files")
 
@@ -49,6 +171,17 @@ class AskRequest(BaseModel):
     session_id: str | None = None
     language: str = "auto"
 
+class BatchItem(BaseModel):
+    question: str
+    language: str = "auto"
+    id: str | None = None  # echoed back; results arrive in completion order
+
+class BatchRequest(BaseModel):
+    items: list[BatchItem]
+    concurrency: int | None = None  # default ASK_BATCH_CONCURRENCY
+    persist: bool = True            # False: no Conversation rows, so the batch stays out of analytics
+    session_id: str | None = None   # one session for the whole batch; items never share history
+
 class AskResponse(BaseModel):
     answer: str
     confidence: float = 0.0
@@ -110,110 +243,576 @@ def root(_: Request):
         </html>
         """
 
-@app.get("/health")
-def health():
+@app.get("/health/live")
+def health_live():
+    """Liveness: the process is up and serving. Never touches the database or upstreams."""
     return {"status": "ok", "timestamp": datetime.utcnow()}
 
-@app.post("/ask", response_model=AskResponse)
-def ask(req: AskRequest, db: Session = Depends(get_db)):
-    # Generate session ID if not provided
-    session_id = req.session_id or str(uuid.uuid4())
-    
-    logger.info(f"Processing question: '{req.question}' | incoming language: '{req.language}'")
+def _ping_db() -> bool:
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        logger.error(f"Readiness check: database unreachable: {e}")
+        return False
+    finally:
+        db.close()
 
-    # 1. Detect user language
-    user_lang = req.language if req.language != "auto" else translator_service.detect_language(req.question)
-    logger.info(f"Language debug | incoming: '{req.language}' | detected: '{user_lang}'")
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: startup finished, the database answers and the warm-up is done. 503 otherwise."""
+    warm = warmup_runner.status()
+    checks = {
+        "started": _started,
+        "database": await run_in_threadpool(_ping_db),
+        "warmup": warm["ready"],
+        "llm": any(provider["available"] and not provider["fallback_only"] for provider in llm_router.stats().values()),
+    }
+    # An LLM-less worker still answers from the local engine and caches, so "llm" is informational
+    ready = checks["started"] and checks["database"] and checks["warmup"]
+    body = {"status": "ok" if ready else "starting", "timestamp": datetime.utcnow(), "ready": ready,
+            "checks": checks, "warmup": warm}
+    return JSONResponse(jsonable_encoder(body), status_code=200 if ready else 503)
 
-    # 2. If Hindi/Marwari, translate input to English, get Romanized Hindi from Groq, return as-is
-    if user_lang in ("hi", "mwr"):
-        question_en = translator_service.translate_to_english(req.question, source_lang=user_lang) if user_lang != "en" else req.question
-        try:
-            llm_response = groq_service.generate_response(question_en, response_language=user_lang)
-            answer_user_lang = llm_response["answer"]  # Already Romanized Hindi
-            result = {
-                "answer": answer_user_lang,
-                "confidence": llm_response.get("confidence", 0.8),
-                "language_detected": user_lang,
-                "source": "groq-ai"
-            }
-        except Exception as e:
-            import traceback
-            error_details = f"Error: {str(e)}\n\nTraceback:\n{traceback.format_exc()}"
-            result = {
-                "answer": error_details,
-                "confidence": 0.1,
-                "language_detected": user_lang,
-                "source": "error"
-            }
-    else:
-        # All other languages: translate input to English, get English from Groq, translate to user language
-        question_en = translator_service.translate_to_english(req.question, source_lang=user_lang) if user_lang != "en" else req.question
-        try:
-            llm_response = groq_service.generate_response(question_en, response_language="en")
-            answer_en = llm_response["answer"]
-            logger.info(f"Groq answer (EN): {answer_en}")
-            if user_lang != "en":
-                answer_user_lang = translator_service.translate_from_english(answer_en, target_lang=user_lang)
-                logger.info(f"Translated answer to user language: {answer_user_lang}")
-            else:
-                answer_user_lang = answer_en
-            result = {
-                "answer": answer_user_lang,
-                "confidence": llm_response.get("confidence", 0.8),
-                "language_detected": user_lang,
-                "source": "groq-ai"
-            }
-        except Exception as e:
-            import traceback
-            error_details = f"Error: {str(e)}\n\nTraceback:\n{traceback.format_exc()}"
-            result = {
-                "answer": error_details,
-                "confidence": 0.1,
-                "language_detected": user_lang,
-                "source": "error"
-            }
-
-    # Save conversation to database
+@app.get("/health")
+def health(ready: bool = False):
+    """Liveness, plus warm-up progress. With ?ready=true, answers 503 until the warm-up has finished.
+
+    Kept for existing probes; new deployments should use /health/live and /health/ready.
+    """
+    warm = warmup_runner.status()
+    body = {"status": "ok", "timestamp": datetime.utcnow(), "ready": warm["ready"], "warmup": warm}
+    if ready and not warm["ready"]:
+        return JSONResponse(jsonable_encoder(body), status_code=503)
+    return body
+
+def _runtime_gauges() -> list[str]:
+    """Cache, queue and token gauges, read at scrape time."""
+    tokens, requests = usage_ledger.tokens_per_minute()
+    answers = answer_cache.memory.stats()
+    translations = translator_service.memo.memory.stats()
+    return [
+        "# TYPE chatbot_cache_hits_total counter",
+        f'chatbot_cache_hits_total{{cache="answers"}} {answers["hits"]}',
+        f'chatbot_cache_hits_total{{cache="translations"}} {translations["hits"]}',
+        "# TYPE chatbot_cache_misses_total counter",
+        f'chatbot_cache_misses_total{{cache="answers"}} {answers["misses"]}',
+        f'chatbot_cache_misses_total{{cache="translations"}} {translations["misses"]}',
+        "# TYPE chatbot_write_behind_pending gauge",
+        f"chatbot_write_behind_pending {len(conversation_writer)}",
+        "# TYPE chatbot_llm_tokens_per_minute gauge",
+        f"chatbot_llm_tokens_per_minute {tokens}",
+        "# TYPE chatbot_llm_requests_per_minute gauge",
+        f"chatbot_llm_requests_per_minute {requests}",
+        "# TYPE chatbot_llm_circuit_open gauge",
+        *(f'chatbot_llm_circuit_open{{provider="{name}"}} {int(health["state"] != "closed")}'
+          for name, health in llm_router.stats().items()),
+        "# TYPE chatbot_scheduler_queued gauge",
+        f'chatbot_scheduler_queued{{upstream="groq"}} {groq_service.scheduler.stats()["queued"]}',
+        f'chatbot_scheduler_queued{{upstream="translate"}} {translator_service.scheduler.stats()["queued"]}',
+    ]
+
+metrics.registry.add_collector(_runtime_gauges)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text exposition of stage/request histograms and runtime counters."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+def _save_conversation(db: Session, session_id: str, question: str, result: dict) -> int:
+    """Persist one exchange and return its conversation id."""
+    if conversation_writer.enabled:
+        # Write-behind: the id is reserved now, the row is inserted with the next batch
+        # (the writer adds the row to the rollups once it is committed)
+        return conversation_writer.enqueue(session_id, question, result)
     conversation = Conversation(
         session_id=session_id,
-        user_message=req.question,
+        user_message=question,
         bot_response=result["answer"],
         language_detected=result["language_detected"],
-        confidence_score=result["confidence"]
+        confidence_score=result["confidence"],
+        source=result.get("source"),
+        question_en=result.get("question_en"),
+        llm_answer=result.get("llm_answer")
     )
     db.add(conversation)
+    db.flush()
+    committed_at = time.time()  # taken under SQLite's write lock, see analytics.backfill
     db.commit()
     db.refresh(conversation)  # Get the ID
+    rollups.record_conversation(result["language_detected"], result.get("source"), result["confidence"],
+                                conversation.timestamp, committed_at)
+    return conversation.id
+
+# Real LLM answers; local fallbacks and error messages are never cached
+_CACHEABLE_SOURCES = ("groq-ai", "gemini")
+
+def _llm_source(llm_response: dict) -> str:
+    # Groq fallbacks (HTTP errors, missing key) must not look like real answers to caches
+    return "groq-ai" if llm_response.get("source") == "groq-llama3" else llm_response.get("source", "groq-ai")
+
+def _llm_outcome(llm_response: dict) -> str:
+    if llm_response.get("source") == "error-fallback":
+        return "error"
+    if llm_response.get("source") == "ultra-fast-local":
+        return "fallback"  # no LLM available; the local engine's best effort
+    return "failover" if llm_response.get("failovers") else "ok"
+
+async def _generate_answer(question_en: str, user_lang: str, history: list[tuple[str, str]] | None = None,
+                           usage_source: str = "ask") -> dict:
+    """Ask the LLM about an English question and return the result dict in the user's language.
+
+    ``llm_answer`` holds the answer as the model wrote it, for the session history. Token
+    usage is recorded under usage_source and the user's language.
+    """
+    try:
+        if user_lang in ("hi", "mwr"):
+            # Hindi/Marwari: the LLM answers directly in Romanized Hindi; any Devanagari it slips in is romanized locally
+            with stage("llm", user_lang) as timer:
+                llm_response = await llm_router.generate(question_en, response_language=user_lang, history=history,
+                                                  usage_source=usage_source, usage_language=user_lang)
+                timer.outcome = _llm_outcome(llm_response)
+            answer_user_lang = transliterate.romanize(llm_response["answer"])
+        else:
+            # All other languages: English from the LLM, translated to the user language
+            with stage("llm", user_lang) as timer:
+                llm_response = await llm_router.generate(question_en, response_language="en", history=history,
+                                                  usage_source=usage_source, usage_language=user_lang)
+                timer.outcome = _llm_outcome(llm_response)
+            answer_en = llm_response["answer"]
+            if config.LOG_PAYLOADS:
+                logger.info(f"LLM answer (EN, {llm_response.get('provider')}): {answer_en}")
+            if user_lang != "en":
+                with stage("translate_out", user_lang):
+                    answer_user_lang = await translator_service.translate_from_english_async(answer_en, target_lang=user_lang)
+                if config.LOG_PAYLOADS:
+                    logger.info(f"Translated answer to user language: {answer_user_lang}")
+            else:
+                answer_user_lang = answer_en
+        return {
+            "answer": answer_user_lang,
+            "confidence": llm_response.get("confidence", 0.8),
+            "language_detected": user_lang,
+            "source": _llm_source(llm_response),
+            "llm_answer": llm_response["answer"]
+        }
+    except Exception as e:
+        import traceback
+        error_details = f"Error: {str(e)}\n\nTraceback:\n{traceback.format_exc()}"
+        return {
+            "answer": error_details,
+            "confidence": 0.1,
+            "language_detected": user_lang,
+            "source": "error"
+        }
+
+async def _answer_locally(question_en: str, user_lang: str) -> dict | None:
+    """Tier 0: greetings, identity questions and exact FAQs answered without an LLM call.
+
+    Returns None when the local intent engine is not confident enough.
+    """
+    if not config.TIER0_ENABLED:
+        return None
+    intent, confidence = ultra_fast_chat_service.classify(question_en)
+    if intent is None or confidence < config.TIER0_MIN_CONFIDENCE:
+        return None
+    hindi = user_lang in ("hi", "mwr")
+    answer = ultra_fast_chat_service.answer_for(intent, hindi=hindi, question=question_en)
+    has_native_answer = hindi and intent in ultra_fast_chat_service.hindi_responses
+    if user_lang != "en" and not has_native_answer:
+        answer = await translator_service.translate_from_english_async(answer, target_lang=user_lang)
+    logger.info(f"Tier-0 local answer | intent: {intent} | confidence: {confidence}")
+    return {
+        "answer": answer,
+        "confidence": confidence,
+        "language_detected": user_lang,
+        "source": "local-intent"
+    }
+
+def _rehydrate_session(session_id: str) -> list[tuple[str, str]]:
+    db = SessionLocal()
+    try:
+        return session_memory.rehydrate(db, session_id)
+    finally:
+        db.close()
+
+async def _session_history(req: AskRequest, session_id: str) -> list[tuple[str, str]]:
+    """Recent turns of this session within the history token budget.
 
+    Served from memory; the database is read at most once per session per worker.
+    """
+    if not session_memory.enabled:
+        return []
+    turns = session_memory.turns(session_id)
+    if turns is None:
+        if not req.session_id:
+            return []  # brand-new session
+        turns = await run_in_threadpool(_rehydrate_session, session_id)
+    return session_memory.trim(turns)
+
+def _remember(req: AskRequest, session_id: str, question_en: str, result: dict) -> None:
+    # Sessions not in memory yet are rehydrated from the database on their next LLM call instead
+    session_memory.append(session_id, question_en, result.get("llm_answer") or result["answer"], create=not req.session_id)
+
+def _match_override(req: AskRequest) -> dict | None:
+    if not config.OVERRIDES_ENABLED:
+        return None
+    return override_matcher.match(req.question, None if req.language == "auto" else req.language)
+
+def _ask_response(session_id: str, result: dict, conversation_id: int, started: float) -> AskResponse:
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, "ask", result["language_detected"], result.get("source", "unknown"))
     return AskResponse(
         answer=result["answer"],
         confidence=result["confidence"],
         language_detected=result["language_detected"],
         session_id=session_id,
-        conversation_id=conversation.id
+        conversation_id=conversation_id
     )
 
+async def _answer_question(req: AskRequest, session_id: str, use_session: bool = True, usage_source: str = "ask") -> dict:
+    """Run the /ask pipeline (override, detect, translate, tier 0, cache, LLM) and return the result dict.
+
+    With use_session=False the question is answered on its own: no history, nothing remembered.
+    usage_source labels the LLM tokens in the usage ledger (ask, ask-batch, warmup).
+    """
+    if config.LOG_PAYLOADS:
+        logger.info(f"Processing question: '{req.question}' | incoming language: '{req.language}'")
+
+    # 0. Admin overrides (announcements) win over everything and need no translation
+    result = _match_override(req)
+    if result is not None:
+        if use_session:
+            _remember(req, session_id, req.question, result)
+        return result
+
+    # Warmed-up FAQ/top questions: no detection, translation or LLM call
+    result = precomputed_answers.get(req.question, req.language)
+    if result is not None:
+        if use_session:
+            _remember(req, session_id, result.get("question_en") or req.question, result)
+        return result
+
+    # 1. Detect user language
+    if req.language != "auto":
+        user_lang = req.language
+    else:
+        with stage("detect") as timer:
+            user_lang = await translator_service.detect_language_async(req.question)
+            timer.language = user_lang
+    logger.info(f"Language debug | incoming: '{req.language}' | detected: '{user_lang}'")
+
+    # 2. Translate input to English
+    if user_lang != "en":
+        with stage("translate_in", user_lang):
+            question_en = await translator_service.translate_to_english_async(req.question, source_lang=user_lang)
+    else:
+        question_en = req.question
+
+    # 3. Tier 0 answers easy intents locally; repeated questions come from cache.
+    # Both skip Groq and the translate-back.
+    with stage("local", user_lang):
+        result = await _answer_locally(question_en, user_lang)
+    if result is None:
+        # Only follow-ups ("and for MBA?") are sent with the session history; their
+        # answers depend on it, so they are neither served from nor stored in the cache
+        history = await _session_history(req, session_id) if use_session and is_follow_up(question_en) else None
+        contextual = bool(history)
+        cached = None if contextual else await answer_cache.get_async(question_en, user_lang)
+        if cached is not None:
+            logger.info("Answer cache hit")
+            result = dict(cached, source="answer-cache")
+        else:
+            result = await _generate_answer(question_en, user_lang, history, usage_source)
+            if result["source"] in _CACHEABLE_SOURCES and not contextual:
+                answer_cache.set(question_en, user_lang, result)
+    if use_session:
+        _remember(req, session_id, question_en, result)
+    return dict(result, question_en=question_en)
+
+async def _warm_answer(question: str, language: str) -> dict:
+    scheduler.admit_as("warmup", max_wait=config.SCHEDULER_BATCH_TIMEOUT, per_session=config.WARMUP_CONCURRENCY)
+    return await _answer_question(AskRequest(question=question, language=language), "warmup", use_session=False,
+                                  usage_source="warmup")
+
+warmup_runner.set_answerer(_warm_answer)
+
+@app.post("/ask", response_model=AskResponse)
+async def ask(req: AskRequest, db: Session = Depends(get_db)):
+    started = time.perf_counter()
+    # Generate session ID if not provided
+    session_id = req.session_id or str(uuid.uuid4())
+    scheduler.admit_as(session_id)
+    result = await _answer_question(req, session_id)
+
+    # Save conversation to database (sync SQLAlchemy session, keep it off the event loop)
+    with stage("db", result["language_detected"]):
+        conversation_id = await run_in_threadpool(_save_conversation, db, session_id, req.question, result)
+
+    return _ask_response(session_id, result, conversation_id, started)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+def _split_complete_sentences(buffer: str) -> tuple[list[str], str]:
+    """Split off the sentences in buffer that are already complete; return (sentences, remainder)."""
+    parts = []
+    last = 0
+    for match in _SENTENCE_END.finditer(buffer):
+        parts.append(buffer[last:match.end()])
+        last = match.end()
+    return parts, buffer[last:]
+
+def _sse(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _persist_conversation(session_id: str, question: str, result: dict) -> int:
+    """Save with a dedicated session; request-scoped sessions are closed before a stream finishes."""
+    db = SessionLocal()
+    try:
+        return _save_conversation(db, session_id, question, result)
+    finally:
+        db.close()
+
+@app.post("/ask/stream")
+async def ask_stream(req: AskRequest):
+    """Server-sent events version of /ask.
+
+    Events: ``meta`` (session and language), unnamed ``data: {"delta": ...}`` chunks
+    as the answer is generated, then ``done`` with the saved ``conversation_id``.
+    """
+    started = time.perf_counter()
+    session_id = req.session_id or str(uuid.uuid4())
+    scheduler.admit_as(session_id)
+    # Overrides and warmed-up answers are complete already: send them as one delta
+    ready = _match_override(req)
+    if ready is None:
+        ready = precomputed_answers.get(req.question, req.language)
+    if ready is not None:
+        _remember(req, session_id, ready.get("question_en") or req.question, ready)
+
+        async def ready_events():
+            yield _sse({"session_id": session_id, "language_detected": ready["language_detected"]}, event="meta")
+            yield _sse({"delta": ready["answer"]})
+            conversation_id = await run_in_threadpool(_persist_conversation, session_id, req.question, ready)
+            yield _sse({"conversation_id": conversation_id, "confidence": ready["confidence"]}, event="done")
+        return StreamingResponse(
+            ready_events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    if req.language != "auto":
+        user_lang = req.language
+    else:
+        with stage("detect") as timer:
+            user_lang = await translator_service.detect_language_async(req.question)
+            timer.language = user_lang
+    if user_lang != "en":
+        with stage("translate_in", user_lang):
+            question_en = await translator_service.translate_to_english_async(req.question, source_lang=user_lang)
+    else:
+        question_en = req.question
+    # Hindi/Marwari answers come back from Groq already Romanized (stray Devanagari is romanized locally); everything else is generated in English
+    response_language = user_lang if user_lang in ("hi", "mwr") else "en"
+    needs_translation = response_language == "en" and user_lang != "en"
+    romanizer = transliterate.StreamRomanizer() if response_language != "en" else None
+
+    async def events():
+        yield _sse({"session_id": session_id, "language_detected": user_lang}, event="meta")
+        result = await _answer_locally(question_en, user_lang)
+        history = None
+        if result is None:
+            # As in /ask: history only for follow-ups, whose answers are never cached
+            history = await _session_history(req, session_id) if is_follow_up(question_en) else None
+            cached = None if history else await answer_cache.get_async(question_en, user_lang)
+            result = dict(cached, source="answer-cache") if cached is not None else None
+        if result is not None:
+            _remember(req, session_id, question_en, result)
+            yield _sse({"delta": result["answer"]})
+            conversation_id = await run_in_threadpool(_persist_conversation, session_id, req.question,
+                                                      dict(result, question_en=question_en))
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, "ask-stream", user_lang, result["source"])
+            yield _sse({"conversation_id": conversation_id, "confidence": result["confidence"]}, event="done")
+            return
+
+        contextual = bool(history)
+        answer_parts = []
+        llm_parts = []
+        pending = ""
+        confidence, source = 0.9, "groq-ai"
+        # Timed by hand: a with-block would span the generator's yields
+        stream_started = time.perf_counter()
+        outcome = "ok"
+        routed = llm_router.stream(question_en, response_language=response_language, history=history,
+                                   usage_source="ask-stream", usage_language=user_lang)
+        try:
+            async for delta in routed:
+                llm_parts.append(delta)
+                if not needs_translation:
+                    text = romanizer.feed(delta) if romanizer is not None else delta
+                    if text:
+                        answer_parts.append(text)
+                        yield _sse({"delta": text})
+                    continue
+                # Translate sentence by sentence so the first one still arrives early
+                sentences, pending = _split_complete_sentences(pending + delta)
+                for sentence in sentences:
+                    translated = await translator_service.translate_from_english_async(sentence.strip(), target_lang=user_lang)
+                    text = translated + (sentence[len(sentence.rstrip()):] or " ")
+                    answer_parts.append(text)
+                    yield _sse({"delta": text})
+            if romanizer is not None:
+                pending = romanizer.flush()
+            if pending.strip():
+                text = await translator_service.translate_from_english_async(pending.strip(), target_lang=user_lang) if needs_translation else pending
+                answer_parts.append(text)
+                yield _sse({"delta": text})
+            confidence, source = routed.confidence, _llm_source({"source": routed.source})
+            outcome = _llm_outcome({"source": routed.source, "failovers": routed.failovers})
+        except Exception as e:
+            logger.error(f"Streaming answer failed: {e}")
+            outcome = "timeout" if "Timeout" in type(e).__name__ else "error"
+            text = f"Error: {str(e)}"
+            answer_parts.append(text)
+            confidence, source = 0.1, "error"
+            yield _sse({"delta": text})
+
+        metrics.observe_stage("llm_stream", user_lang, outcome, time.perf_counter() - stream_started)
+
+        result = {
+            "answer": "".join(answer_parts).strip(),
+            "confidence": confidence,
+            "language_detected": user_lang,
+            "source": source,
+            "llm_answer": "".join(llm_parts).strip(),
+            "question_en": question_en
+        }
+        if source in _CACHEABLE_SOURCES and result["answer"] and not contextual:
+            answer_cache.set(question_en, user_lang, result)
+        _remember(req, session_id, question_en, result)
+        db_started = time.perf_counter()
+        conversation_id = await run_in_threadpool(_persist_conversation, session_id, req.question, result)
+        metrics.observe_stage("db", user_lang, "ok", time.perf_counter() - db_started)
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, "ask-stream", user_lang, source)
+        yield _sse({"conversation_id": conversation_id, "confidence": confidence}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _answer_batch_item(index: int, item: BatchItem, session_id: str, persist: bool) -> dict:
+    started = time.perf_counter()
+    req = AskRequest(question=item.question, language=item.language, session_id=session_id)
+    line = {"index": index, "id": item.id, "question": item.question}
+    try:
+        result = await _answer_question(req, session_id, use_session=False, usage_source="ask-batch")
+        conversation_id = None
+        if persist:
+            with stage("db", result["language_detected"]):
+                conversation_id = await run_in_threadpool(_persist_conversation, session_id, item.question, result)
+    except Exception as e:
+        logger.error(f"Batch item {index} failed: {e}")
+        return {**line, "error": str(e), "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, "ask-batch", result["language_detected"], result.get("source", "unknown"))
+    return {
+        **line,
+        "answer": result["answer"],
+        "language_detected": result["language_detected"],
+        "confidence": result["confidence"],
+        "source": result.get("source"),
+        "conversation_id": conversation_id,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+@app.post("/ask/batch", dependencies=[Depends(admin_auth.require_admin)])
+async def ask_batch(req: BatchRequest):
+    """Answer many questions at once, streaming one NDJSON line per item as it completes.
+
+    Items go through the same pipeline and caches as /ask, at most ``concurrency`` at a time.
+    The last line is ``{"summary": {...}}``. Needs an admin token: every item is a real
+    LLM call and, by default, a saved conversation.
+    """
+    if not req.items:
+        raise HTTPException(status_code=400, detail="No items to answer")
+    if len(req.items) > config.ASK_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {config.ASK_BATCH_MAX_ITEMS} items per batch")
+    concurrency = max(1, min(req.concurrency or config.ASK_BATCH_CONCURRENCY, config.ASK_BATCH_MAX_CONCURRENCY))
+    session_id = req.session_id or f"batch-{uuid.uuid4()}"
+    items = list(enumerate(req.items))
+
+    async def lines():
+        started = time.perf_counter()
+        done: asyncio.Queue = asyncio.Queue()
+        pending = iter(items)
+
+        async def worker():
+            # The whole batch is one session to the upstream schedulers, so it cannot crowd out /ask
+            scheduler.admit_as(session_id, max_wait=config.SCHEDULER_BATCH_TIMEOUT, per_session=concurrency)
+            for index, item in pending:
+                await done.put(await _answer_batch_item(index, item, session_id, req.persist))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(items)))]
+        errors = 0
+        try:
+            for _ in items:
+                line = await done.get()
+                errors += "error" in line
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+        finally:
+            # Client went away: stop answering the rest
+            for task in workers:
+                task.cancel()
+        summary = {
+            "items": len(items),
+            "errors": errors,
+            "concurrency": concurrency,
+            "persisted": req.persist,
+            "session_id": session_id,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        yield json.dumps({"summary": summary}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @app.post("/feedback")
 def submit_feedback(req: FeedbackRequest, db: Session = Depends(get_db)):
+    if conversation_writer.update_pending(req.conversation_id, feedback=req.feedback) is not None:
+        return {"success": True, "message": "Feedback recorded"}
     conversation = db.query(Conversation).filter(Conversation.id == req.conversation_id).first()
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
+    old_feedback = conversation.feedback
     conversation.feedback = req.feedback
+    db.flush()
+    committed_at = time.time()
     db.commit()
+    rollups.record_feedback(conversation.timestamp, conversation.language_detected, conversation.source,
+                            old_feedback, req.feedback, committed_at)
     
     return {"success": True, "message": "Feedback recorded"}
 
 @app.post("/forward-to-admin")
 def forward_to_admin(req: ForwardRequest, db: Session = Depends(get_db)):
+    fields = {"forwarded_to_admin": True}
+    if req.additional_context:
+        fields["admin_response"] = f"User context: {req.additional_context}"
+    if conversation_writer.update_pending(req.conversation_id, **fields) is not None:
+        return {"success": True, "message": "Question forwarded to admin team"}
     conversation = db.query(Conversation).filter(Conversation.id == req.conversation_id).first()
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    conversation.forwarded_to_admin = True
-    if req.additional_context:
-        conversation.admin_response = f"User context: {req.additional_context}"
+    already_forwarded = bool(conversation.forwarded_to_admin)
+    for field, value in fields.items():
+        setattr(conversation, field, value)
+    db.flush()
+    committed_at = time.time()
     db.commit()
+    rollups.record_forward(conversation.timestamp, conversation.language_detected, conversation.source,
+                           already_forwarded, committed_at)
     
     return {"success": True, "message": "Question forwarded to admin team"}
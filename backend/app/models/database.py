@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -7,6 +7,8 @@ Base = declarative_base()
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    # Session history lookups: last N turns of one session
+    __table_args__ = (Index("ix_conversations_session_timestamp", "session_id", "timestamp"),)
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String, index=True)
@@ -17,7 +19,65 @@ class Conversation(Base):
     feedback = Column(Integer, default=0)  # -1=thumbs down, 0=no feedback, 1=thumbs up
     forwarded_to_admin = Column(Boolean, default=False)
     admin_response = Column(Text, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    source = Column(String, nullable=True)  # which tier answered: groq-ai, answer-cache, local-intent, ...
+    # The turn as session memory keeps it (English question, answer as the LLM wrote it)
+    question_en = Column(Text, nullable=True)
+    llm_answer = Column(Text, nullable=True)
+
+class ConversationRollup(Base):
+    """Per-hour conversation counters by language and source, kept up to date for dashboards."""
+    __tablename__ = "conversation_rollups"
+    __table_args__ = (UniqueConstraint("bucket", "language_code", "source", name="uq_rollup_bucket"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket = Column(DateTime, index=True)  # start of the hour (UTC)
+    language_code = Column(String)
+    source = Column(String)
+    conversations = Column(Integer, default=0)
+    confidence_sum = Column(Float, default=0.0)
+    positive_feedback = Column(Integer, default=0)
+    negative_feedback = Column(Integer, default=0)
+    forwarded = Column(Integer, default=0)
+    rebuilt_at = Column(Float, nullable=True)  # epoch seconds analytics.backfill recounted this row; deltas up to then are in it
+
+class JobLease(Base):
+    """Who runs a background job across workers and processes, until when (see services/leases.py)."""
+    __tablename__ = "job_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)  # host:pid
+    expires_at = Column(Float, nullable=False)  # epoch seconds
+
+class RollupState(Base):
+    """Single row shared by the rollup flushers and analytics.backfill; both write it first to serialize."""
+    __tablename__ = "rollup_state"
+
+    id = Column(Integer, primary_key=True)
+    rebuilt_at = Column(Float, nullable=False, default=0.0)  # epoch seconds of the last backfill batch
+
+class TokenUsage(Base):
+    """Per-hour LLM token totals by model, response language and caller."""
+    __tablename__ = "token_usage"
+    __table_args__ = (UniqueConstraint("bucket", "model", "language_code", "source", name="uq_token_usage_bucket"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket = Column(DateTime, index=True)  # start of the hour (UTC)
+    model = Column(String)
+    language_code = Column(String)
+    source = Column(String)
+    requests = Column(Integer, default=0)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    total_tokens = Column(Integer, default=0)
+    rate_limited = Column(Integer, default=0)
+
+class IdSequence(Base):
+    """Next unreserved id per table, for handing out id blocks to write-behind workers."""
+    __tablename__ = "id_sequences"
+
+    name = Column(String, primary_key=True)
+    next_value = Column(Integer, nullable=False, default=1)
 
 class Document(Base):
     __tablename__ = "documents"
@@ -27,6 +87,7 @@ class Document(Base):
     title = Column(String)
     upload_date = Column(DateTime, default=datetime.utcnow)
     file_size = Column(Integer)
+    content_hash = Column(String, index=True, nullable=True)  # sha256 of the file, skips unchanged re-ingests
     chunk_count = Column(Integer, default=0)
     is_active = Column(Boolean, default=True)
     
@@ -52,4 +113,5 @@ class AdminOverride(Base):
     audio_file_path = Column(String, nullable=True)
     created_by = Column(String)
     created_date = Column(DateTime, default=datetime.utcnow)
+    updated_date = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True, nullable=True)
     is_active = Column(Boolean, default=True)
\ No newline at end of file
@@ -0,0 +1,236 @@
+"""
+Admin API: knowledge-base maintenance and override endpoints.
+
+Responses follow the admin panel format in docs/API.md:
+``{"success": true, "data": ...}``. Everything except POST /admin/login
+needs an ``Authorization: Bearer <token>`` header (services/admin_auth.py).
+"""
+import os
+import re
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException #type: ignore
+from fastapi.concurrency import run_in_threadpool #type: ignore
+from fastapi.responses import StreamingResponse #type: ignore
+from pydantic import BaseModel #type: ignore
+from sqlalchemy.orm import Session #type: ignore
+from .. import config
+from ..database import get_db
+from ..models.database import AdminOverride
+from ..services import admin_auth, analytics, export, ingestion, retention
+from ..services.overrides import compile_pattern, override_matcher
+from ..services.answer_cache import answer_cache
+from ..services.groq_service import groq_service
+from ..services.llm_router import llm_router
+from ..services.translation import translator_service
+from ..services.usage import ledger_summary, usage_ledger
+from ..services.warmup import warmup_runner
+
+# Login is the only public route; everything on `router` requires an admin token
+auth_router = APIRouter(prefix="/admin", tags=["admin"])
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(admin_auth.require_admin)])
+
+
+class LoginRequest(BaseModel):
+    username: str
+    password: str
+
+
+@auth_router.post("/login")
+def login(req: LoginRequest):
+    if not admin_auth.enabled() or not config.ADMIN_PASSWORD:
+        raise HTTPException(status_code=503, detail="Admin API is disabled; set ADMIN_SECRET_KEY and ADMIN_PASSWORD")
+    if not admin_auth.check_credentials(req.username, req.password):
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    return {"success": True, "data": {
+        "token": admin_auth.issue_token(req.username),
+        "expires_in": config.ADMIN_TOKEN_TTL,
+        "user": {"id": 1, "username": req.username, "role": "admin"},
+    }}
+
+
+class IngestRequest(BaseModel):
+    path: str | None = None  # a directory under INGEST_DIR; defaults to INGEST_DIR itself
+    force: bool = False      # re-chunk even when the content hash is unchanged
+
+
+def _ingest_root(path: str | None) -> str:
+    """Resolve a requested ingest path, refusing anything outside INGEST_DIR (symlinks included)."""
+    base = os.path.realpath(config.INGEST_DIR)
+    if not path:
+        return base
+    resolved = os.path.realpath(os.path.join(base, path))
+    if os.path.commonpath([base, resolved]) != base:
+        raise HTTPException(status_code=400, detail="path must be inside INGEST_DIR")
+    if not os.path.isdir(resolved):
+        raise HTTPException(status_code=404, detail="path is not a directory under INGEST_DIR")
+    return resolved
+
+
+@router.post("/ingest")
+async def ingest_documents(req: IngestRequest, db: Session = Depends(get_db)):
+    root = _ingest_root(req.path)
+    report = await run_in_threadpool(ingestion.ingest_directory, db, root, req.force)
+    return {"success": True, "data": report, "message": "Ingestion finished"}
+
+
+@router.get("/cache")
+def cache_stats():
+    """Hit/miss counters for sizing the answer and translation caches, and how many upstream calls were coalesced."""
+    return {"success": True, "data": {
+        "answers": answer_cache.stats(),
+        "translations": translator_service.memo.stats(),
+        "coalesced": {"groq": groq_service.inflight.stats(), "translate": translator_service.inflight.stats()},
+    }}
+
+
+class OverrideRequest(BaseModel):
+    question_pattern: str
+    override_response: str
+    language_code: str = "en"
+    audio_file_path: str | None = None
+    created_by: str = "admin"
+    is_active: bool = True
+
+
+def _override_dict(row: AdminOverride) -> dict:
+    return {
+        "id": row.id,
+        "question_pattern": row.question_pattern,
+        "override_response": row.override_response,
+        "language_code": row.language_code,
+        "audio_file_path": row.audio_file_path,
+        "created_date": row.created_date,
+        "updated_date": row.updated_date,
+        "is_active": row.is_active,
+    }
+
+
+def _validate_pattern(pattern: str) -> None:
+    if not pattern.strip():
+        raise HTTPException(status_code=400, detail="question_pattern must not be empty")
+    try:
+        compile_pattern(pattern.strip())
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid question_pattern: {e}")
+
+
+@router.get("/overrides")
+def list_overrides(active_only: bool = False, db: Session = Depends(get_db)):
+    query = db.query(AdminOverride)
+    if active_only:
+        query = query.filter(AdminOverride.is_active == True)  # noqa: E712
+    return {"success": True, "data": [_override_dict(row) for row in query.order_by(AdminOverride.id)]}
+
+
+@router.post("/overrides")
+def create_override(req: OverrideRequest, db: Session = Depends(get_db)):
+    _validate_pattern(req.question_pattern)
+    row = AdminOverride(**req.model_dump())
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+    # Serve it from this worker right away; other workers pick it up on their next refresh
+    override_matcher.refresh(db)
+    return {"success": True, "data": _override_dict(row), "message": "Override created"}
+
+
+@router.put("/overrides/{override_id}")
+def update_override(override_id: int, req: OverrideRequest, db: Session = Depends(get_db)):
+    row = db.query(AdminOverride).filter(AdminOverride.id == override_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Override not found")
+    _validate_pattern(req.question_pattern)
+    for field, value in req.model_dump(exclude={"created_by"}).items():
+        setattr(row, field, value)
+    db.commit()
+    db.refresh(row)
+    override_matcher.refresh(db)
+    return {"success": True, "data": _override_dict(row), "message": "Override updated"}
+
+
+@router.delete("/overrides/{override_id}")
+def deactivate_override(override_id: int, db: Session = Depends(get_db)):
+    row = db.query(AdminOverride).filter(AdminOverride.id == override_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Override not found")
+    row.is_active = False
+    db.commit()
+    override_matcher.refresh(db)
+    return {"success": True, "data": {"id": override_id}, "message": "Override deactivated"}
+
+
+@router.get("/overrides/stats")
+def override_stats():
+    return {"success": True, "data": override_matcher.stats()}
+
+
+@router.get("/stats")
+def dashboard_stats(hours: int = 24, language: str | None = None, source: str | None = None,
+                    db: Session = Depends(get_db)):
+    """Volume, feedback, forward rate and confidence from the hourly rollups (no conversation scans)."""
+    return {"success": True, "data": analytics.stats(db, hours=hours, language=language, source=source)}
+
+
+@router.get("/usage")
+def token_usage(hours: int = 24, db: Session = Depends(get_db)):
+    """Current tokens-per-minute, Groq rate-limit headroom and per-request token averages."""
+    return {"success": True, "data": {"live": usage_ledger.snapshot(), "ledger": ledger_summary(db, hours=hours)}}
+
+
+@router.get("/warmup")
+def warmup_status():
+    return {"success": True, "data": warmup_runner.status()}
+
+
+@router.post("/warmup")
+async def start_warmup():
+    """Re-run the warm-up in the background, e.g. after editing COLLEGE_INFO or ingesting documents."""
+    if not warmup_runner.start():
+        raise HTTPException(status_code=409, detail="Warm-up already running")
+    return {"success": True, "data": warmup_runner.status(), "message": "Warm-up started"}
+
+
+@router.get("/llm")
+def llm_providers():
+    """Per-provider EWMA latency/error rate and circuit-breaker state of the LLM router."""
+    return {"success": True, "data": llm_router.stats()}
+
+
+@router.get("/scheduler")
+def upstream_schedulers():
+    """Queue depth, remaining rate-limit budget and rejections of the Groq and translation schedulers."""
+    return {"success": True, "data": {"groq": groq_service.scheduler.stats(), "translate": translator_service.scheduler.stats()}}
+
+
+@router.get("/conversations/export")
+def export_conversations(format: str = "ndjson", date_from: datetime | None = None, date_to: datetime | None = None,
+                         language: str | None = None, feedback: int | None = None, gzip: bool = False,
+                         after_id: int = 0):
+    """Stream matching conversations as NDJSON or CSV (date_to exclusive), read in keyset pages of EXPORT_BATCH_SIZE."""
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(export.FORMATS)}")
+    body = export.export_stream(format, compress=gzip, date_from=date_from, date_to=date_to,
+                                language=language, feedback=feedback, after_id=after_id)
+    filename = f"conversations.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else ("application/x-ndjson" if format == "ndjson" else "text/csv")
+    # A plain (sync) generator: Starlette iterates it in the threadpool, one page at a time
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+class RetentionRequest(BaseModel):
+    days: int
+    archive: bool = True
+    dry_run: bool = False
+
+
+@router.post("/retention")
+async def purge_conversations(req: RetentionRequest):
+    """Archive and delete conversations older than ``days`` days, in small batches."""
+    if req.days <= 0:
+        raise HTTPException(status_code=400, detail="days must be positive")
+    try:
+        report = await run_in_threadpool(retention.purge_conversations, req.days, archive=req.archive, dry_run=req.dry_run)
+    except retention.PurgeInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"success": True, "data": report}
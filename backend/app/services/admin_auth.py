@@ -0,0 +1,64 @@
+"""
+Bearer-token authentication for the admin API.
+
+``POST /admin/login`` checks ADMIN_USERNAME / ADMIN_PASSWORD and returns an
+HS256 JWT signed with ADMIN_SECRET_KEY (see docs/API.md); every other
+/admin route depends on ``require_admin``. Tokens are issued and verified
+with PyJWT.
+
+The admin API is off until ADMIN_SECRET_KEY is set: its routes answer 503
+rather than run unauthenticated. The CLI, running on the same host with the
+same environment, signs its own short-lived token (``issue_token``).
+"""
+import hmac
+import time
+import jwt #type: ignore
+from fastapi import Header, HTTPException #type: ignore
+from .. import config
+
+_ALGORITHM = "HS256"
+
+
+def enabled() -> bool:
+    return bool(config.ADMIN_SECRET_KEY)
+
+
+def issue_token(username: str, ttl: int | None = None) -> str:
+    if not enabled():
+        raise RuntimeError("ADMIN_SECRET_KEY is not set")
+    now = int(time.time())
+    claims = {"sub": username, "role": "admin", "iat": now, "exp": now + (ttl or config.ADMIN_TOKEN_TTL)}
+    return jwt.encode(claims, config.ADMIN_SECRET_KEY, algorithm=_ALGORITHM)
+
+
+def verify_token(token: str) -> dict | None:
+    """The token's claims, or None if it is malformed, forged or expired."""
+    if not enabled() or not token:
+        return None
+    try:
+        claims = jwt.decode(token, config.ADMIN_SECRET_KEY, algorithms=[_ALGORITHM],
+                            options={"require": ["exp", "sub"]})
+    except jwt.InvalidTokenError:
+        return None
+    return claims if claims.get("role") == "admin" else None
+
+
+def check_credentials(username: str, password: str) -> bool:
+    if not config.ADMIN_PASSWORD:
+        return False
+    # Compare both fields in full so the response time does not reveal which one was wrong
+    user_ok = hmac.compare_digest(username.encode("utf-8"), config.ADMIN_USERNAME.encode("utf-8"))
+    password_ok = hmac.compare_digest(password.encode("utf-8"), config.ADMIN_PASSWORD.encode("utf-8"))
+    return user_ok and password_ok
+
+
+def require_admin(authorization: str | None = Header(default=None)) -> dict:
+    """FastAPI dependency: the caller's token claims, or 401/503."""
+    if not enabled():
+        raise HTTPException(status_code=503, detail="Admin API is disabled; set ADMIN_SECRET_KEY and ADMIN_PASSWORD")
+    scheme, _, token = (authorization or "").partition(" ")
+    claims = verify_token(token.strip()) if scheme.lower() == "bearer" else None
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Invalid or missing admin token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return claims
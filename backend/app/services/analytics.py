@@ -0,0 +1,251 @@
+"""
+Hourly conversation rollups for the admin dashboard.
+
+Every saved conversation, feedback change and forward adds a delta to an
+in-memory counter keyed by (hour, language, source). The counters are
+flushed to ``conversation_rollups`` every ANALYTICS_FLUSH_INTERVAL seconds
+in one short transaction, so the /ask path never waits on them and
+``/admin/stats`` reads a few hundred rollup rows instead of scanning
+``conversations``.
+
+``backfill`` rebuilds the table from ``conversations`` while the app keeps
+running, a few hours of buckets per committed transaction. Flushes and each
+rebuild batch serialize on the ``rollup_state`` row, and every delta carries
+the time its change was committed (taken while that write still held the
+database lock). A rebuilt row stores the moment its batch took the lock, so
+a flush drops exactly the deltas that batch already counted and keeps the
+rest.
+
+That ordering relies on SQLite's single writer: a write that took its
+committed_at before the batch took the lock has also committed before the
+batch's scan. Databases with concurrent writers give no such guarantee, so
+``backfill`` refuses to run on them.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, select, update #type: ignore
+from sqlalchemy.orm import Session #type: ignore
+from .. import config
+from ..database import engine
+from ..models.database import Conversation, ConversationRollup, RollupState
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("conversations", "confidence_sum", "positive_feedback", "negative_feedback", "forwarded")
+UNKNOWN = "unknown"
+
+
+def hour_bucket(ts: datetime | None) -> datetime:
+    return (ts or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+
+
+def _key(ts: datetime | None, language: str | None, source: str | None) -> tuple[datetime, str, str]:
+    return hour_bucket(ts), language or UNKNOWN, source or UNKNOWN
+
+
+def _feedback_deltas(old: int | None, new: int | None) -> dict:
+    return {
+        "positive_feedback": (new == 1) - (old == 1),
+        "negative_feedback": (new == -1) - (old == -1),
+    }
+
+
+def _lock_state(conn) -> None:
+    """Write the rollup_state row, taking the database write lock for the rest of the transaction."""
+    state = RollupState.__table__
+    if not conn.execute(update(state).where(state.c.id == 1).values(id=1)).rowcount:
+        conn.execute(insert(state).values(id=1, rebuilt_at=0.0))
+
+
+def _rebuilt_at(conn, keys) -> dict[tuple, float]:
+    """When backfill last recounted each of these rollup rows (rows it never rebuilt are left out)."""
+    table = ConversationRollup.__table__
+    rows = conn.execute(
+        select(table.c.bucket, table.c.language_code, table.c.source, table.c.rebuilt_at)
+        .where(table.c.bucket.in_({key[0] for key in keys}), table.c.rebuilt_at.is_not(None))
+    )
+    return {(bucket, language, source): rebuilt_at for bucket, language, source, rebuilt_at in rows}
+
+
+class RollupAggregator:
+    """Pending deltas as (committed_at, key, deltas); committed_at orders them against backfill."""
+
+    def __init__(self):
+        self.enabled = config.ANALYTICS_ENABLED
+        self._pending: list[tuple[float, tuple, dict]] = []
+        self._lock = threading.Lock()
+
+    def _add(self, key: tuple, committed_at: float | None, **deltas) -> None:
+        if not self.enabled:
+            return
+        deltas = {name: value for name, value in deltas.items() if value}
+        if deltas:
+            with self._lock:
+                self._pending.append((committed_at or time.time(), key, deltas))
+
+    def record_conversation(self, language: str | None, source: str | None, confidence: float | None,
+                            ts: datetime | None = None, committed_at: float | None = None) -> None:
+        self._add(_key(ts, language, source), committed_at, conversations=1, confidence_sum=confidence or 0.0)
+
+    def record_row(self, row: dict, committed_at: float | None = None) -> None:
+        """Count a newly inserted conversation row together with its feedback and forward state."""
+        self._add(_key(row["timestamp"], row["language_detected"], row["source"]), committed_at,
+                  conversations=1, confidence_sum=row["confidence_score"] or 0.0,
+                  forwarded=1 if row["forwarded_to_admin"] else 0, **_feedback_deltas(None, row["feedback"]))
+
+    def record_feedback(self, ts: datetime | None, language: str | None, source: str | None,
+                        old: int | None, new: int | None, committed_at: float | None = None) -> None:
+        self._add(_key(ts, language, source), committed_at, **_feedback_deltas(old, new))
+
+    def record_forward(self, ts: datetime | None, language: str | None, source: str | None,
+                       already_forwarded: bool, committed_at: float | None = None) -> None:
+        if not already_forwarded:
+            self._add(_key(ts, language, source), committed_at, forwarded=1)
+
+    def flush(self) -> int:
+        """Apply pending deltas to the rollup table in one transaction. Returns the number of buckets touched."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        try:
+            with engine.begin() as conn:
+                _lock_state(conn)
+                rebuilt_at = _rebuilt_at(conn, [key for _, key, _ in pending])
+                totals: dict[tuple, Counter] = {}
+                for committed_at, key, deltas in pending:
+                    # Changes committed before their row was rebuilt are already in its counts
+                    if committed_at > rebuilt_at.get(key, 0.0):
+                        totals.setdefault(key, Counter()).update(deltas)
+                apply_counter_deltas(ConversationRollup.__table__, ("bucket", "language_code", "source"),
+                                     COUNTERS, totals, conn)
+        except Exception as e:
+            logger.error(f"Analytics rollup flush failed, will retry: {e}")
+            with self._lock:
+                self._pending[:0] = pending
+            return 0
+        return len(totals)
+
+
+def apply_counter_deltas(table, key_columns: tuple[str, ...], counters: tuple[str, ...], pending: dict[tuple, Counter],
+                         conn=None) -> None:
+    """Add each key's deltas to its counter row (UPDATE, or INSERT if the row is new), in one transaction."""
+    if conn is None:
+        with engine.begin() as conn:
+            apply_counter_deltas(table, key_columns, counters, pending, conn)
+        return
+    for key, deltas in pending.items():
+        match = None
+        for column, value in zip(key_columns, key):
+            clause = table.c[column] == value
+            match = clause if match is None else match & clause
+        values = {name: table.c[name] + deltas[name] for name in deltas}
+        if not conn.execute(update(table).where(match).values(**values)).rowcount:
+            row = {name: deltas.get(name, 0) for name in counters}
+            conn.execute(insert(table).values(**dict(zip(key_columns, key)), **row))
+
+
+def _rebuild_hours(start: datetime, end: datetime) -> tuple[int, int]:
+    """Recount the rollup rows of buckets in [start, end) in one transaction; (conversations, rows)."""
+    table = ConversationRollup.__table__
+    with engine.begin() as conn:
+        _lock_state(conn)
+        rebuilt_at = time.time()
+        conn.execute(update(RollupState.__table__).where(RollupState.id == 1).values(rebuilt_at=rebuilt_at))
+        rows = conn.execute(
+            select(Conversation.timestamp, Conversation.language_detected, Conversation.source,
+                   Conversation.confidence_score, Conversation.feedback, Conversation.forwarded_to_admin)
+            .where(Conversation.timestamp >= start, Conversation.timestamp < end)
+        )
+        totals: dict[tuple, Counter] = {}
+        scanned = 0
+        for ts, language, source, confidence, feedback, forwarded in rows:
+            counter = totals.setdefault(_key(ts, language, source), Counter())
+            counter["conversations"] += 1
+            counter["confidence_sum"] += confidence or 0.0
+            counter.update(_feedback_deltas(None, feedback))
+            counter["forwarded"] += 1 if forwarded else 0
+            scanned += 1
+        conn.execute(delete(table).where(table.c.bucket >= start, table.c.bucket < end))
+        if totals:
+            conn.execute(insert(table), [
+                {"bucket": bucket, "language_code": language, "source": source, "rebuilt_at": rebuilt_at,
+                 **{name: counter.get(name, 0) for name in COUNTERS}}
+                for (bucket, language, source), counter in totals.items()
+            ])
+    return scanned, len(totals)
+
+
+def backfill(db: Session, hours_per_batch: int = 24) -> dict:
+    """Rebuild conversation_rollups from the conversations table (one-off, for existing data).
+
+    Works through the hours from the oldest conversation to now, ``hours_per_batch``
+    buckets per write transaction, so /ask inserts and rollup flushes only ever wait
+    for one batch. Rollups older than the oldest conversation (purged by retention)
+    are kept.
+    """
+    if engine.dialect.name != "sqlite":
+        raise RuntimeError(f"backfill relies on SQLite's single writer to order it against live writes; "
+                           f"not supported on {engine.dialect.name}")
+    oldest = db.query(func.min(Conversation.timestamp)).scalar()
+    db.rollback()  # end the read transaction; every batch opens its own
+    report = {"conversations": 0, "buckets": 0, "batches": 0}
+    if oldest is None:
+        return report
+    start, stop = hour_bucket(oldest), hour_bucket(None) + timedelta(hours=1)
+    step = timedelta(hours=max(1, hours_per_batch))
+    while start < stop:
+        scanned, buckets = _rebuild_hours(start, start + step)
+        report["conversations"] += scanned
+        report["buckets"] += buckets
+        report["batches"] += 1
+        start += step
+    return report
+
+
+def _summary(counter: Counter) -> dict:
+    conversations = counter["conversations"]
+    rated = counter["positive_feedback"] + counter["negative_feedback"]
+    return {
+        "conversations": conversations,
+        "avg_confidence": round(counter["confidence_sum"] / conversations, 4) if conversations else 0.0,
+        "positive_feedback": counter["positive_feedback"],
+        "negative_feedback": counter["negative_feedback"],
+        "positive_ratio": round(counter["positive_feedback"] / rated, 4) if rated else 0.0,
+        "forwarded": counter["forwarded"],
+        "forward_rate": round(counter["forwarded"] / conversations, 4) if conversations else 0.0,
+    }
+
+
+def stats(db: Session, hours: int = 24, language: str | None = None, source: str | None = None) -> dict:
+    """Dashboard numbers for the last `hours` hours, read from the rollups only."""
+    now = datetime.utcnow()
+    since = hour_bucket(now) - timedelta(hours=max(1, hours) - 1)
+    query = db.query(ConversationRollup).filter(ConversationRollup.bucket >= since)
+    if language:
+        query = query.filter(ConversationRollup.language_code == language)
+    if source:
+        query = query.filter(ConversationRollup.source == source)
+
+    totals, by_language, by_source, hourly = Counter(), {}, {}, {}
+    for row in query:
+        counts = {name: getattr(row, name) or 0 for name in COUNTERS}
+        totals.update(counts)
+        by_language.setdefault(row.language_code, Counter()).update(counts)
+        by_source.setdefault(row.source, Counter()).update(counts)
+        hourly[row.bucket] = hourly.get(row.bucket, 0) + counts["conversations"]
+
+    return {
+        "from": since,
+        "to": now,
+        "totals": _summary(totals),
+        "by_language": {key: _summary(counter) for key, counter in sorted(by_language.items())},
+        "by_source": {key: _summary(counter) for key, counter in sorted(by_source.items())},
+        "questions_per_hour": [{"hour": bucket, "conversations": n} for bucket, n in sorted(hourly.items())],
+    }
+
+
+rollups = RollupAggregator()
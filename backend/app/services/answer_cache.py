@@ -0,0 +1,89 @@
+"""
+Answer cache in front of the LLM.
+
+Keyed on the normalized English question, the language the answer is
+returned in, and the knowledge-text fingerprint, so editing COLLEGE_INFO or
+ingesting new documents invalidates stale answers without a flush. A hit
+skips the Groq call and the translate-back.
+"""
+import hashlib
+import logging
+import re
+from fastapi.concurrency import run_in_threadpool #type: ignore
+from .. import config
+from . import retrieval
+from .cache import LRUCache, SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form: 'Hostel fees?' == 'hostel  fees'."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+
+class AnswerCache:
+    def __init__(self):
+        self.enabled = config.ANSWER_CACHE_ENABLED
+        self.memory = LRUCache(config.ANSWER_CACHE_SIZE, ttl=config.ANSWER_CACHE_TTL)
+        self.persistent = None
+        if self.enabled and config.ANSWER_CACHE_PERSIST:
+            # Opened on first use; nothing touches the file at import
+            self.persistent = SQLiteCache(
+                config.CACHE_DB_PATH, "answer_cache",
+                ttl=config.ANSWER_CACHE_TTL, max_rows=config.ANSWER_CACHE_MAX_ROWS,
+            )
+
+    @staticmethod
+    def make_key(question_en: str, response_language: str) -> str:
+        raw = "\x1f".join((normalize_question(question_en), response_language, retrieval.knowledge_version()))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question_en: str, response_language: str) -> dict | None:
+        if not self.enabled:
+            return None
+        key = self.make_key(question_en, response_language)
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    async def get_async(self, question_en: str, response_language: str) -> dict | None:
+        """Like get, for the event loop: a memory hit returns directly, the SQLite read runs in the threadpool."""
+        if not self.enabled:
+            return None
+        key = self.make_key(question_en, response_language)
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = await run_in_threadpool(self.persistent.get, key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, question_en: str, response_language: str, value: dict) -> None:
+        if not self.enabled:
+            return
+        key = self.make_key(question_en, response_language)
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, value)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "knowledge_version": retrieval.knowledge_version(),
+            "memory": self.memory.stats(),
+            "persistent": self.persistent.stats() if self.persistent is not None else None,
+        }
+
+    def close(self) -> None:
+        if self.persistent is not None:
+            self.persistent.close()
+
+
+answer_cache = AnswerCache()
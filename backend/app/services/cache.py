@@ -0,0 +1,242 @@
+"""
+Small cache building blocks shared by the answer and translation caches.
+
+``LRUCache`` is an in-process, thread-safe LRU with a per-entry TTL.
+``SQLiteCache`` is an optional persistent tier (one table in a standalone
+SQLite file) so cached values survive restarts. It opens its file on first
+use, not at import, and writes (new entries and last-used touches) are
+queued and committed in batches by a background thread, so ``set`` never
+waits on disk. ``get`` still reads the file; async callers run it in the
+threadpool.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Bounded LRU with TTL and hit/miss counters. A ttl of 0 means entries never expire."""
+
+    def __init__(self, maxsize: int, ttl: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else 0.0
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SQLiteCache:
+    """Persistent key/value tier with TTL and a row cap, stored in its own SQLite file.
+
+    Kept separate from the application database so cache traffic never
+    contends with conversation writes. Values are stored as JSON.
+    """
+
+    def __init__(self, path: str, table: str, ttl: float = 0, max_rows: int = 100_000,
+                 flush_interval: float = 0.5):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._failed = False
+        # Queued until the writer commits them: key -> (json value, expires_at, last_used), key -> last_used
+        self._pending: dict[str, tuple[str, float, float]] = {}
+        self._touched: dict[str, float] = {}
+        self._stop = threading.Event()
+        self._writer: threading.Thread | None = None
+
+    def _connection(self) -> sqlite3.Connection | None:
+        """Open the file on first use (call with the lock held). None if it cannot be opened."""
+        if self._conn is None and not self._failed:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+                )
+                conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_last_used ON {self.table} (last_used)")
+                self._conn = conn
+            except sqlite3.Error as e:
+                self._failed = True
+                logger.error(f"Persistent cache {self.table} disabled: {e}")
+        return self._conn
+
+    def _start_writer(self) -> None:
+        if self._writer is None and not self._stop.is_set():
+            self._writer = threading.Thread(target=self._run_writer, name=f"{self.table}-writer", daemon=True)
+            self._writer.start()
+
+    def _run_writer(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                row = pending[:2]
+            else:
+                conn = self._connection()
+                row = conn.execute(f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)).fetchone() \
+                    if conn is not None else None
+            if row is None or (row[1] and row[1] < now):
+                self.misses += 1
+                return default
+            self.hits += 1
+            if pending is None:
+                self._touched[key] = now
+        self._start_writer()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        """Queue the entry; the writer thread commits it within flush_interval."""
+        if self._failed:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl else 0.0
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._pending[key] = (encoded, expires_at, now)
+            self._touched.pop(key, None)
+        self._start_writer()
+
+    def flush(self) -> None:
+        """Commit queued entries and touches in one transaction."""
+        with self._lock:
+            if not self._pending and not self._touched:
+                return
+            pending, self._pending = self._pending, {}
+            touched, self._touched = self._touched, {}
+            conn = self._connection()
+            if conn is None:
+                return
+            now = time.time()
+            try:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                    [(key, value, expires_at, last_used) for key, (value, expires_at, last_used) in pending.items()],
+                )
+                conn.executemany(f"UPDATE {self.table} SET last_used = ? WHERE key = ?",
+                                 [(last_used, key) for key, last_used in touched.items()])
+                before, self._writes = self._writes, self._writes + len(pending)
+                if before // 500 != self._writes // 500:
+                    self._prune(now)
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                conn.execute("ROLLBACK")
+                logger.error(f"Persistent cache {self.table}: dropped {len(pending)} writes: {e}")
+
+    def _prune(self, now: float) -> None:
+        """Drop expired rows, then least-recently-used rows beyond max_rows."""
+        self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at > 0 AND expires_at < ?", (now,))
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        )
+
+    def most_recent(self, limit: int) -> list[tuple[str, Any]]:
+        """Most recently used live entries, for warming an in-memory tier at startup."""
+        self.flush()
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return []
+            rows = conn.execute(
+                f"SELECT key, value FROM {self.table} WHERE expires_at = 0 OR expires_at > ? "
+                "ORDER BY last_used DESC LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def close(self) -> None:
+        """Stop the writer, commit what is queued and close the file."""
+        self._stop.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] if conn is not None else 0
+            queued = len(self._pending)
+        lookups = self.hits + self.misses
+        return {
+            "rows": rows,
+            "queued": queued,
+            "max_rows": self.max_rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,239 @@
+"""
+Write-behind persistence for Conversation rows.
+
+With WRITE_BEHIND_ENABLED, /ask no longer commits (and fsyncs) per request.
+The handler takes an id from a block reserved in the ``id_sequences`` table,
+so it can return ``conversation_id`` right away, and queues the row. A
+background thread inserts queued rows in one transaction every
+WRITE_BEHIND_BATCH_SIZE rows or WRITE_BEHIND_FLUSH_MS milliseconds, and the
+queue is drained on shutdown.
+
+Feedback and forwards for rows that are still queued (or being flushed) are
+applied to the queued row, so clients never see the delay. Rows and those
+late changes are added to the analytics rollups once they are committed.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import func, insert, select, update #type: ignore
+from sqlalchemy.exc import IntegrityError #type: ignore
+from .. import config
+from ..database import engine
+from ..models.database import Conversation, IdSequence
+from .analytics import rollups
+
+logger = logging.getLogger(__name__)
+
+_SEQUENCE = "conversations"
+
+
+class ConversationWriter:
+    def __init__(self, batch_size: int | None = None, flush_ms: int | None = None, id_block: int | None = None):
+        self.enabled = config.WRITE_BEHIND_ENABLED
+        self.batch_size = batch_size or config.WRITE_BEHIND_BATCH_SIZE
+        self.flush_interval = (flush_ms or config.WRITE_BEHIND_FLUSH_MS) / 1000
+        self.id_block = id_block or config.WRITE_BEHIND_ID_BLOCK
+        self._pending: OrderedDict[int, dict] = OrderedDict()
+        self._inflight: dict[int, dict] = {}
+        self._late_updates: dict[int, dict] = {}  # changes to in-flight rows, applied after their insert
+        self._cond = threading.Condition()
+        self._id_lock = threading.Lock()
+        self._next_id = 0
+        self._block_end = 0
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+
+    # -- ids -----------------------------------------------------------------
+
+    def _reserve_block(self) -> None:
+        """Claim the next id block. The UPDATE takes the database write lock, so blocks never overlap across workers."""
+        seq = IdSequence.__table__
+        for _ in range(2):
+            try:
+                with engine.begin() as conn:
+                    bumped = conn.execute(
+                        update(seq).where(seq.c.name == _SEQUENCE).values(next_value=seq.c.next_value + self.id_block)
+                    ).rowcount
+                    if not bumped:
+                        conn.execute(insert(seq).values(name=_SEQUENCE, next_value=1 + self.id_block))
+                    end = conn.execute(select(seq.c.next_value).where(seq.c.name == _SEQUENCE)).scalar_one()
+                    start = end - self.id_block
+                    # Rows inserted outside write-behind mode must not be reused
+                    floor = (conn.execute(select(func.max(Conversation.id))).scalar() or 0) + 1
+                    if start < floor:
+                        start, end = floor, floor + self.id_block
+                        conn.execute(update(seq).where(seq.c.name == _SEQUENCE).values(next_value=end))
+                self._next_id, self._block_end = start, end
+                return
+            except IntegrityError:
+                # Another worker created the sequence row first; bump it instead
+                continue
+        raise RuntimeError("Could not reserve a conversation id block")
+
+    def _allocate_id(self) -> int:
+        with self._id_lock:
+            if self._next_id >= self._block_end:
+                self._reserve_block()
+            conversation_id = self._next_id
+            self._next_id += 1
+            return conversation_id
+
+    # -- queue ---------------------------------------------------------------
+
+    def enqueue(self, session_id: str, question: str, result: dict) -> int:
+        """Queue one exchange for insertion and return its (already final) conversation id."""
+        conversation_id = self._allocate_id()
+        row = {
+            "id": conversation_id,
+            "session_id": session_id,
+            "user_message": question,
+            "bot_response": result["answer"],
+            "language_detected": result["language_detected"],
+            "confidence_score": result["confidence"],
+            "feedback": 0,
+            "forwarded_to_admin": False,
+            "admin_response": None,
+            "timestamp": datetime.utcnow(),
+            "source": result.get("source"),
+            "question_en": result.get("question_en"),
+            "llm_answer": result.get("llm_answer"),
+        }
+        with self._cond:
+            self._pending[conversation_id] = row
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return conversation_id
+
+    def update_pending(self, conversation_id: int, **fields) -> dict | None:
+        """Apply fields to a row that has not been committed yet.
+
+        Returns the row as it was before the change, or None if it is not queued.
+        """
+        with self._cond:
+            row = self._pending.get(conversation_id)
+            if row is not None:
+                previous = dict(row)
+                row.update(fields)
+                return previous
+            if conversation_id in self._inflight:
+                late = self._late_updates.setdefault(conversation_id, {})
+                previous = {**self._inflight[conversation_id], **late}
+                late.update(fields)
+                return previous
+        return None
+
+    def __len__(self) -> int:
+        return len(self._pending) + len(self._inflight)
+
+    # -- flushing ------------------------------------------------------------
+
+    def flush(self) -> int:
+        """Insert up to one batch of queued rows in a single transaction. Returns rows written."""
+        with self._cond:
+            if not self._pending:
+                return 0
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                conversation_id, row = self._pending.popitem(last=False)
+                self._inflight[conversation_id] = row
+                batch.append(dict(row))
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(Conversation), batch)
+                committed_at = time.time()  # taken under SQLite's write lock, see analytics.backfill
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Write-behind flush of {len(batch)} conversations failed, will retry: {e}")
+            with self._cond:
+                # Put the rows back in front, with any changes made meanwhile
+                requeued = OrderedDict()
+                for row in batch:
+                    merged = {**self._inflight.pop(row["id"]), **self._late_updates.pop(row["id"], {})}
+                    requeued[row["id"]] = merged
+                requeued.update(self._pending)
+                self._pending = requeued
+            return 0
+
+        for row in batch:
+            rollups.record_row(row, committed_at)
+        with self._cond:
+            late = {row["id"]: self._late_updates.pop(row["id"]) for row in batch if row["id"] in self._late_updates}
+            for row in batch:
+                self._inflight.pop(row["id"], None)
+            if late:
+                # Updates that raced the insert; rows are committed now, so plain UPDATEs work
+                with engine.begin() as conn:
+                    for conversation_id, fields in late.items():
+                        conn.execute(update(Conversation).where(Conversation.id == conversation_id).values(**fields))
+                    committed_at = time.time()
+                inserted = {row["id"]: row for row in batch}
+                for conversation_id, fields in late.items():
+                    row = inserted[conversation_id]
+                    if "feedback" in fields:
+                        rollups.record_feedback(row["timestamp"], row["language_detected"], row["source"],
+                                                row["feedback"], fields["feedback"], committed_at)
+                    if fields.get("forwarded_to_admin"):
+                        rollups.record_forward(row["timestamp"], row["language_detected"], row["source"],
+                                               row["forwarded_to_admin"], committed_at)
+        self.flushed += len(batch)
+        self.batches += 1
+        return len(batch)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            written = 0
+            try:
+                while True:
+                    written = self.flush()
+                    if written < self.batch_size:
+                        break
+            except Exception as e:
+                logger.error(f"Write-behind writer error: {e}")
+            if stopping and not self._pending:
+                return
+            if written == 0 and self._pending:
+                # Database unavailable; back off before retrying
+                time.sleep(self.flush_interval)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="conversation-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"Write-behind conversation writer started (batch={self.batch_size}, every {int(self.flush_interval * 1000)}ms)")
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Drain the queue and stop the background writer."""
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f"Write-behind writer did not drain in {timeout}s; {len(self)} conversations not saved")
+        else:
+            logger.info(f"Write-behind writer drained ({self.flushed} conversations written)")
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending": len(self),
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failures": self.failures,
+        }
+
+
+conversation_writer = ConversationWriter()
@@ -0,0 +1,119 @@
+"""
+Streaming export of the conversations table (NDJSON or CSV, optionally gzipped).
+
+Rows are read with keyset pagination on ``id`` (``WHERE id > last ORDER BY
+id LIMIT n``), one short read per page, and written out as they arrive, so
+memory stays constant however large the table is and no read transaction
+stays open between pages. Exports can resume from ``after_id``.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator
+from .. import config
+from ..database import SessionLocal
+from ..models.database import Conversation
+
+FORMATS = ("ndjson", "csv")
+
+# Column order of the CSV export (and key order of the NDJSON lines)
+COLUMNS = (
+    "id", "session_id", "timestamp", "language_detected", "user_message", "bot_response",
+    "confidence_score", "feedback", "forwarded_to_admin", "admin_response", "source",
+)
+_SELECTED = tuple(getattr(Conversation, name) for name in COLUMNS)
+
+
+def conversation_rows(date_from: datetime | None = None, date_to: datetime | None = None,
+                      language: str | None = None, feedback: int | None = None, after_id: int = 0,
+                      batch_size: int | None = None) -> Iterator[dict]:
+    """Yield conversations (as dicts, in id order) matching the filters, one page at a time.
+
+    date_to is exclusive. Each page opens and closes its own session.
+    """
+    batch_size = batch_size or config.EXPORT_BATCH_SIZE
+    last_id = after_id
+    while True:
+        db = SessionLocal()
+        try:
+            query = db.query(*_SELECTED).filter(Conversation.id > last_id)
+            if date_from is not None:
+                query = query.filter(Conversation.timestamp >= date_from)
+            if date_to is not None:
+                query = query.filter(Conversation.timestamp < date_to)
+            if language:
+                query = query.filter(Conversation.language_detected == language)
+            if feedback is not None:
+                query = query.filter(Conversation.feedback == feedback)
+            page = query.order_by(Conversation.id).limit(batch_size).all()
+        finally:
+            db.close()
+        for row in page:
+            yield dict(zip(COLUMNS, row))
+        if len(page) < batch_size:
+            return
+        last_id = page[-1][0]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def ndjson_lines(rows: Iterable[dict]) -> Iterator[bytes]:
+    for row in rows:
+        yield (json.dumps(row, ensure_ascii=False, default=_json_default) + "\n").encode("utf-8")
+
+
+def csv_lines(rows: Iterable[dict]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for row in rows:
+        writer.writerow(["" if row[name] is None else
+                         row[name].isoformat() if isinstance(row[name], datetime) else row[name]
+                         for name in COLUMNS])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], flush_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    """Gzip a byte stream on the fly, emitting compressed output about every flush_bytes of input."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip header and trailer
+    pending = 0
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_bytes:
+            out += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _batched(chunks: Iterable[bytes], size: int = 64 * 1024) -> Iterator[bytes]:
+    """Join small per-row chunks so the response is not written one row at a time."""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def export_stream(fmt: str = "ndjson", compress: bool = False, **filters) -> Iterator[bytes]:
+    """Encoded export of conversation_rows(**filters), ready to write or stream."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    rows = conversation_rows(**filters)
+    lines = ndjson_lines(rows) if fmt == "ndjson" else csv_lines(rows)
+    return gzip_chunks(lines) if compress else _batched(lines)
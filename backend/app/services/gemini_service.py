@@ -2,45 +2,49 @@
 Gemini AI service for generating intelligent responses (optional).
 This module is not required for core functionality. If configured, it will
 use the GEMINI_API_KEY from environment/.env. No keys are hardcoded.
+
+google-generativeai takes longer to import than the rest of the app together,
+so it is only imported by start() (from the app lifespan), and only when a
+key is set.
 """
 import os
 import logging
-from dotenv import load_dotenv
+from .. import config
 
 logger = logging.getLogger(__name__)
 
-try:
-    import google.generativeai as genai
-except Exception:
-    genai = None
-
 
 class GeminiService:
     def __init__(self):
-        # Load env from backend/.env if present
-        load_dotenv(override=False)
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key or genai is None:
-            self.model = None
-            if genai is None:
-                logger.warning("google-generativeai not installed. Skipping Gemini setup.")
-            else:
-                logger.warning("GEMINI_API_KEY not set. Gemini service disabled.")
-            return
-
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-1.5-flash")
+        self.model = None
         self.system_prompt = (
             "You are a helpful college chatbot assistant. Keep responses concise,"
             " friendly, and informative."
         )
 
-    def generate_response(self, question: str, context: str = "") -> dict:
+    def start(self) -> None:
+        """Set up the model; blocking (slow import), so call it in a thread."""
+        if self.model is not None:
+            return
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            logger.warning("GEMINI_API_KEY not set. Gemini service disabled.")
+            return
+        try:
+            import google.generativeai as genai
+        except Exception:
+            logger.warning("google-generativeai not installed. Skipping Gemini setup.")
+            return
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel("gemini-1.5-flash")
+
+    def generate_response(self, question: str, context: str = "", system_prompt: str | None = None) -> dict:
         if not self.model:
             raise Exception("Gemini model not initialized")
 
-        full_prompt = f"{self.system_prompt}\n\nContext: {context}\n\nStudent Question: {question}\n\nResponse:"
-        response = self.model.generate_content(full_prompt)
+        full_prompt = f"{system_prompt or self.system_prompt}\n\nContext: {context}\n\nStudent Question: {question}\n\nResponse:"
+        # The SDK call blocks its thread; bound it so a hung request cannot hold the thread forever
+        response = self.model.generate_content(full_prompt, request_options={"timeout": config.GEMINI_TIMEOUT})
         if getattr(response, "text", None):
             return {"answer": response.text.strip(), "confidence": 0.9, "source": "gemini"}
         raise Exception("Empty response from Gemini")
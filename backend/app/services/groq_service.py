@@ -2,24 +2,21 @@
 """
 Groq AI service for generating intelligent multilingual responses
 """
-
-# Ensure .env is loaded before anything else
-from dotenv import load_dotenv
 import os
 import sys
 from getpass import getpass
-# Try loading env from both backend/.env and backend/app/.env
-_APP_DIR = os.path.dirname(__file__)
-_BACKEND_DIR = os.path.abspath(os.path.join(_APP_DIR, '..'))
-_BACKEND_ENV = os.path.join(_BACKEND_DIR, '.env')
-_APP_ENV = os.path.join(_APP_DIR, '.env')
-for _candidate in (_BACKEND_ENV, _APP_ENV):
-    if os.path.exists(_candidate):
-        load_dotenv(dotenv_path=_candidate, override=False)
-
-import requests
+import hashlib
+import json
 import logging
-from ..data.college_data import COLLEGE_INFO
+from typing import AsyncIterator
+from .. import config
+from . import http_client
+from . import retrieval
+from .answer_cache import normalize_question
+from .retrieval import estimate_tokens, get_college_context
+from .scheduler import SchedulerRejected, UpstreamScheduler
+from .singleflight import SingleFlight
+from .usage import usage_ledger
 
 logger = logging.getLogger(__name__)
 
@@ -58,23 +55,58 @@ def get_groq_api_key() -> str:
         "(Colab users: ensure the notebook writes the key to .env before starting the backend.)"
     )
 
+def _header_number(headers, name: str) -> float | None:
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+class GroqStreamError(Exception):
+    """Raised by stream_response_async when Groq rejects the request; carries the fallback answer dict."""
+
+    def __init__(self, fallback: dict):
+        super().__init__(fallback["answer"])
+        self.fallback = fallback
+
 class GroqService:
     def __init__(self):
-        # Resolve API key (env/.env first; interactive prompt only when safe)
-        self.api_key = get_groq_api_key()
-        self.base_url = "https://api.groq.com/openai/v1/chat/completions"
-        self.model = "llama-3.1-8b-instant"  # Fast Llama 3.1 8B model
-        self.headers = {
+        # Environment/.env only: importing this module must never prompt or fail.
+        # start() (from the app lifespan) falls back to asking on a TTY.
+        self.api_key = os.getenv("GROQ_API_KEY")
+        self.base_url = config.GROQ_BASE_URL
+        self.model = config.GROQ_MODEL  # Fast Llama 3.1 8B model by default
+        self.inflight = SingleFlight("groq")
+        self.scheduler = UpstreamScheduler(
+            "groq", config.GROQ_RPM_LIMIT, config.GROQ_TPM_LIMIT,
+            max_queue=config.GROQ_QUEUE_SIZE, max_wait=config.GROQ_QUEUE_TIMEOUT,
+            per_session=config.SCHEDULER_SESSION_QUEUE, enabled=config.SCHEDULER_ENABLED,
+            workers=config.SCHEDULER_WORKERS,
+        )
+
+    @property
+    def headers(self) -> dict:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
 
-    def get_system_prompt(self, response_language: str) -> str:
+    def start(self) -> None:
+        """Resolve the API key at startup; without one Groq stays unavailable and the router skips it."""
+        if self.api_key:
+            return
+        try:
+            self.api_key = get_groq_api_key()
+        except ValueError as e:
+            logger.warning(str(e))
+
+    def get_system_prompt(self, response_language: str, question: str | None = None) -> str:
+        # Only the sections relevant to the question (full sheet when nothing matches)
+        college_info = get_college_context(question)
         if response_language in ("hi", "mwr"):
             return f"""You are a helpful college chatbot assistant for State Institute of Technology. Always answer in Romanized Hindi (use English letters, not Devanagari script), even if the user asks in Marwari or Hindi. Do not use Hindi script. Do not use English except for names or technical terms.
 
 COLLEGE INFORMATION:
-{COLLEGE_INFO}
+{college_info}
 
 Instructions:
 - Answer questions about college admissions, fees, hostel facilities, exam schedules, and campus information
@@ -87,7 +119,7 @@ Instructions:
             return f"""You are a helpful college chatbot assistant for State Institute of Technology. Always answer in clear, simple English, regardless of the user's language. Keep your answers as short, direct, and easy to translate as possible. Avoid long explanations, repetition, or unnecessary details.
 
 COLLEGE INFORMATION:
-{COLLEGE_INFO}
+{college_info}
 
 Instructions:
 - Answer questions about college admissions, fees, hostel facilities, exam schedules, and campus information
@@ -97,52 +129,190 @@ Instructions:
 - Always be helpful and student-friendly
 """
     
-    def generate_response(self, question: str, response_language: str = "en", context: str = "") -> dict:
-        """Generate response using Groq AI, with dynamic system prompt for Romanized Hindi/Marwari or English."""
+    def _is_configured(self) -> bool:
+        return bool(self.api_key) and self.api_key != "YOUR_GROQ_API_KEY_HERE"
+
+    def _config_error(self) -> dict:
+        return {
+            "answer": "Groq API key is not configured. Please add your API key to the service.",
+            "confidence": 0.1,
+            "source": "config-error"
+        }
+
+    def _build_payload(self, question: str, response_language: str, stream: bool = False,
+                       history: list[tuple[str, str]] | None = None) -> dict:
+        # Follow-ups ("and for MBA?") need the previous question to find the right sections
+        context_query = " ".join([history[-1][0], question]) if history else question
+        system_prompt = self.get_system_prompt(response_language, context_query)
+        messages = [{"role": "system", "content": system_prompt}]
+        for past_question, past_answer in history or ():
+            messages.append({"role": "user", "content": past_question})
+            messages.append({"role": "assistant", "content": past_answer})
+        messages.append({"role": "user", "content": question})
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": 300,
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "stream": stream
+        }
+
+    def _parse_response(self, response, payload: dict) -> dict:
+        """Turn a Groq HTTP response (requests or httpx) into the service's answer dict."""
+        if response.status_code == 200:
+            data = response.json()
+            answer = data['choices'][0]['message']['content'].strip()
+            return {
+                "answer": answer,
+                "confidence": 0.9,
+                "source": "groq-llama3",
+                "usage": data.get("usage")
+            }
+        logger.error(f"Groq API error: {response.status_code}")
+        logger.error(f"Response body: {response.text}")
+        if config.LOG_PAYLOADS:
+            logger.error(f"Request payload: {payload}")
+        # Return a fallback response instead of crashing
+        return {
+            "answer": f"Sorry, I'm having trouble connecting to the AI service right now. API Error: {response.status_code}. Please try again later or contact support.",
+            "confidence": 0.1,
+            "source": "error-fallback",
+            "status_code": response.status_code
+        }
+
+    def _record_usage(self, response, language: str, usage_source: str, usage: dict | None) -> None:
+        """Add a call to the usage ledger under the language the user asked in."""
+        if response.status_code == 200:
+            usage_ledger.record(self.model, language, usage_source, usage, response.headers)
+        elif response.status_code == 429:
+            usage_ledger.record_rate_limited(self.model, language, usage_source, response.headers)
+
+    @staticmethod
+    def _estimate_tokens(payload: dict) -> int:
+        """Tokens a call may use against the TPM limit: the prompt plus the whole completion budget."""
+        return sum(estimate_tokens(message["content"]) for message in payload["messages"]) + payload["max_tokens"]
+
+    def _settle(self, response, estimated: int, usage: dict | None) -> None:
+        """Tell the scheduler what the call really cost and what Groq says is left; back off on 429."""
+        if response.status_code == 200:
+            self.scheduler.settle(estimated, (usage or {}).get("total_tokens"))
+        elif response.status_code == 429:
+            self.scheduler.pause(_header_number(response.headers, "retry-after") or 2.0)
+        self.scheduler.sync(_header_number(response.headers, "x-ratelimit-remaining-requests"),
+                            _header_number(response.headers, "x-ratelimit-remaining-tokens"))
+
+    def generate_response(self, question: str, response_language: str = "en", context: str = "",
+                          history: list[tuple[str, str]] | None = None, usage_source: str = "ask",
+                          usage_language: str | None = None) -> dict:
+        """Generate response using Groq AI, with dynamic system prompt for Romanized Hindi/Marwari or English.
+
+        usage_source and usage_language (the user's language, default response_language) key the usage ledger.
+        """
         try:
             # First check if API key is properly set
-            if not self.api_key or self.api_key == "YOUR_GROQ_API_KEY_HERE":
-                return {
-                    "answer": "Groq API key is not configured. Please add your API key to the service.",
-                    "confidence": 0.1,
-                    "source": "config-error"
-                }
-            system_prompt = self.get_system_prompt(response_language)
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": question}
-                ],
-                "max_tokens": 300,
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "stream": False
-            }
+            if not self._is_configured():
+                return self._config_error()
+            import requests  # only this sync path needs it
+            payload = self._build_payload(question, response_language, history=history)
             logger.info(f"Sending request to Groq API with model: {self.model} and response_language: {response_language}")
-            response = requests.post(self.base_url, json=payload, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                answer = data['choices'][0]['message']['content'].strip()
-                return {
-                    "answer": answer,
-                    "confidence": 0.9,
-                    "source": "groq-llama3"
-                }
-            else:
-                error_details = response.text
-                logger.error(f"Groq API error: {response.status_code}")
-                logger.error(f"Response body: {error_details}")
-                logger.error(f"Request payload: {payload}")
-                # Return a fallback response instead of crashing
-                return {
-                    "answer": f"Sorry, I'm having trouble connecting to the AI service right now. API Error: {response.status_code}. Please try again later or contact support.",
-                    "confidence": 0.1,
-                    "source": "error-fallback"
-                }
+            response = requests.post(self.base_url, json=payload, headers=self.headers, timeout=config.GROQ_TIMEOUT)
+            result = self._parse_response(response, payload)
+            self._record_usage(response, usage_language or response_language, usage_source, result.get("usage"))
+            return result
         except Exception as e:
             logger.error(f"Error calling Groq API: {e}")
             raise e
 
+    def _coalesce_key(self, question: str, response_language: str, history: list[tuple[str, str]] | None) -> str:
+        parts = [self.model, response_language, retrieval.knowledge_version(), normalize_question(question)]
+        for past_question, past_answer in history or ():
+            parts += [past_question, past_answer]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    async def generate_response_async(self, question: str, response_language: str = "en", context: str = "",
+                                      history: list[tuple[str, str]] | None = None, usage_source: str = "ask",
+                                      usage_language: str | None = None) -> dict:
+        """Async variant of generate_response over the shared keep-alive connection pool.
+
+        Identical concurrent calls (same normalized question, language and history) share one request.
+        """
+        key = self._coalesce_key(question, response_language, history)
+        result = await self.inflight.do(
+            key, lambda: self._generate_response_async(question, response_language, history, usage_source,
+                                                       usage_language or response_language))
+        return dict(result)
+
+    async def _generate_response_async(self, question: str, response_language: str,
+                                       history: list[tuple[str, str]] | None, usage_source: str,
+                                       usage_language: str) -> dict:
+        try:
+            if not self._is_configured():
+                return self._config_error()
+            payload = self._build_payload(question, response_language, history=history)
+            estimated = self._estimate_tokens(payload)
+            # Raises SchedulerRejected when the rate limits cannot fit this call in time
+            await self.scheduler.acquire(estimated)
+            logger.info(f"Sending async request to Groq API with model: {self.model} and response_language: {response_language}")
+            client = http_client.get_client()
+            response = await client.post(self.base_url, json=payload, headers=self.headers, timeout=config.GROQ_TIMEOUT)
+            result = self._parse_response(response, payload)
+            self._record_usage(response, usage_language, usage_source, result.get("usage"))
+            self._settle(response, estimated, result.get("usage"))
+            return result
+        except SchedulerRejected:
+            raise  # not an error: the router answers with another provider
+        except Exception as e:
+            logger.error(f"Error calling Groq API: {e}")
+            raise e
+
+    async def stream_response_async(self, question: str, response_language: str = "en",
+                                    history: list[tuple[str, str]] | None = None,
+                                    usage_source: str = "ask-stream",
+                                    usage_language: str | None = None) -> AsyncIterator[str]:
+        """Stream the answer as text deltas using Groq's server-sent events mode."""
+        usage_language = usage_language or response_language
+        if not self._is_configured():
+            raise GroqStreamError(self._config_error())
+        payload = self._build_payload(question, response_language, stream=True, history=history)
+        # Ask for a final usage chunk; Groq also reports it under x_groq
+        payload["stream_options"] = {"include_usage": True}
+        estimated = self._estimate_tokens(payload)
+        await self.scheduler.acquire(estimated)
+        logger.info(f"Streaming request to Groq API with model: {self.model} and response_language: {response_language}")
+        client = http_client.get_client()
+        async with client.stream("POST", self.base_url, json=payload, headers=self.headers, timeout=config.GROQ_TIMEOUT) as response:
+            if response.status_code != 200:
+                await response.aread()
+                self._record_usage(response, usage_language, usage_source, None)
+                self._settle(response, estimated, None)
+                raise GroqStreamError(self._parse_response(response, payload))
+            usage = None
+            streamed = []
+            try:
+                async for line in response.aiter_lines():
+                    line = line.strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage") or usage
+                    choices = chunk.get("choices") or []
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if delta:
+                        streamed.append(delta)
+                        yield delta
+            finally:
+                # Also when the client disconnects or the stream breaks: Groq has billed
+                # what it generated, so count it and release the rest of the reservation
+                if usage is None:
+                    prompt = estimated - payload["max_tokens"]
+                    completion = estimate_tokens("".join(streamed))
+                    usage = {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+                self._record_usage(response, usage_language, usage_source, usage)
+                self._settle(response, estimated, usage)
+
 # Global Groq service instance
 groq_service = GroqService()
\ No newline at end of file
@@ -0,0 +1,55 @@
+"""
+Shared async HTTP client with a keep-alive connection pool.
+
+One client is created per worker at startup and closed at shutdown, so every
+upstream call (Groq, Google Translate) reuses warm connections instead of
+paying a TCP/TLS handshake per request.
+"""
+import logging
+import httpx #type: ignore
+from .. import config
+
+logger = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    # (connect, read, write, pool) - the tuple form is accepted by every httpx release
+    timeout = httpx.Timeout((config.HTTP_CONNECT_TIMEOUT, config.GROQ_TIMEOUT, config.GROQ_TIMEOUT, config.GROQ_TIMEOUT))
+    # googletrans pins httpx 0.13 (PoolLimits); newer httpx renamed it to Limits
+    if hasattr(httpx, "Limits"):
+        limits = httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+        )
+        return httpx.AsyncClient(timeout=timeout, limits=limits)
+    limits = httpx.PoolLimits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive=config.HTTP_MAX_KEEPALIVE,
+    )
+    return httpx.AsyncClient(timeout=timeout, pool_limits=limits)
+
+
+async def startup() -> None:
+    """Create the shared client. Called from the app lifespan."""
+    global _client
+    if _client is None:
+        _client = _build_client()
+        logger.info("Async HTTP pool ready (max_connections=%s)", config.HTTP_MAX_CONNECTIONS)
+
+
+async def shutdown() -> None:
+    """Close the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily when used outside the app (scripts)."""
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
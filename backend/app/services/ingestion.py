@@ -0,0 +1,172 @@
+"""
+Incremental document ingestion into Document / DocumentChunk.
+
+Text, markdown and PDF files under INGEST_DIR are streamed into overlapping
+chunks and bulk-inserted. A sha256 of each file is stored on its Document row,
+so re-running over a large corpus only re-chunks files whose content changed.
+"""
+import hashlib
+import logging
+import os
+from datetime import datetime
+from typing import Iterable, Iterator
+from sqlalchemy import insert #type: ignore
+from sqlalchemy.orm import Session #type: ignore
+from .. import config
+from ..models.database import Document, DocumentChunk
+from . import retrieval
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = (".txt", ".md", ".markdown")
+PDF_EXTENSIONS = (".pdf",)
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS + PDF_EXTENSIONS
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def discover_files(root: str) -> list[str]:
+    """Supported files under root, as sorted absolute paths (symlinks leading outside root are skipped)."""
+    found = []
+    real_root = os.path.realpath(root)
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            if os.path.commonpath([real_root, os.path.realpath(path)]) != real_root:
+                logger.warning(f"Skipping {path}: links outside {root}")
+                continue
+            found.append(path)
+    return sorted(found)
+
+
+def _read_pieces(path: str) -> Iterator[str]:
+    """Yield the file's text piece by piece (lines or PDF pages) without loading it whole."""
+    if path.lower().endswith(PDF_EXTENSIONS):
+        # Imported here: only ingestion runs need it, not every worker start
+        try:
+            from pypdf import PdfReader #type: ignore
+        except Exception:
+            raise RuntimeError("pypdf is not installed; cannot ingest PDF files")
+        for page in PdfReader(path).pages:
+            yield (page.extract_text() or "") + "\n"
+        return
+    with open(path, "r", encoding="utf-8", errors="replace") as fh:
+        yield from fh
+
+
+def chunk_stream(pieces: Iterable[str], size: int, overlap: int) -> Iterator[str]:
+    """Cut a stream of text into ~size-character chunks that overlap by ~overlap characters.
+
+    Cuts prefer whitespace so words are not split; memory stays bounded by one chunk.
+    """
+    overlap = max(0, min(overlap, size // 4))
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        while len(buffer) >= size:
+            cut = buffer.rfind(" ", size // 2, size)
+            newline = buffer.rfind("\n", size // 2, size)
+            cut = max(cut, newline)
+            if cut <= 0:
+                cut = size
+            chunk = buffer[:cut].strip()
+            if chunk:
+                yield chunk
+            start = cut - overlap
+            if overlap:
+                # Start the overlap on a word boundary
+                space = buffer.find(" ", start, cut)
+                start = space + 1 if space != -1 else start
+            buffer = buffer[start:]
+    tail = buffer.strip()
+    if tail:
+        yield tail
+
+
+def _title_for(path: str) -> str:
+    """First markdown heading, or a readable version of the file name."""
+    if path.lower().endswith((".md", ".markdown")):
+        with open(path, "r", encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                if line.startswith("#"):
+                    return line.lstrip("#").strip()
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem.replace("_", " ").replace("-", " ").strip()
+
+
+def _ingest_file(db: Session, path: str, relpath: str, digest: str, document: Document | None) -> int:
+    """(Re)chunk one file into its Document row. Returns the number of chunks written."""
+    if document is None:
+        document = Document(filename=relpath)
+        db.add(document)
+    else:
+        db.query(DocumentChunk).filter(DocumentChunk.document_id == document.id).delete(synchronize_session=False)
+    document.title = _title_for(path)
+    document.file_size = os.path.getsize(path)
+    document.content_hash = digest
+    document.upload_date = datetime.utcnow()
+    document.is_active = True
+    db.flush()  # assigns document.id for new rows
+
+    count = 0
+    batch = []
+    for chunk in chunk_stream(_read_pieces(path), config.INGEST_CHUNK_SIZE, config.INGEST_CHUNK_OVERLAP):
+        batch.append({"document_id": document.id, "chunk_text": chunk, "chunk_index": count})
+        count += 1
+        if len(batch) >= config.INGEST_BATCH_SIZE:
+            db.execute(insert(DocumentChunk), batch)
+            batch = []
+    if batch:
+        db.execute(insert(DocumentChunk), batch)
+    document.chunk_count = count
+    db.commit()
+    return count
+
+
+def ingest_directory(db: Session, root: str | None = None, force: bool = False) -> dict:
+    """Ingest every supported file under root, skipping files whose content hash is unchanged.
+
+    Files that disappeared since the last run are marked inactive. The retrieval
+    index is rebuilt when anything changed. Returns a summary report.
+    """
+    root = os.path.abspath(root or config.INGEST_DIR)
+    report = {"root": root, "scanned": 0, "added": 0, "updated": 0, "unchanged": 0,
+              "deactivated": 0, "failed": [], "chunks_written": 0}
+    existing = {doc.filename: doc for doc in db.query(Document).all()}
+    seen = set()
+
+    for path in discover_files(root):
+        relpath = os.path.relpath(path, root).replace(os.sep, "/")
+        seen.add(relpath)
+        report["scanned"] += 1
+        document = existing.get(relpath)
+        try:
+            digest = file_sha256(path)
+            if not force and document is not None and document.is_active and document.content_hash == digest:
+                report["unchanged"] += 1
+                continue
+            report["chunks_written"] += _ingest_file(db, path, relpath, digest, document)
+            report["added" if document is None else "updated"] += 1
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Ingestion failed for {relpath}: {e}")
+            report["failed"].append({"file": relpath, "error": str(e)})
+
+    for filename, document in existing.items():
+        if filename not in seen and document.is_active:
+            document.is_active = False
+            report["deactivated"] += 1
+    db.commit()
+
+    if report["added"] or report["updated"] or report["deactivated"]:
+        retrieval.load_document_chunks(db)
+    logger.info("Ingestion finished: %s", {k: v for k, v in report.items() if k != "failed"})
+    return report
@@ -0,0 +1,295 @@
+"""
+On-disk, memory-mapped form of the retrieval index, shared by every worker.
+
+With SHARED_INDEX_ENABLED, the BM25 index over COLLEGE_INFO and the ingested
+chunks is compiled once into a single binary file that each worker maps
+read-only. The passages, term dictionary and postings live in the page
+cache once for the whole machine instead of as Python objects in every
+worker, so adding workers or documents does not grow each process.
+
+Layout (little-endian), offsets from the start of the file:
+
+    header     magic, format, k1, b, counts, knowledge version, sheet digest,
+               section offsets
+    norms      n x float64 BM25 length norm, one per passage
+    tokens     n x uint32 token estimate, one per passage
+    passages   n x (title offset, title length, text offset, text length)
+    terms      sorted by term bytes: (term offset, term length, idf,
+               first posting, posting count); looked up by binary search
+    postings   (passage, term frequency) uint32 pairs, grouped by term
+    blob       UTF-8 text of the titles, passages, terms and the full sheet
+
+The norms, token and postings arrays are read in place through memoryview
+casts, which use the host byte order; the file is therefore only portable
+between little-endian machines (x86-64, ARM64).
+
+Every build goes to a new file, ``<root>.<version>.<stamp><ext>`` next to
+SHARED_INDEX_PATH, and a small pointer file ``<root>.current`` names the one
+in use. A file that a worker has mapped is therefore never renamed over or
+truncated, which Windows would refuse. Only the pointer is replaced, and
+readers hold it open just long enough to read one line. Workers re-read the pointer
+(``MappedSectionIndex.is_stale``) and map the new file, then ``close`` the
+old mapping once no request is reading it. Superseded files are deleted once
+nothing maps them; on Windows a file still mapped by some worker is left for
+the next build to remove.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from .retrieval import IndexClosed, Retriever, SectionIndex, tokenize
+
+MAGIC = b"NCKX"
+FORMAT = 1
+
+_HEADER = struct.Struct("<4sIddIII16s16sQQQQQQQQ4x")  # padded to a multiple of 8
+_PASSAGE = struct.Struct("<QIQI")
+_TERM = struct.Struct("<QIdII")
+_POSTING = struct.Struct("<II")
+
+if sys.byteorder != "little":
+    raise ImportError("the shared knowledge index needs a little-endian host")
+
+
+def sheet_digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()[:16]
+
+
+def _pointer_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".current"
+
+
+def current_file(path: str) -> str:
+    """The index file the pointer for ``path`` names; FileNotFoundError if none was published."""
+    with open(_pointer_path(path), encoding="utf-8") as fh:
+        name = fh.read().strip()
+    if not name:
+        raise FileNotFoundError(f"{_pointer_path(path)} is empty")
+    return os.path.join(os.path.dirname(os.path.abspath(path)), name)
+
+
+def _write_file(directory: str, target: str, parts) -> None:
+    """Write ``parts`` to a temporary file in ``directory`` and rename it to ``target`` (never a mapped file)."""
+    fd, tmp_path = tempfile.mkstemp(prefix=".knowledge-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            for part in parts:
+                fh.write(part)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+        for attempt in range(20):
+            try:
+                os.replace(tmp_path, target)
+                return
+            except PermissionError:
+                # Windows: a reader has the pointer open for a moment
+                if attempt == 19:
+                    raise
+                time.sleep(0.05)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _remove_superseded(path: str, keep: str) -> None:
+    root, ext = os.path.splitext(os.path.abspath(path))
+    directory = os.path.dirname(root)
+    prefix = os.path.basename(root) + "."
+    for name in os.listdir(directory):
+        candidate = os.path.join(directory, name)
+        if name.startswith(prefix) and name.endswith(ext) and candidate != keep and candidate != root + ext:
+            try:
+                os.unlink(candidate)
+            except OSError:
+                pass  # still mapped by a worker (Windows); a later build removes it
+
+
+def write_index(index: SectionIndex, path: str, sheet: str) -> str:
+    """Compile ``index`` to a new file next to ``path`` and point ``path``'s pointer at it.
+
+    ``sheet`` is the COLLEGE_INFO it was built from. Returns the new file's path.
+    """
+    blob = bytearray()
+
+    def put(text: str) -> tuple[int, int]:
+        data = text.encode("utf-8")
+        blob.extend(data)
+        return len(blob) - len(data), len(data)
+
+    norms = struct.pack(f"<{len(index.norms)}d", *index.norms)
+    tokens = struct.pack(f"<{len(index.token_counts)}I", *index.token_counts)
+    passages = bytearray()
+    for title, text in index.passages:
+        title_off, title_len = put(title)
+        text_off, text_len = put(text)
+        passages += _PASSAGE.pack(title_off, title_len, text_off, text_len)
+    terms = bytearray()
+    postings = bytearray()
+    posting_count = 0
+    for term in sorted(index.postings, key=lambda t: t.encode("utf-8")):
+        term_off, term_len = put(term)
+        entries = index.postings[term]
+        terms += _TERM.pack(term_off, term_len, index.idf[term], posting_count, len(entries))
+        for passage, freq in entries:
+            postings += _POSTING.pack(passage, freq)
+        posting_count += len(entries)
+    full_off, full_len = put(index.full_text)
+
+    # The header is a multiple of 8 bytes, so the float64 norms start aligned
+    norms_off = _HEADER.size
+    tokens_off = norms_off + len(norms)
+    passages_off = tokens_off + len(tokens)
+    terms_off = passages_off + len(passages)
+    postings_off = terms_off + len(terms)
+    blob_off = postings_off + len(postings)
+    header = _HEADER.pack(
+        MAGIC, FORMAT, index.k1, index.b, len(index.passages), len(index.postings), posting_count,
+        index.version.encode("ascii")[:16].ljust(16, b"\0"), sheet_digest(sheet),
+        norms_off, tokens_off, passages_off, terms_off, postings_off, blob_off, full_off, full_len,
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    root, ext = os.path.splitext(os.path.abspath(path))
+    target = f"{root}.{index.version}.{time.time_ns():x}{ext}"
+    _write_file(directory, target, (header, norms, tokens, passages, terms, postings, blob))
+    _write_file(directory, _pointer_path(path), (os.path.basename(target).encode("utf-8"),))
+    _remove_superseded(path, target)
+    return target
+
+
+class _PassageView:
+    """``index.passages[i]`` -> (title, text), decoded from the mapping on access."""
+
+    def __init__(self, index: "MappedSectionIndex"):
+        self._index = index
+
+    def __len__(self) -> int:
+        return self._index.passage_count
+
+    def __getitem__(self, i: int) -> tuple[str, str]:
+        title_off, title_len, text_off, text_len = self._index._passage(i)
+        return self._index._text(title_off, title_len), self._index._text(text_off, text_len)
+
+
+class MappedSectionIndex(Retriever):
+    """Read-only BM25 index backed by a file written by ``write_index``."""
+
+    def __init__(self, path: str):
+        self.path = path
+        for attempt in range(3):
+            self.file = current_file(path)
+            try:
+                fh = open(self.file, "rb")
+                break
+            except FileNotFoundError:
+                # Superseded and removed between reading the pointer and opening it
+                if attempt == 2:
+                    raise
+        with fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, fmt, self.k1, self.b, self.passage_count, self.term_count, self.posting_count,
+         version, self.sheet_digest, norms_off, tokens_off, self._passages_off, self._terms_off,
+         postings_off, self._blob_off, full_off, full_len) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or fmt != FORMAT:
+            self._map.close()
+            raise ValueError(f"{self.file} is not a knowledge index (format {FORMAT})")
+        self.version = version.rstrip(b"\0").decode("ascii")
+        self._full = (full_off, full_len)
+        n = self.passage_count
+        view = memoryview(self._map)
+        self._norms = view[norms_off:norms_off + 8 * n].cast("d")
+        self.token_counts = view[tokens_off:tokens_off + 4 * n].cast("I")
+        self._postings = view[postings_off:postings_off + 8 * self.posting_count].cast("I")
+        self._view = view
+        self.passages = _PassageView(self)
+        # Requests reading the mapping right now; close() waits for the last one
+        self._readers = 0
+        self._closing = False
+        self._lock = threading.Lock()
+
+    def select_context(self, question: str, *args, **kwargs) -> str:
+        with self._lock:
+            if self._closing:
+                raise IndexClosed(self.file)
+            self._readers += 1
+        try:
+            return super().select_context(question, *args, **kwargs)
+        finally:
+            with self._lock:
+                self._readers -= 1
+                release = self._closing and not self._readers
+            if release:
+                self._release()
+
+    def close(self) -> None:
+        """Unmap the file once no request is reading it (after a swap to a rebuilt index)."""
+        with self._lock:
+            if self._closing:
+                return
+            self._closing = True
+            release = not self._readers
+        if release:
+            self._release()
+
+    def _release(self) -> None:
+        for view in (self._norms, self.token_counts, self._postings, self._view):
+            view.release()
+        self._map.close()
+
+    @property
+    def full_text(self) -> str:
+        return self._text(*self._full)
+
+    def is_stale(self) -> bool:
+        """True once the pointer names a newer file from a rebuild."""
+        try:
+            return current_file(self.path) != self.file
+        except OSError:
+            return False  # missing, or being replaced this instant (Windows); check again next time
+
+    def size(self) -> int:
+        return len(self._map)
+
+    def _text(self, offset: int, length: int) -> str:
+        start = self._blob_off + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def _passage(self, i: int) -> tuple:
+        return _PASSAGE.unpack_from(self._map, self._passages_off + i * _PASSAGE.size)
+
+    def _find_term(self, term: bytes) -> tuple | None:
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            record = _TERM.unpack_from(self._map, self._terms_off + mid * _TERM.size)
+            start = self._blob_off + record[0]
+            candidate = self._map[start:start + record[1]]
+            if candidate < term:
+                lo = mid + 1
+            elif candidate > term:
+                hi = mid
+            else:
+                return record
+        return None
+
+    def score(self, question: str) -> list[tuple[float, int]]:
+        totals: dict[int, float] = {}
+        k1, norms, postings = self.k1, self._norms, self._postings
+        for term in set(tokenize(question)):
+            record = self._find_term(term.encode("utf-8"))
+            if record is None:
+                continue
+            _, _, idf, first, count = record
+            pairs = postings[2 * first:2 * (first + count)]
+            for i, freq in zip(pairs[::2], pairs[1::2]):
+                totals[i] = totals.get(i, 0.0) + idf * freq * (k1 + 1) / (freq + norms[i])
+        return sorted(((score, i) for i, score in totals.items()), reverse=True)
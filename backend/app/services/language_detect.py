@@ -0,0 +1,109 @@
+"""
+Offline language detector used as a fast path before the remote detector.
+
+Indic scripts are identified from their Unicode blocks. Latin-script text is
+split between English and Romanized Hindi using marker words (the same kind
+of cues UltraFastChatService uses: kya, hai, kitna...). Every result comes
+with a confidence; callers fall back to googletrans when it is low.
+"""
+import re
+
+# (first code point, last code point, language) for scripts that map to one of our languages
+_SCRIPT_BLOCKS = (
+    (0x0900, 0x097F, "hi"),   # Devanagari (Hindi, Marwari)
+    (0x0980, 0x09FF, "bn"),   # Bengali
+    (0x0A00, 0x0A7F, "pa"),   # Gurmukhi
+    (0x0A80, 0x0AFF, "gu"),   # Gujarati
+    (0x0B00, 0x0B7F, "or"),   # Odia
+    (0x0B80, 0x0BFF, "ta"),   # Tamil
+    (0x0C00, 0x0C7F, "te"),   # Telugu
+    (0x0C80, 0x0CFF, "kn"),   # Kannada
+    (0x0D00, 0x0D7F, "ml"),   # Malayalam
+    (0x0600, 0x06FF, "ur"),   # Arabic script (Urdu)
+)
+
+# Romanized Hindi function words and question words; rare in English text
+_HINGLISH_MARKERS = frozenset("""
+    kya kyaa hai hain hei kab kaise kaisa kaisi kitna kitni kitne kahan kahaan kyun kyon kaun
+    mein mai mujhe mera meri mere aap aapka aapki apna hum humko tum tumhara
+    ka ki ke ko se par pe bhi nahi nahin haan ji toh aur ya
+    chahiye chaiye batao bataiye bataye bolo karna karne kare kariye kar hota hoti hote
+    milega milegi lagega lagta sakta sakte sakti wala wali wale kuch sab abhi kal
+""".split())
+
+# Common English function words. Words shared with Romanized Hindi ("to", "me")
+# and domain nouns used in both ("hostel", "fees") are left out on purpose.
+_ENGLISH_MARKERS = frozenset("""
+    the a an is are was were be been what when where which who whom why how
+    do does did can could will would should shall may might must
+    i you he she it we they my your our their this that these those
+    of in on at for with from by about and or not no yes
+    there here have has had please tell any much many get hello hi hey thanks thank
+""".split())
+
+# Campus nouns used unchanged in English and Romanized Hindi; they only count
+# towards English when no Hindi marker is present
+_SHARED_TERMS = frozenset("""
+    hostel fee fees admission admissions exam exams college course courses library mess
+    placement placements scholarship scholarships result results timing timings btech mba
+""".split())
+
+_WORD = re.compile(r"[a-z]+")
+
+
+def _script_counts(text: str) -> tuple[dict[str, int], int, int]:
+    """Count letters per known script; also return the Latin letter count and total letter count."""
+    counts: dict[str, int] = {}
+    latin = 0
+    letters = 0
+    for ch in text:
+        cp = ord(ch)
+        if cp < 0x80:
+            if ch.isalpha():
+                latin += 1
+                letters += 1
+            continue
+        for start, end, lang in _SCRIPT_BLOCKS:
+            if start <= cp <= end:
+                counts[lang] = counts.get(lang, 0) + 1
+                letters += 1
+                break
+        else:
+            if ch.isalpha():
+                letters += 1
+    return counts, latin, letters
+
+
+def _detect_latin(text: str) -> tuple[str, float]:
+    words = _WORD.findall(text.lower())
+    if not words:
+        return "en", 0.0
+    # Distinct markers, so one repeated particle ("ka ... ka") is not strong evidence
+    hindi = len({w for w in words if w in _HINGLISH_MARKERS})
+    english = sum(1 for w in words if w in _ENGLISH_MARKERS)
+    if hindi == 0:
+        english += sum(1 for w in words if w in _SHARED_TERMS)
+    known = hindi + english
+    if known == 0:
+        # Latin text with no cues (names, Khasi, ...): let the remote detector decide
+        return "en", 0.3
+    coverage = min(1.0, known / len(words))
+    if hindi > english:
+        return "hi", min(0.98, 0.4 + 0.3 * hindi / known + 0.5 * coverage)
+    return "en", min(0.98, 0.4 + 0.3 * english / known + 0.5 * coverage)
+
+
+def detect(text: str) -> tuple[str, float]:
+    """Return (language code, confidence in [0, 1]) without any network call."""
+    counts, latin, letters = _script_counts(text)
+    if letters == 0:
+        return "en", 0.0
+    if counts:
+        lang, n = max(counts.items(), key=lambda item: item[1])
+        share = n / letters
+        # Mixed scripts ("College में admission") still lean on the native script
+        if n >= 2 and share >= 0.2:
+            return lang, min(0.99, 0.7 + 0.3 * share)
+    if latin / letters >= 0.8:
+        return _detect_latin(text)
+    return "en", 0.0
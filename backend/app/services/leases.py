@@ -0,0 +1,55 @@
+"""
+Database leases, so a job runs in one place even with many workers.
+
+``acquire(name, seconds)`` atomically takes the ``job_leases`` row for
+``name`` if it is free or expired, or extends it if ``holder`` already
+holds it. The holder renews before the lease runs out; if it dies, another
+process takes over once the lease expires. The UPDATE runs under SQLite's
+write lock, so two processes can never both win.
+
+The default holder is the process (host:pid), which suits loops that renew
+their own lease. Jobs that must also exclude other runs in the same process
+pass a holder of their own (see ``new_holder``).
+"""
+import os
+import socket
+import time
+import uuid
+from sqlalchemy import delete, insert, update #type: ignore
+from sqlalchemy.exc import IntegrityError #type: ignore
+from ..database import engine
+from ..models.database import JobLease
+
+HOLDER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def new_holder() -> str:
+    """A holder id unique to one run, for leases that must not be re-entered by this process."""
+    return f"{HOLDER}:{uuid.uuid4().hex[:12]}"
+
+
+def acquire(name: str, seconds: float, holder: str = HOLDER) -> bool:
+    """Hold the lease on ``name`` for the next ``seconds``. False if another holder has it."""
+    lease = JobLease.__table__
+    now = time.time()
+    with engine.begin() as conn:
+        taken = conn.execute(
+            update(lease)
+            .where(lease.c.name == name, (lease.c.holder == holder) | (lease.c.expires_at < now))
+            .values(holder=holder, expires_at=now + seconds)
+        ).rowcount
+    if taken:
+        return True
+    try:
+        with engine.begin() as conn:
+            conn.execute(insert(lease).values(name=name, holder=holder, expires_at=now + seconds))
+    except IntegrityError:
+        return False  # the row exists and is held by someone else
+    return True
+
+
+def release(name: str, holder: str = HOLDER) -> None:
+    """Give up the lease on ``name`` if ``holder`` still holds it."""
+    lease = JobLease.__table__
+    with engine.begin() as conn:
+        conn.execute(delete(lease).where(lease.c.name == name, lease.c.holder == holder))
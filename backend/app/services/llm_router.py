@@ -0,0 +1,340 @@
+"""
+Latency-aware routing over the LLM providers, with failover.
+
+Each provider (Groq, Gemini, and the local intent engine as a last resort)
+sits behind the same ``generate(question, response_language, history)``
+interface. The router keeps an EWMA of every provider's latency and error
+rate and tries them best-first: the lowest latency divided by the success
+rate among providers whose circuit breaker is closed. Providers that have
+not answered yet keep their configured LLM_PROVIDERS order. A 429, 5xx,
+timeout or exception fails over to the next provider within the same
+request, as does a call the upstream scheduler would not admit in time
+("overloaded"; that one says nothing about the provider's health and does
+not count against its breaker). ROUTER_BREAKER_FAILURES consecutive failures open the
+provider's breaker for ROUTER_BREAKER_COOLDOWN seconds, after which a single
+probe request decides whether it closes again.
+
+Streams fail over only until the first token; after that an error ends the
+stream as before.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator
+from .. import config
+from .gemini_service import gemini_service
+from .groq_service import GroqStreamError, groq_service
+from .metrics import Counter, Histogram, registry
+from .scheduler import SchedulerRejected
+from .ultra_fast_chat_service import ultra_fast_chat_service
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_SECONDS = registry.register(Histogram(
+    "chatbot_llm_provider_seconds", "LLM provider call latency", ("provider", "outcome"),
+))
+FAILOVERS = registry.register(Counter(
+    "chatbot_llm_failovers_total", "LLM calls that failed over to the next provider", ("provider", "reason"),
+))
+
+
+class ProviderError(Exception):
+    """A provider could not answer; reason is "rate_limited", "server_error", "timeout" or "error"."""
+
+    def __init__(self, reason: str, message: str = ""):
+        super().__init__(message or reason)
+        self.reason = reason
+
+
+def _status_reason(status_code: int | None) -> str:
+    if status_code == 429:
+        return "rate_limited"
+    if status_code is not None and status_code >= 500:
+        return "server_error"
+    return "error"
+
+
+def _exception_reason(exc: BaseException) -> str:
+    if isinstance(exc, ProviderError):
+        return exc.reason
+    if isinstance(exc, SchedulerRejected):
+        return "overloaded"
+    if isinstance(exc, asyncio.TimeoutError) or "Timeout" in type(exc).__name__:
+        return "timeout"
+    return "error"
+
+
+class Provider:
+    name = ""
+    fallback_only = False  # only used once every other provider has failed
+
+    def available(self) -> bool:
+        return True
+
+    async def generate(self, question: str, response_language: str, history: list[tuple[str, str]] | None,
+                       usage: tuple[str, str]) -> dict:
+        """``usage`` is (source, user language), the usage-ledger key for metered providers."""
+        raise NotImplementedError
+
+
+class GroqProvider(Provider):
+    name = "groq"
+
+    def available(self) -> bool:
+        return groq_service._is_configured()
+
+    async def generate(self, question, response_language, history, usage):
+        result = await groq_service.generate_response_async(question, response_language=response_language, history=history,
+                                                            usage_source=usage[0], usage_language=usage[1])
+        if result.get("source") != "groq-llama3":
+            raise ProviderError(_status_reason(result.get("status_code")), result.get("answer", ""))
+        return result
+
+    async def stream(self, question, response_language, history, usage) -> AsyncIterator[str]:
+        try:
+            async for delta in groq_service.stream_response_async(question, response_language=response_language, history=history,
+                                                                  usage_source=usage[0], usage_language=usage[1]):
+                yield delta
+        except GroqStreamError as e:
+            raise ProviderError(_status_reason(e.fallback.get("status_code")), str(e)) from e
+
+
+class GeminiProvider(Provider):
+    name = "gemini"
+
+    def __init__(self):
+        # Its own threads: slow Gemini calls must not use up the threadpool that
+        # database writes and the rest of the app share
+        self._executor = ThreadPoolExecutor(max_workers=config.GEMINI_MAX_CONCURRENCY, thread_name_prefix="gemini")
+
+    def available(self) -> bool:
+        return gemini_service.model is not None
+
+    async def generate(self, question, response_language, history, usage):
+        # Same instructions and retrieved sections as Groq, so answers look alike
+        context_query = " ".join([history[-1][0], question]) if history else question
+        system_prompt = groq_service.get_system_prompt(response_language, context_query)
+        context = "\n".join(f"Student: {q}\nAssistant: {a}" for q, a in history or ())
+        call = asyncio.get_running_loop().run_in_executor(
+            self._executor, lambda: gemini_service.generate_response(question, context, system_prompt=system_prompt))
+        # Calls still queued for a thread when this fires are cancelled; running ones end at the SDK timeout
+        return await asyncio.wait_for(call, timeout=config.GEMINI_TIMEOUT)
+
+
+class LocalProvider(Provider):
+    name = "local"
+    fallback_only = True
+
+    async def generate(self, question, response_language, history, usage):
+        return ultra_fast_chat_service.generate_response(question, hindi=response_language in ("hi", "mwr"))
+
+
+class _Health:
+    """EWMA latency/error rate and circuit breaker of one provider."""
+
+    def __init__(self, name: str, rank: int):
+        self.name = name
+        self.rank = rank
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probing = False
+        self.calls = 0
+        self.failures = 0
+
+    def usable(self) -> bool:
+        if self.state == "open" and time.monotonic() - self.opened_at >= config.ROUTER_BREAKER_COOLDOWN:
+            self.state = "half-open"
+        return self.state == "closed" or (self.state == "half-open" and not self.probing)
+
+    def acquire(self) -> bool:
+        """Claim a call; in half-open state only one probe is let through."""
+        if not self.usable():
+            return False
+        if self.state == "half-open":
+            self.probing = True
+        return True
+
+    def score(self) -> tuple:
+        if self.latency is None:
+            return (1, self.rank)
+        return (0, self.latency / max(0.05, 1.0 - self.error_rate))
+
+    def observe(self, seconds: float, ok: bool) -> None:
+        alpha = config.ROUTER_EWMA_ALPHA
+        self.calls += 1
+        self.probing = False
+        # Failures are often fast (429s); only successes say how fast answers are
+        if ok:
+            self.latency = seconds if self.latency is None else alpha * seconds + (1 - alpha) * self.latency
+        self.error_rate = alpha * (0.0 if ok else 1.0) + (1 - alpha) * self.error_rate
+        if ok:
+            self.consecutive_failures = 0
+            self.state = "closed"
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == "half-open" or self.consecutive_failures >= config.ROUTER_BREAKER_FAILURES:
+            if self.state != "open":
+                logger.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "latency_ewma_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "error_rate_ewma": round(self.error_rate, 4),
+            "consecutive_failures": self.consecutive_failures,
+            "calls": self.calls,
+            "failures": self.failures,
+        }
+
+
+_EXHAUSTED = {
+    "answer": "Sorry, I'm having trouble connecting to the AI service right now. Please try again later or contact support.",
+    "confidence": 0.1,
+    "source": "error-fallback",
+}
+
+
+class LLMRouter:
+    def __init__(self, providers: list[Provider]):
+        self.providers = providers
+        self._health = {provider.name: _Health(provider.name, rank) for rank, provider in enumerate(providers)}
+
+    def ranked(self) -> list[Provider]:
+        """Providers to try for the next call, best first (fallback-only providers last)."""
+        primary = [p for p in self.providers if not p.fallback_only and p.available() and self._health[p.name].usable()]
+        primary.sort(key=lambda p: self._health[p.name].score())
+        return primary + [p for p in self.providers if p.fallback_only and p.available()]
+
+    def _record(self, provider: Provider, started: float, error: BaseException | None = None) -> None:
+        elapsed = time.perf_counter() - started
+        health = self._health[provider.name]
+        reason = "ok" if error is None else _exception_reason(error)
+        if reason == "overloaded":
+            health.probing = False  # never reached the provider
+        else:
+            health.observe(elapsed, error is None)
+        if error is None:
+            PROVIDER_SECONDS.observe(elapsed, provider.name, "ok")
+            return
+        PROVIDER_SECONDS.observe(elapsed, provider.name, reason)
+        FAILOVERS.inc(provider.name, reason)
+        logger.warning(f"LLM provider {provider.name} failed ({reason}): {error}")
+
+    def _acquire(self, provider: Provider) -> bool:
+        # The last-resort providers are always tried
+        return provider.fallback_only or self._health[provider.name].acquire()
+
+    def _release(self, provider: Provider) -> None:
+        # A cancelled probe must not leave the breaker half-open forever
+        self._health[provider.name].probing = False
+
+    async def generate(self, question: str, response_language: str = "en",
+                       history: list[tuple[str, str]] | None = None, usage_source: str = "ask",
+                       usage_language: str | None = None) -> dict:
+        """Answer with the best available provider, failing over on errors.
+
+        The result carries ``provider`` and ``failovers`` (how many providers failed first).
+        Token usage is recorded under usage_source and usage_language (default response_language).
+        """
+        usage = (usage_source, usage_language or response_language)
+        failovers = 0
+        for provider in self.ranked():
+            if not self._acquire(provider):
+                continue
+            started = time.perf_counter()
+            try:
+                result = await provider.generate(question, response_language, history, usage)
+            except asyncio.CancelledError:
+                self._release(provider)
+                raise
+            except Exception as e:
+                self._record(provider, started, e)
+                failovers += 1
+                continue
+            self._record(provider, started)
+            return dict(result, provider=provider.name, failovers=failovers)
+        return dict(_EXHAUSTED, provider=None, failovers=failovers)
+
+    def stream(self, question: str, response_language: str = "en",
+               history: list[tuple[str, str]] | None = None, usage_source: str = "ask-stream",
+               usage_language: str | None = None) -> "RoutedStream":
+        return RoutedStream(self, question, response_language, history, (usage_source, usage_language or response_language))
+
+    def stats(self) -> dict:
+        return {
+            provider.name: {
+                "available": provider.available(),
+                "fallback_only": provider.fallback_only,
+                **self._health[provider.name].snapshot(),
+            }
+            for provider in self.providers
+        }
+
+
+class RoutedStream:
+    """Async iterator of answer deltas; ``source``, ``confidence`` and ``provider`` are set once it finishes."""
+
+    def __init__(self, router: LLMRouter, question: str, response_language: str, history, usage: tuple[str, str]):
+        self.router = router
+        self.question = question
+        self.response_language = response_language
+        self.history = history
+        self.usage = usage
+        self.provider: str | None = None
+        self.source = "error-fallback"
+        self.confidence = 0.1
+        self.failovers = 0
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._deltas()
+
+    async def _deltas(self) -> AsyncIterator[str]:
+        for provider in self.router.ranked():
+            if not self.router._acquire(provider):
+                continue
+            started = time.perf_counter()
+            emitted = False
+            try:
+                if hasattr(provider, "stream"):
+                    async for delta in provider.stream(self.question, self.response_language, self.history, self.usage):
+                        emitted = True
+                        yield delta
+                    result = {"source": "groq-llama3", "confidence": 0.9} if provider.name == "groq" else {}
+                else:
+                    result = await provider.generate(self.question, self.response_language, self.history, self.usage)
+                    emitted = True
+                    yield result["answer"]
+            except (asyncio.CancelledError, GeneratorExit):
+                self.router._release(provider)
+                raise
+            except Exception as e:
+                self.router._record(provider, started, e)
+                if emitted:
+                    raise  # the client already has part of this answer
+                self.failovers += 1
+                continue
+            self.router._record(provider, started)
+            self.provider = provider.name
+            self.source = result.get("source", provider.name)
+            self.confidence = result.get("confidence", 0.8)
+            return
+        yield _EXHAUSTED["answer"]
+
+
+def _build_providers() -> list[Provider]:
+    known = {cls.name: cls for cls in (GroqProvider, GeminiProvider, LocalProvider)}
+    names = [name.strip() for name in config.LLM_PROVIDERS.split(",") if name.strip()]
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        logger.warning(f"Unknown LLM providers ignored: {', '.join(unknown)}")
+    return [known[name]() for name in names if name in known]
+
+
+llm_router = LLMRouter(_build_providers())
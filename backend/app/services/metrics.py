@@ -0,0 +1,177 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Histograms and counters are plain dicts of label tuples guarded by a lock,
+so an observation costs a bisect and a few additions (~1-2 microseconds).
+``stage()`` times one step of a request; code deeper in the call (e.g. the
+translation service) can downgrade the running stage's outcome to
+"timeout" or "error" through a context variable without any plumbing.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Seconds; covers in-memory hits (~µs) up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_TIMEOUT_ERRORS = (asyncio.TimeoutError, FutureTimeoutError, TimeoutError)
+_INF = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, _INF)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect) -> None:
+        """collect() returns extra exposition lines (gauges read at scrape time)."""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            lines.extend(collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "chatbot_stage_seconds", "Time spent in each /ask stage", ("stage", "language", "outcome"),
+))
+REQUEST_SECONDS = registry.register(Histogram(
+    "chatbot_request_seconds", "End-to-end /ask latency", ("endpoint", "language", "source"),
+))
+TRANSLATION_FALLBACKS = registry.register(Counter(
+    "chatbot_translation_fallbacks_total", "Translation calls that fell back to the untranslated text", ("op", "reason"),
+))
+
+COALESCED_CALLS = registry.register(Counter(
+    "chatbot_coalesced_calls_total", "Calls that waited on an identical in-flight upstream call", ("call",),
+))
+
+_current_stage: contextvars.ContextVar["_Stage | None"] = contextvars.ContextVar("current_stage", default=None)
+
+
+class _Stage:
+    __slots__ = ("name", "language", "outcome", "_start", "_token")
+
+    def __init__(self, name: str, language: str):
+        self.name = name
+        self.language = language
+        self.outcome = "ok"
+
+    def __enter__(self):
+        self._token = _current_stage.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        _current_stage.reset(self._token)
+        if exc_type is not None:
+            self.outcome = "timeout" if issubclass(exc_type, _TIMEOUT_ERRORS) or "Timeout" in exc_type.__name__ else "error"
+        STAGE_SECONDS.observe(elapsed, self.name, self.language or "unknown", self.outcome)
+        return False
+
+
+def observe_stage(name: str, language: str | None, outcome: str, seconds: float) -> None:
+    """Record a stage timed by hand (e.g. across the yields of a streaming generator)."""
+    STAGE_SECONDS.observe(seconds, name, language or "unknown", outcome)
+
+
+def stage(name: str, language: str | None = None) -> _Stage:
+    """``with stage("llm", lang):`` times a block into chatbot_stage_seconds."""
+    return _Stage(name, language)
+
+
+def mark_stage(outcome: str) -> None:
+    """Set the outcome ("timeout"/"error") of the stage currently running in this task, if any."""
+    current = _current_stage.get()
+    if current is not None and current.outcome == "ok":
+        current.outcome = outcome
+
+
+def translation_fallback(op: str, reason: str) -> None:
+    TRANSLATION_FALLBACKS.inc(op, reason)
+    mark_stage(reason)
@@ -0,0 +1,276 @@
+"""
+Admin override matcher, checked before translation and the LLM.
+
+Active AdminOverride rows are compiled once into an in-memory index:
+
+* plain patterns ("exam postponed") are keyword phrases, matched as whole
+  words through one Aho-Corasick automaton;
+* patterns with regex syntax ("fee.*deadline|last.*date.*fee") are compiled
+  once, and each regex is only run when a literal it requires (e.g.
+  "deadline") occurs in the question, found by a second automaton.
+
+So a question costs two linear scans plus a handful of regex checks, however
+many overrides exist. The index is refreshed from a cheap change signature
+(row count, max id, max updated/created date) instead of per request, and
+only changed rows are recompiled; hard deletes force a full reload.
+"""
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import func #type: ignore
+from sqlalchemy.orm import Session #type: ignore
+from ..models.database import AdminOverride
+from . import language_detect
+from .text_match import AhoCorasick, normalize_text
+
+logger = logging.getLogger(__name__)
+
+_REGEX_SYNTAX = frozenset(".^$*+?{}[]\\|()")
+# Literals shorter than this match too many questions to be a useful prefilter
+_MIN_LITERAL = 3
+# language_code values that mean "answer in any language"
+_ANY_LANGUAGE = ("", "all", "any", "*")
+
+
+@dataclass(frozen=True)
+class _Override:
+    id: int
+    pattern: str
+    response: str
+    language_code: str
+    audio_file_path: str | None
+    regex: re.Pattern | None  # None for keyword patterns
+
+
+def is_regex(pattern: str) -> bool:
+    return any(ch in _REGEX_SYNTAX for ch in pattern)
+
+
+def _split_top_level(pattern: str) -> list[str]:
+    """Split a regex on '|' that is not inside a group or character class."""
+    branches, depth, in_class, start, i = [], 0, False, 0, 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(0, depth - 1)
+        elif ch == "|" and depth == 0:
+            branches.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    branches.append(pattern[start:])
+    return branches
+
+
+def _required_literal(branch: str) -> str | None:
+    """Longest run of plain characters every match of branch must contain, if any.
+
+    Conservative: groups, classes and escapes end a run and are skipped, and a
+    character made optional by ?, * or {m,n} is dropped.
+    """
+    runs, current, depth, in_class, i = [], "", 0, False, 0
+    while i < len(branch):
+        ch = branch[i]
+        if ch == "\\":
+            runs.append(current)
+            current = ""
+            i += 2
+            continue
+        if in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+            runs.append(current)
+            current = ""
+        elif ch == "(":
+            depth += 1
+            runs.append(current)
+            current = ""
+        elif ch == ")":
+            depth = max(0, depth - 1)
+        elif depth == 0 and (ch.isalnum() or ch == " "):
+            if i + 1 < len(branch) and branch[i + 1] in "?*{":
+                runs.append(current)
+                current = ""
+            else:
+                current += ch
+        elif depth == 0:
+            runs.append(current)
+            current = ""
+        i += 1
+    runs.append(current)
+    best = max((run.strip() for run in runs), key=len)
+    return best if len(best) >= _MIN_LITERAL else None
+
+
+def compile_pattern(pattern: str) -> re.Pattern | None:
+    """Compiled regex for a regex pattern, None for a keyword phrase. Raises re.error."""
+    if not is_regex(pattern):
+        return None
+    return re.compile(pattern, re.IGNORECASE)
+
+
+class _Index:
+    """Immutable snapshot of the compiled overrides; swapped whole on refresh."""
+
+    def __init__(self, entries: dict[int, _Override]):
+        self.entries = entries
+        keywords, literals, self.unfiltered = [], [], []
+        for entry in entries.values():
+            if entry.regex is None:
+                keyword = normalize_text(entry.pattern)
+                if keyword:
+                    keywords.append((keyword, entry.id))
+                continue
+            branch_literals = [_required_literal(b.lower()) for b in _split_top_level(entry.pattern)]
+            if all(branch_literals):
+                literals.extend((literal, entry.id) for literal in set(branch_literals))
+            else:
+                # Some branch has no usable literal (".*"-style); always run it
+                self.unfiltered.append(entry.id)
+        self.keywords = AhoCorasick(keywords)
+        self.literals = AhoCorasick(literals)
+
+    def candidates(self, question: str) -> set[int]:
+        matched = {entry_id for _, _, entry_id in self.keywords.iter_word_matches(normalize_text(question))}
+        lowered = question.lower()
+        to_check = {entry_id for _, _, entry_id in self.literals.iter_matches(lowered)}
+        to_check.update(self.unfiltered)
+        for entry_id in to_check - matched:
+            if self.entries[entry_id].regex.search(lowered):
+                matched.add(entry_id)
+        return matched
+
+
+class OverrideMatcher:
+    def __init__(self):
+        self._index = _Index({})
+        self._lock = threading.Lock()
+        self._signature: tuple | None = None
+        self._last_seen: datetime | None = None
+        self.version = 0  # bumped on every rebuild
+        self.refreshed_at: datetime | None = None
+
+    def __len__(self) -> int:
+        return len(self._index.entries)
+
+    @staticmethod
+    def _signature_of(db: Session) -> tuple:
+        changed = func.coalesce(AdminOverride.updated_date, AdminOverride.created_date)
+        count, max_id, last_changed = db.query(func.count(AdminOverride.id), func.max(AdminOverride.id), func.max(changed)).one()
+        return count or 0, max_id or 0, last_changed
+
+    @staticmethod
+    def _entry_for(row: AdminOverride) -> _Override | None:
+        pattern = (row.question_pattern or "").strip()
+        if not pattern or not row.override_response:
+            return None
+        try:
+            regex = compile_pattern(pattern)
+        except re.error as e:
+            logger.warning(f"Skipping admin override {row.id}: invalid pattern {pattern!r} ({e})")
+            return None
+        return _Override(
+            id=row.id,
+            pattern=pattern,
+            response=row.override_response,
+            language_code=(row.language_code or "").strip().lower(),
+            audio_file_path=row.audio_file_path,
+            regex=regex,
+        )
+
+    def refresh(self, db: Session, force: bool = False) -> bool:
+        """Reload overrides if the table changed since the last refresh. Returns True if rebuilt.
+
+        Rows created or updated since the last refresh are recompiled. If the
+        row count is not the old count plus the new ids, rows were hard-deleted
+        (perhaps alongside inserts), and that or force triggers a full reload.
+        """
+        with self._lock:
+            signature = self._signature_of(db)
+            if not force and signature == self._signature:
+                return False
+            changed_col = func.coalesce(AdminOverride.updated_date, AdminOverride.created_date)
+            full = force or self._signature is None
+            if not full:
+                added = db.query(func.count(AdminOverride.id)).filter(AdminOverride.id > self._signature[1]).scalar()
+                full = signature[0] != self._signature[0] + added
+            if full:
+                entries = {}
+                rows = db.query(AdminOverride).filter(AdminOverride.is_active == True)  # noqa: E712
+            else:
+                entries = dict(self._index.entries)
+                changed = AdminOverride.id > self._signature[1]
+                if self._last_seen is not None:
+                    changed = changed | (changed_col >= self._last_seen)
+                rows = db.query(AdminOverride).filter(changed)
+            for row in rows.yield_per(1000):
+                entries.pop(row.id, None)
+                if row.is_active:
+                    entry = self._entry_for(row)
+                    if entry is not None:
+                        entries[row.id] = entry
+            self._index = _Index(entries)
+            self._signature = signature
+            self._last_seen = signature[2]
+            self.version += 1
+            self.refreshed_at = datetime.utcnow()
+        logger.info(f"Admin overrides {'loaded' if full else 'refreshed'}: {len(entries)} active (v{self.version})")
+        return True
+
+    def match(self, question: str, language: str | None = None) -> dict | None:
+        """Best active override for question as a result dict, or None.
+
+        language is the user's language when known; otherwise it is only
+        detected (offline) if the matching overrides disagree on language.
+        The newest matching override in that language (or for any language)
+        wins; overrides only written for other languages are not used.
+        """
+        index = self._index
+        if not index.entries or not question:
+            return None
+        matched = index.candidates(question)
+        if not matched:
+            return None
+        entries = sorted((index.entries[i] for i in matched), key=lambda e: e.id, reverse=True)
+        languages = {e.language_code for e in entries if e.language_code not in _ANY_LANGUAGE}
+        if language is None:
+            language = next(iter(languages)) if len(languages) == 1 else language_detect.detect(question)[0]
+        entry = next((e for e in entries if e.language_code == language), None)
+        if entry is None:
+            entry = next((e for e in entries if e.language_code in _ANY_LANGUAGE), None)
+        if entry is None:
+            return None
+        logger.info(f"Admin override {entry.id} matched | pattern: {entry.pattern!r}")
+        return {
+            "answer": entry.response,
+            "confidence": 1.0,
+            "language_detected": language if entry.language_code in _ANY_LANGUAGE else entry.language_code,
+            "source": "admin-override",
+            "override_id": entry.id,
+            "audio_file_path": entry.audio_file_path,
+        }
+
+    def stats(self) -> dict:
+        index = self._index
+        return {
+            "active": len(index.entries),
+            "keyword_patterns": index.keywords.pattern_count,
+            "regex_patterns": sum(1 for e in index.entries.values() if e.regex is not None),
+            "unfiltered_regexes": len(index.unfiltered),
+            "version": self.version,
+            "refreshed_at": self.refreshed_at,
+        }
+
+
+override_matcher = OverrideMatcher()
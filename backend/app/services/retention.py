@@ -0,0 +1,121 @@
+"""
+Time-based retention for the conversations table.
+
+``purge_conversations(days)`` archives and deletes conversations older than
+``days`` in batches of RETENTION_BATCH_SIZE rows. Every batch is its own
+short transaction (select ids, write them to the archive, delete, commit)
+followed by a RETENTION_PAUSE_MS pause, so SQLite's write lock is never
+held for long and /ask inserts keep going while a large backlog is purged.
+
+Archives are gzipped NDJSON (the export format), one file per run under
+RETENTION_ARCHIVE_DIR; each batch is flushed and fsynced before its rows are
+deleted, so an interrupted run loses nothing. Hourly rollups and token
+usage are separate tables and keep their history.
+
+A purge holds the "retention" lease (see leases.py) for its whole run,
+renewed every batch, under a holder id of its own. A second purge started
+meanwhile, from another worker, the CLI, the admin API or the same process,
+raises ``PurgeInProgress`` instead of writing a second archive of the same
+rows, and a run only ever releases the lease it took.
+"""
+import gzip
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete #type: ignore
+from .. import config
+from ..database import SessionLocal
+from ..models.database import Conversation
+from . import leases
+from .export import COLUMNS, ndjson_lines
+
+logger = logging.getLogger(__name__)
+
+_SELECTED = tuple(getattr(Conversation, name) for name in COLUMNS)
+_LEASE = "retention"
+_LEASE_SECONDS = 600  # renewed every batch; only runs out if the purging process dies
+
+
+class PurgeInProgress(RuntimeError):
+    """Another process is purging right now."""
+
+
+def _archive_path(cutoff: datetime, run: str) -> str:
+    name = f"conversations-before-{cutoff:%Y%m%d}-{datetime.utcnow():%Y%m%dT%H%M%S}-{run}.ndjson.gz"
+    return os.path.join(config.RETENTION_ARCHIVE_DIR, name)
+
+
+def purge_conversations(days: int, archive: bool = True, batch_size: int | None = None,
+                        pause_ms: int | None = None, dry_run: bool = False) -> dict:
+    """Archive (unless archive=False) and delete conversations older than ``days`` days."""
+    if days <= 0:
+        raise ValueError("days must be positive")
+    batch_size = batch_size or config.RETENTION_BATCH_SIZE
+    pause = (config.RETENTION_PAUSE_MS if pause_ms is None else pause_ms) / 1000
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    report = {"cutoff": cutoff.isoformat(), "deleted": 0, "batches": 0, "archive": None, "dry_run": dry_run}
+
+    if dry_run:
+        db = SessionLocal()
+        try:
+            report["matched"] = db.query(Conversation).filter(Conversation.timestamp < cutoff).count()
+        finally:
+            db.close()
+        return report
+
+    holder = leases.new_holder()
+    if not leases.acquire(_LEASE, _LEASE_SECONDS, holder):
+        raise PurgeInProgress("another retention purge is running")
+    archive_file = None
+    try:
+        if archive:
+            report["archive"] = _archive_path(cutoff, holder.rsplit(":", 1)[1])
+            os.makedirs(config.RETENTION_ARCHIVE_DIR, exist_ok=True)
+            archive_file = gzip.open(report["archive"], "xb")
+    except BaseException:
+        leases.release(_LEASE, holder)
+        raise
+    started = time.perf_counter()
+    try:
+        while True:
+            if not leases.acquire(_LEASE, _LEASE_SECONDS, holder):
+                logger.error("Retention lease lost; stopping after %d batches", report["batches"])
+                break
+            db = SessionLocal()
+            try:
+                rows = (
+                    db.query(*_SELECTED)
+                    .filter(Conversation.timestamp < cutoff)
+                    .order_by(Conversation.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not rows:
+                    break
+                if archive_file is not None:
+                    for line in ndjson_lines(dict(zip(COLUMNS, row)) for row in rows):
+                        archive_file.write(line)
+                    archive_file.flush()
+                    os.fsync(archive_file.fileobj.fileno())
+                ids = [row[0] for row in rows]
+                db.execute(delete(Conversation).where(Conversation.id.in_(ids)))
+                db.commit()
+            finally:
+                db.close()
+            report["deleted"] += len(ids)
+            report["batches"] += 1
+            if len(rows) < batch_size:
+                break
+            # Let queued /ask writes take the lock between batches
+            time.sleep(pause)
+    finally:
+        if archive_file is not None:
+            archive_file.close()
+            if not report["deleted"]:
+                os.unlink(report["archive"])
+                report["archive"] = None
+        leases.release(_LEASE, holder)
+    report["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+    logger.info("Retention: %s", report)
+    return report
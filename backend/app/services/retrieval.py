@@ -0,0 +1,265 @@
+"""
+Section-level retrieval over the college information sheet.
+
+COLLEGE_INFO is split on its ``=== SECTION ===`` headers into an in-memory
+BM25 index built once at import. For each question only the best-scoring
+sections (within a token budget) go into the system prompt; when nothing
+scores well the full sheet is used, so answers never lose context.
+
+With SHARED_INDEX_ENABLED (multi-worker deployments) the index including
+ingested chunks lives in a memory-mapped file instead; see knowledge_index.
+"""
+import hashlib
+import logging
+import math
+import re
+import time
+from collections import Counter
+from .. import config
+from ..data.college_data import COLLEGE_INFO
+from ..models.database import Document, DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+_SECTION_HEADER = re.compile(r"^===\s*(.+?)\s*===\s*$", re.MULTILINE)
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or "
+    "the there this to what when where which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens with stopwords dropped and a light plural strip (fees -> fee)."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap LLM token estimate (~4 characters per token for English)."""
+    return max(1, len(text) // 4)
+
+
+def split_sections(text: str) -> list[tuple[str, str]]:
+    """Split the sheet into (title, section text) pairs on its ``=== TITLE ===`` headers."""
+    headers = list(_SECTION_HEADER.finditer(text))
+    sections = []
+    for i, match in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        body = text[match.start():end].strip()
+        if body:
+            sections.append((match.group(1).strip(), body))
+    return sections
+
+
+class IndexClosed(Exception):
+    """The index was unmapped after a swap; read the current ``section_index`` instead."""
+
+
+class Retriever:
+    """Context selection shared by the in-memory and the memory-mapped index.
+
+    Subclasses provide ``score``, ``passages[i] -> (title, text)``, ``token_counts``,
+    ``full_text`` and ``version``.
+    """
+
+    def score(self, question: str) -> list[tuple[float, int]]:
+        raise NotImplementedError
+
+    def select_context(self, question: str, top_k: int | None = None, token_budget: int | None = None,
+                       min_score: float | None = None) -> str:
+        """Best top-k passages that fit in token_budget, or the full text if nothing scores min_score."""
+        top_k = config.RETRIEVAL_TOP_K if top_k is None else top_k
+        token_budget = config.RETRIEVAL_TOKEN_BUDGET if token_budget is None else token_budget
+        min_score = config.RETRIEVAL_MIN_SCORE if min_score is None else min_score
+
+        ranked = [(s, i) for s, i in self.score(question) if s >= min_score]
+        if not ranked:
+            return self.full_text
+        chosen = []
+        used = 0
+        for _, i in ranked[:top_k]:
+            if chosen and used + self.token_counts[i] > token_budget:
+                continue
+            chosen.append(i)
+            used += self.token_counts[i]
+        # Keep the sheet's original order so related sections read naturally
+        return "\n\n".join(self.passages[i][1] for i in sorted(chosen))
+
+
+class SectionIndex(Retriever):
+    """BM25 (Okapi) index over a list of (title, text) passages, with term postings for fast scoring."""
+
+    def __init__(self, passages: list[tuple[str, str]], full_text: str, k1: float = 1.5, b: float = 0.75):
+        self.passages = passages
+        self.full_text = full_text
+        self.version = ""
+        self.k1 = k1
+        self.b = b
+        self.token_counts = [estimate_tokens(text) for _, text in passages]
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        doc_lens = []
+        for i, (title, text) in enumerate(passages):
+            # Titles are short and precise, so repeat them to weight header matches up
+            tf = Counter(tokenize(title) * 3 + tokenize(text))
+            doc_lens.append(sum(tf.values()))
+            for term, freq in tf.items():
+                self.postings.setdefault(term, []).append((i, freq))
+        avg_len = (sum(doc_lens) / len(doc_lens)) if doc_lens else 0.0
+        # Per-passage length normalisation is fixed at build time
+        self.norms = [k1 * (1 - b + b * n / avg_len) if avg_len else k1 for n in doc_lens]
+        n = len(passages)
+        self.idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self.postings.items()}
+
+    def score(self, question: str) -> list[tuple[float, int]]:
+        """Return (score, passage index) pairs for passages that match, best first."""
+        totals: dict[int, float] = {}
+        for term in set(tokenize(question)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for i, freq in postings:
+                totals[i] = totals.get(i, 0.0) + idf * freq * (self.k1 + 1) / (freq + self.norms[i])
+        return sorted(((score, i) for i, score in totals.items()), reverse=True)
+
+
+def build_index(extra_passages: list[tuple[str, str]] = ()) -> SectionIndex:
+    """Index the sheet's sections plus any ingested document chunks.
+
+    The full-sheet fallback stays COLLEGE_INFO only; an ingested corpus can be
+    far too large to send whole.
+    """
+    index = SectionIndex(split_sections(COLLEGE_INFO) + list(extra_passages), COLLEGE_INFO.strip())
+    # Fingerprint of everything the LLM can be told; caches key on it so edits invalidate them
+    digest = hashlib.sha256(COLLEGE_INFO.encode("utf-8"))
+    for title, text in extra_passages:
+        digest.update(b"\x1f" + title.encode("utf-8") + b"\x1e" + text.encode("utf-8"))
+    index.version = digest.hexdigest()[:16]
+    return index
+
+
+# Built once at import; rebuilt only when ingested documents change
+section_index: Retriever = build_index()
+
+# Held by the one worker that builds a missing shared index at startup
+_BUILD_LEASE = "knowledge-index-build"
+_BUILD_LEASE_SECONDS = 300
+
+
+def _swap(index: Retriever) -> None:
+    """Serve ``index`` from now on and unmap the one it replaces."""
+    global section_index
+    old, section_index = section_index, index
+    if old is not index and hasattr(old, "close"):
+        old.close()
+
+
+def _publish(index: SectionIndex) -> Retriever:
+    """In shared mode, compile ``index`` to SHARED_INDEX_PATH and return its mapping instead."""
+    if not config.SHARED_INDEX_ENABLED:
+        return index
+    from .knowledge_index import MappedSectionIndex, write_index
+    write_index(index, config.SHARED_INDEX_PATH, COLLEGE_INFO)
+    return MappedSectionIndex(config.SHARED_INDEX_PATH)
+
+
+def _read_document_chunks(db) -> list[tuple[str, str]]:
+    rows = (
+        db.query(Document.title, DocumentChunk.chunk_text)
+        .join(DocumentChunk, DocumentChunk.document_id == Document.id)
+        .filter(Document.is_active == True)  # noqa: E712
+        .order_by(Document.id, DocumentChunk.chunk_index)
+        .yield_per(1000)
+    )
+    return [(title or "", text) for title, text in rows if text]
+
+
+def load_document_chunks(db) -> int:
+    """Rebuild the index with the active DocumentChunk rows. Returns the number of chunks indexed.
+
+    In shared mode the new file replaces the old one atomically and the other
+    workers switch to it on their next ``refresh_shared_index``.
+    """
+    passages = _read_document_chunks(db)
+    # Swap in a fully built index so concurrent readers never see a partial one
+    _swap(_publish(build_index(passages)))
+    logger.info("Retrieval index rebuilt with %d document chunks", len(passages))
+    return len(passages)
+
+
+def _map_current() -> Retriever | None:
+    """The published shared index if it was built from this COLLEGE_INFO, else None."""
+    from .knowledge_index import MappedSectionIndex, sheet_digest
+    try:
+        mapped = MappedSectionIndex(config.SHARED_INDEX_PATH)
+    except (FileNotFoundError, ValueError) as e:
+        logger.info(f"No usable shared knowledge index: {e}")
+        return None
+    if mapped.sheet_digest != sheet_digest(COLLEGE_INFO):
+        mapped.close()
+        return None
+    return mapped
+
+
+def attach_shared_index(db) -> bool:
+    """Worker startup in shared mode: map the existing index file, building it only if it is
+    missing, unreadable or was built from a different COLLEGE_INFO. True if this worker built it.
+
+    One worker builds, under a lease; the others wait for its pointer and map the result.
+    """
+    from . import leases
+    while True:
+        mapped = _map_current()
+        if mapped is not None:
+            _swap(mapped)
+            logger.info("Mapped shared knowledge index %s (version %s, %d passages)",
+                        config.SHARED_INDEX_PATH, mapped.version, mapped.passage_count)
+            return False
+        if leases.acquire(_BUILD_LEASE, _BUILD_LEASE_SECONDS):
+            break
+        time.sleep(0.5)  # another worker is building it
+    try:
+        # It may have been published between our check and taking the lease
+        mapped = _map_current()
+        if mapped is not None:
+            _swap(mapped)
+            return False
+        logger.info("Building shared knowledge index")
+        load_document_chunks(db)
+        return True
+    finally:
+        leases.release(_BUILD_LEASE)
+
+
+def refresh_shared_index() -> bool:
+    """Switch to a rebuilt shared index file if there is one. True if the index changed."""
+    if not config.SHARED_INDEX_ENABLED or not hasattr(section_index, "is_stale") or not section_index.is_stale():
+        return False
+    from .knowledge_index import MappedSectionIndex
+    _swap(MappedSectionIndex(config.SHARED_INDEX_PATH))
+    logger.info("Switched to rebuilt knowledge index (version %s)", section_index.version)
+    return True
+
+
+def knowledge_version() -> str:
+    """Short hash of the current knowledge text (COLLEGE_INFO plus ingested chunks)."""
+    return section_index.version
+
+
+def get_college_context(question: str | None) -> str:
+    """Knowledge text for the system prompt: pruned to relevant sections when retrieval is on."""
+    if not question or not config.RETRIEVAL_ENABLED:
+        return COLLEGE_INFO
+    while True:
+        index = section_index
+        try:
+            return index.select_context(question)
+        except IndexClosed:
+            continue  # swapped for a rebuilt index just now
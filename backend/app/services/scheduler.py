@@ -0,0 +1,311 @@
+"""
+Admission control for upstream calls (Groq, Google Translate).
+
+Each upstream gets an ``UpstreamScheduler`` with token buckets that mirror
+its rate limits: requests per minute, plus tokens per minute for Groq. A
+call that fits the buckets goes straight through. Otherwise it waits in a
+bounded queue until the buckets refill, for at most its deadline. Waiters
+are grouped by session and the queue is served round-robin across sessions,
+so one client (or one /ask/batch run) firing many questions cannot starve
+everyone else.
+
+Calls that cannot be served in time are rejected right away with
+``SchedulerRejected`` and not sent upstream:
+
+- "queue_full": the queue already holds ``max_queue`` waiters
+- "session_limit": this session already has ``per_session`` waiters
+- "deadline": the queue ahead would not drain before the deadline, or the
+  deadline passed while waiting
+
+The callers degrade instead of failing: the LLM router fails over to the
+next provider (the local intent engine last), and translation falls back to
+the untranslated text. A 429 from upstream pauses the scheduler for the
+Retry-After the upstream asked for, and the buckets never hold more than
+the upstream's x-ratelimit-remaining-* headers say is left.
+
+Limits are for the whole API key; each of ``workers`` processes takes an
+equal share.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+from .metrics import Counter, Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+QUEUE_WAIT_SECONDS = registry.register(Histogram(
+    "chatbot_scheduler_wait_seconds", "Time upstream calls waited for admission", ("upstream",),
+))
+REJECTIONS = registry.register(Counter(
+    "chatbot_scheduler_rejections_total", "Upstream calls rejected by admission control", ("upstream", "reason"),
+))
+
+
+class SchedulerRejected(Exception):
+    """The call was not admitted; reason is "queue_full", "session_limit" or "deadline"."""
+
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream} call rejected ({reason})")
+        self.upstream = upstream
+        self.reason = reason
+
+
+class _Admission:
+    __slots__ = ("session", "max_wait", "per_session")
+
+    def __init__(self, session: str, max_wait: float | None, per_session: int | None):
+        self.session = session
+        self.max_wait = max_wait
+        self.per_session = per_session
+
+
+_current: contextvars.ContextVar[_Admission | None] = contextvars.ContextVar("upstream_admission", default=None)
+
+
+def admit_as(session_id: str, max_wait: float | None = None, per_session: int | None = None) -> None:
+    """Attribute upstream calls made by the current task to session_id.
+
+    max_wait and per_session override the schedulers' defaults, e.g. for batch
+    runs that would rather wait than get a degraded answer.
+    """
+    _current.set(_Admission(session_id, max_wait, per_session))
+
+
+class TokenBucket:
+    """``per_minute`` tokens, refilled continuously; holds at most one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` tokens are available (0 if they are now)."""
+        self._refill(now)
+        # A call larger than the whole bucket only needs a full bucket
+        missing = min(amount, self.capacity) - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= amount
+
+    def give_back(self, amount: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def clamp(self, most: float, now: float) -> None:
+        self._refill(now)
+        self.tokens = min(self.tokens, most)
+
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "deadline", "session", "queued_at")
+
+    def __init__(self, future: asyncio.Future, tokens: float, deadline: float, session: str):
+        self.future = future
+        self.tokens = tokens
+        self.deadline = deadline
+        self.session = session
+        self.queued_at = time.monotonic()
+
+
+class UpstreamScheduler:
+    def __init__(self, name: str, requests_per_minute: int, tokens_per_minute: int = 0,
+                 max_queue: int = 64, max_wait: float = 5.0, per_session: int = 4, enabled: bool = True,
+                 workers: int = 1):
+        self.name = name
+        self.enabled = enabled
+        self.requests = TokenBucket(requests_per_minute / workers) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute / workers) if tokens_per_minute > 0 else None
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.per_session = per_session
+        self._sessions: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self._queued = 0
+        self._paused_until = 0.0
+        self._wake: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task | None = None
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected: dict[str, int] = {}
+
+    def _wait_time(self, tokens: float, now: float) -> float:
+        wait = max(0.0, self._paused_until - now)
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return wait
+
+    def _take(self, tokens: float) -> None:
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None and tokens:
+            self.tokens.take(tokens)
+        self.admitted += 1
+
+    def _backlog_seconds(self, session: str, tokens: float, now: float) -> float:
+        """Rough time until a new waiter of ``session`` would be admitted.
+
+        With round-robin service, only the first k waiters of every session are
+        ahead of it, k being its place in its own session's queue.
+        """
+        own = self._sessions.get(session)
+        place = len(own) + 1 if own else 1
+        ahead = [w for queue in self._sessions.values() for w in islice(queue, place)]
+        wait = max(0.0, self._paused_until - now)
+        if self.requests is not None:
+            wait = max(wait, (len(ahead) + 1 - self.requests.tokens) / self.requests.rate)
+        if self.tokens is not None and tokens:
+            ahead_tokens = sum(w.tokens for w in ahead)
+            wait = max(wait, (ahead_tokens + min(tokens, self.tokens.capacity) - self.tokens.tokens) / self.tokens.rate)
+        return wait
+
+    def _reject(self, reason: str) -> SchedulerRejected:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        REJECTIONS.inc(self.name, reason)
+        return SchedulerRejected(self.name, reason)
+
+    async def acquire(self, tokens: float = 0) -> None:
+        """Wait until one call costing ``tokens`` fits the limits, or raise SchedulerRejected."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if not self._queued and self._wait_time(tokens, now) == 0:
+            self._take(tokens)
+            QUEUE_WAIT_SECONDS.observe(0.0, self.name)
+            return
+        admission = _current.get()
+        session = admission.session if admission is not None else ""
+        max_wait = admission.max_wait if admission is not None and admission.max_wait is not None else self.max_wait
+        per_session = admission.per_session if admission is not None and admission.per_session is not None else self.per_session
+        if self._queued >= self.max_queue:
+            raise self._reject("queue_full")
+        waiting = self._sessions.get(session)
+        if session and waiting is not None and len(waiting) >= per_session:
+            raise self._reject("session_limit")
+        if self._backlog_seconds(session, tokens, now) > max_wait:
+            raise self._reject("deadline")
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), tokens, now + max_wait, session)
+        self._sessions.setdefault(session, deque()).append(waiter)
+        self._queued += 1
+        self.queued_total += 1
+        self._ensure_dispatcher()
+        self._wake.set()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            self._remove(waiter)
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                self._give_back(tokens)  # admitted just as the caller went away
+            raise
+        QUEUE_WAIT_SECONDS.observe(time.monotonic() - waiter.queued_at, self.name)
+
+    def _give_back(self, tokens: float) -> None:
+        if self.requests is not None:
+            self.requests.give_back(1)
+        if self.tokens is not None and tokens:
+            self.tokens.give_back(tokens)
+
+    def settle(self, estimated: float, actual: float | None) -> None:
+        """Correct the token bucket once the upstream reports what a call really cost."""
+        if not self.enabled or self.tokens is None or actual is None:
+            return
+        if actual < estimated:
+            self.tokens.give_back(estimated - actual)
+        else:
+            self.tokens.take(actual - estimated)
+
+    def pause(self, seconds: float) -> None:
+        """Admit nothing for ``seconds`` (the upstream answered 429)."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if now + seconds > self._paused_until:
+            logger.warning(f"{self.name} rate limited upstream; pausing admissions for {seconds:.1f}s")
+            self._paused_until = now + seconds
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.clamp(0.0, now)
+
+    def sync(self, remaining_requests: float | None, remaining_tokens: float | None) -> None:
+        """Never assume more budget than the upstream reports left (its count covers every worker)."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        for bucket, remaining in ((self.requests, remaining_requests), (self.tokens, remaining_tokens)):
+            if bucket is not None and remaining is not None:
+                bucket.clamp(remaining, now)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        queue = self._sessions.get(waiter.session)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self._queued -= 1
+        if not queue:
+            del self._sessions[waiter.session]
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wake = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    def _expire(self, now: float) -> None:
+        for queue in list(self._sessions.values()):
+            for waiter in [w for w in queue if w.deadline <= now]:
+                self._remove(waiter)
+                if not waiter.future.done():
+                    waiter.future.set_exception(self._reject("deadline"))
+
+    def _next(self) -> _Waiter:
+        # Round-robin: the session at the front goes to the back once served
+        return next(iter(self._sessions.values()))[0]
+
+    async def _dispatch(self) -> None:
+        while True:
+            if not self._queued:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            now = time.monotonic()
+            self._expire(now)
+            if not self._queued:
+                continue
+            waiter = self._next()
+            wait = self._wait_time(waiter.tokens, now)
+            if wait > 0:
+                # Sleep until the tokens are there, waking early to drop expired waiters
+                nearest = min(q[0].deadline for q in self._sessions.values())
+                await asyncio.sleep(max(0.001, min(wait, nearest - now)))
+                continue
+            self._remove(waiter)
+            if waiter.session in self._sessions:
+                self._sessions.move_to_end(waiter.session)
+            if not waiter.future.done():
+                self._take(waiter.tokens)
+                waiter.future.set_result(None)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "queued": self._queued,
+            "sessions_waiting": len(self._sessions),
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait,
+            "paused_seconds": round(max(0.0, self._paused_until - now), 1),
+            "requests_available": round(self.requests.tokens, 1) if self.requests is not None else None,
+            "tokens_available": round(self.tokens.tokens, 1) if self.tokens is not None else None,
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected": dict(self.rejected),
+        }
@@ -0,0 +1,82 @@
+"""
+Split an answer into translatable segments without losing its layout.
+
+LLM answers are short paragraphs, bullet lists and numbered steps. ``split``
+cuts the text at line breaks and list markers, then at sentence ends, and
+marks the pieces that need translating; newlines, bullets ("-", "*", "•"),
+numbering ("1.", "2)"), headings ("##") and the whitespace between
+sentences are kept verbatim. Consecutive sentences of one line are grouped
+up to ``max_chars`` so a short answer is still a single upstream call.
+
+Joining the pieces in order (each translatable one replaced by its
+translation) rebuilds the answer with the original structure.
+"""
+import re
+
+_LINE_BREAK = re.compile(r"(\n+)")
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•·]|\d{1,3}[.)]|#{1,6})\s+")
+_SENTENCE_GAP = re.compile(r"(?<=[.!?])\s+")
+
+# A period after these does not end a sentence ("Rs. 45,000", "Dr. Sharma")
+_ABBREVIATIONS = frozenset("rs dr mr mrs ms prof no nos st sr jr vs etc approx dept govt e.g i.e".split())
+
+
+def _sentences(line: str) -> list[tuple[str, str]]:
+    """(sentence, whitespace after it) pairs of one line."""
+    parts = []
+    last = 0
+    for match in _SENTENCE_GAP.finditer(line):
+        sentence = line[last:match.start()]
+        last_word = sentence.rsplit(None, 1)[-1].rstrip(".").lower() if sentence.strip() else ""
+        if last_word in _ABBREVIATIONS:
+            continue
+        parts.append((sentence, match.group(0)))
+        last = match.end()
+    parts.append((line[last:], ""))
+    return parts
+
+
+def split(text: str, max_chars: int = 400) -> list[tuple[str, bool]]:
+    """Pieces of text in order, each with True when it should be translated."""
+    pieces: list[tuple[str, bool]] = []
+
+    def keep(piece: str) -> None:
+        if piece:
+            pieces.append((piece, False))
+
+    for line in _LINE_BREAK.split(text):
+        if not line.strip():
+            keep(line)
+            continue
+        marker = _LIST_MARKER.match(line)
+        body = line
+        if marker:
+            keep(marker.group(0))
+            body = line[marker.end():]
+        stripped = body.strip()
+        start = body.index(stripped)
+        keep(body[:start])
+        group = ""
+        for sentence, gap in _sentences(stripped):
+            if group and len(group) + len(sentence) > max_chars:
+                pieces.append((group.rstrip(), True))
+                keep(group[len(group.rstrip()):])
+                group = ""
+            group += sentence + gap
+        pieces.append((group.rstrip(), True))
+        keep(group[len(group.rstrip()):])
+        keep(body[start + len(stripped):])
+    return pieces
+
+
+def join(pieces: list[tuple[str, bool]], translations: list[str | None]) -> str:
+    """Rebuild the text; translations holds one entry (None = keep the original) per translatable piece."""
+    out = []
+    results = iter(translations)
+    for piece, translatable in pieces:
+        if translatable:
+            translated = next(results)
+            out.append(piece if translated is None else translated)
+        else:
+            out.append(piece)
+    return "".join(out)
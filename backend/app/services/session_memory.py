@@ -0,0 +1,160 @@
+"""
+Bounded per-session conversation memory for multi-turn context.
+
+Each session keeps a ring buffer of its last SESSION_MEMORY_TURNS
+(question, answer) turns. Sessions are evicted least-recently-used once
+there are more than SESSION_MEMORY_MAX_SESSIONS of them or their text
+exceeds SESSION_MEMORY_MAX_BYTES. A session that is not in memory (restart,
+eviction, another worker) is rehydrated once from ``conversations`` via the
+(session_id, timestamp) index; after that it is served from memory, so
+requests never query the database for history. Turns are kept (and
+rehydrated) in English, the language the LLM sees them in.
+"""
+import re
+import threading
+from collections import OrderedDict, deque
+from sqlalchemy import func #type: ignore
+from sqlalchemy.orm import Session #type: ignore
+from .. import config
+from ..models.database import Conversation
+from .retrieval import estimate_tokens, tokenize
+
+Turn = tuple[str, str]
+
+_FOLLOW_UP_STARTS = ("and ", "what about ", "how about ", "also ", "same for ", "for ", "then ", "aur ", "or ")
+# Pronouns that need an antecedent. "this" and "there" are left out: "is there a hostel?"
+# and "what is this college's fee?" stand on their own.
+_REFERENCE_WORDS = frozenset("it its that they them their those these same".split())
+_WORD = re.compile(r"\w+")
+
+
+def is_follow_up(question: str) -> bool:
+    """True for questions that lean on earlier turns ("and for MBA?", "what is its fee?")."""
+    text = question.strip().lower()
+    if not text:
+        return False
+    if text.startswith(_FOLLOW_UP_STARTS):
+        return True
+    words = _WORD.findall(text)
+    references = [i for i, word in enumerate(words) if word in _REFERENCE_WORDS]
+    content = [word for word in tokenize(text) if word not in _REFERENCE_WORDS]
+    # A pronoun in the opening words ("its fee?", "does it have a gym?") or next to at most
+    # one keyword ("how much is that?", "what is the fee for it?")
+    if references and (references[0] < 3 or len(content) <= 1):
+        return True
+    # A lone keyword ("mba?") only makes sense as a continuation
+    return len(words) <= 2 and len(content) <= 1
+
+
+def _turn_size(turn: Turn) -> int:
+    return len(turn[0]) + len(turn[1])
+
+
+class SessionMemory:
+    def __init__(self, max_turns: int | None = None, max_sessions: int | None = None, max_bytes: int | None = None):
+        self.enabled = config.SESSION_MEMORY_ENABLED
+        self.max_turns = max_turns or config.SESSION_MEMORY_TURNS
+        self.max_sessions = max_sessions or config.SESSION_MEMORY_MAX_SESSIONS
+        self.max_bytes = max_bytes or config.SESSION_MEMORY_MAX_BYTES
+        self._sessions: OrderedDict[str, deque[Turn]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.rehydrations = 0
+        self.evictions = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def _evict(self) -> None:
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+            _, turns = self._sessions.popitem(last=False)
+            self._bytes -= sum(_turn_size(t) for t in turns)
+            self.evictions += 1
+
+    def _push(self, turns: deque, turn: Turn) -> None:
+        if len(turns) == turns.maxlen:
+            self._bytes -= _turn_size(turns[0])
+        turns.append(turn)
+        self._bytes += _turn_size(turn)
+
+    def turns(self, session_id: str) -> list[Turn] | None:
+        """All remembered turns, oldest first; None if the session is not in memory."""
+        with self._lock:
+            turns = self._sessions.get(session_id)
+            if turns is None:
+                return None
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            return list(turns)
+
+    def load(self, session_id: str, turns: list[Turn]) -> None:
+        """Install a session's turns (oldest first), e.g. after rehydrating from the database."""
+        with self._lock:
+            if session_id in self._sessions:
+                return
+            buffer = deque(maxlen=self.max_turns)
+            for turn in turns[-self.max_turns:]:
+                self._push(buffer, turn)
+            self._sessions[session_id] = buffer
+            self._evict()
+
+    def append(self, session_id: str, question: str, answer: str, create: bool = True) -> None:
+        """Record one exchange. With create=False, sessions not in memory are left for rehydration."""
+        if not self.enabled:
+            return
+        with self._lock:
+            turns = self._sessions.get(session_id)
+            if turns is None:
+                if not create:
+                    return
+                turns = self._sessions[session_id] = deque(maxlen=self.max_turns)
+            self._sessions.move_to_end(session_id)
+            self._push(turns, (question, answer))
+            self._evict()
+
+    def rehydrate(self, db: Session, session_id: str) -> list[Turn]:
+        """Load a session's last turns from the conversations table into memory.
+
+        Rows saved before question_en/llm_answer existed fall back to the user-language text.
+        """
+        rows = (
+            db.query(func.coalesce(Conversation.question_en, Conversation.user_message),
+                     func.coalesce(Conversation.llm_answer, Conversation.bot_response))
+            .filter(Conversation.session_id == session_id)
+            .order_by(Conversation.timestamp.desc())
+            .limit(self.max_turns)
+            .all()
+        )
+        turns = [(q or "", a or "") for q, a in reversed(rows)]
+        self.rehydrations += 1
+        self.load(session_id, turns)
+        return turns
+
+    @staticmethod
+    def trim(turns: list[Turn], token_budget: int | None = None) -> list[Turn]:
+        """Most recent turns whose estimated tokens fit in token_budget, oldest first."""
+        token_budget = config.SESSION_HISTORY_TOKEN_BUDGET if token_budget is None else token_budget
+        kept, used = [], 0
+        for question, answer in reversed(turns):
+            cost = estimate_tokens(question) + estimate_tokens(answer)
+            if used + cost > token_budget:
+                break
+            kept.append((question, answer))
+            used += cost
+        kept.reverse()
+        return kept
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "rehydrations": self.rehydrations,
+            "evictions": self.evictions,
+        }
+
+
+session_memory = SessionMemory()
@@ -0,0 +1,81 @@
+"""
+Single-flight coalescing of identical in-flight upstream calls.
+
+When the same question arrives many times at once (a notice just went out),
+the first caller starts the upstream call as its own task and everyone else
+with the same key awaits that task instead of starting another one. Errors
+reach every waiter. A caller that is cancelled (client disconnected) only
+stops waiting; the shared call is cancelled once nobody is waiting for it.
+Keys are forgotten as soon as the call finishes, so this never serves stale
+results - caching stays the job of the answer cache and translation memo.
+"""
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+from .. import config
+from .metrics import COALESCED_CALLS
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self.enabled = config.COALESCE_ENABLED
+        self._calls: dict[str, _Call] = {}
+        self.calls = 0
+        self.collapsed = 0
+        self.errors = 0
+        self.abandoned = 0
+
+    def _finished(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if call.task.cancelled():
+            return
+        if call.task.exception() is not None:
+            # Retrieved here so an error nobody waited for is not logged as "never retrieved"
+            self.errors += 1
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Return fn()'s result, sharing one call among concurrent callers with the same key."""
+        if not self.enabled:
+            return await fn()
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda _, key=key, call=call: self._finished(key, call))
+            self.calls += 1
+        else:
+            self.collapsed += 1
+            COALESCED_CALLS.inc(self.name)
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done() and call.waiters == 1:
+                # Last one waiting: stop the upstream call and let the next caller start afresh
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                call.task.cancel()
+                self.abandoned += 1
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+            "errors": self.errors,
+            "abandoned": self.abandoned,
+        }
@@ -0,0 +1,95 @@
+"""
+Aho-Corasick multi-pattern matcher.
+
+All patterns are compiled once into one automaton, so a question is scanned
+in a single pass no matter how many keywords are registered. Used by the
+local intent engine and the admin override matcher.
+"""
+import re
+from collections import deque
+from typing import Any, Iterable, Iterator
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, punctuation to spaces, single-spaced: the form patterns are matched against."""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+class AhoCorasick:
+    """Character-level Aho-Corasick automaton mapping patterns to payloads.
+
+    A pattern may be added more than once with different payloads; every
+    payload is reported for each occurrence.
+    """
+
+    def __init__(self, patterns: Iterable[tuple[str, Any]] = ()):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[tuple[int, Any]]] = [[]]
+        self.pattern_count = 0
+        for pattern, payload in patterns:
+            self._add(pattern, payload)
+        self._build()
+
+    def _add(self, pattern: str, payload: Any) -> None:
+        if not pattern:
+            return
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), payload))
+        self.pattern_count += 1
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # Inherit the outputs of the longest proper suffix that is also a pattern
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[tuple[int, int, Any]]:
+        """Yield (start, end, payload) for every pattern occurrence in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, payload in out[state]:
+                yield i + 1 - length, i + 1, payload
+
+    def iter_word_matches(self, text: str, allow_plural: bool = True) -> Iterator[tuple[int, int, Any]]:
+        """Like iter_matches, but only whole-word occurrences in normalized text.
+
+        With allow_plural, a trailing "s"/"es" after the pattern still counts
+        ("requirement" matches "requirements").
+        """
+        n = len(text)
+        for start, end, payload in self.iter_matches(text):
+            if start > 0 and text[start - 1] != " ":
+                continue
+            if end == n or text[end] == " ":
+                yield start, end, payload
+                continue
+            if allow_plural:
+                for suffix in ("s", "es"):
+                    stop = end + len(suffix)
+                    if text[end:stop] == suffix and (stop == n or text[stop] == " "):
+                        yield start, stop, payload
+                        break
@@ -1,20 +1,77 @@
 """
 Translation service using Google Translate
 """
-from googletrans import Translator, LANGUAGES
+import asyncio
 import logging
+import threading
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import time
+from .. import config
+from . import http_client
+from .scheduler import SchedulerRejected, UpstreamScheduler
+from .singleflight import SingleFlight
+from .translation_cache import TranslationMemo
+from . import language_detect, segments, transliterate
+from .metrics import translation_fallback
 
 logger = logging.getLogger(__name__)
 
 class TranslationService:
     def __init__(self):
-        self.translator = Translator()
-        self.executor = ThreadPoolExecutor(max_workers=2)
+        # The googletrans clients and their thread pool serve only the sync methods;
+        # /ask uses the async gtx path, so both are built on first use. Every pool
+        # thread gets its own client, so TRANSLATE_POOL_SIZE calls run in parallel
+        self._clients = threading.local()
+        self._executor: ThreadPoolExecutor | None = None
+        self.memo = TranslationMemo()
+        self.inflight = SingleFlight("translate")
+        self.scheduler = UpstreamScheduler(
+            "translate", config.TRANSLATE_RPM_LIMIT,
+            max_queue=config.TRANSLATE_QUEUE_SIZE, max_wait=config.TRANSLATE_QUEUE_TIMEOUT,
+            per_session=config.SCHEDULER_SESSION_QUEUE, enabled=config.SCHEDULER_ENABLED,
+            workers=config.SCHEDULER_WORKERS,
+        )
+
+    @property
+    def translator(self):
+        """The calling thread's googletrans client."""
+        client = getattr(self._clients, "translator", None)
+        if client is None:
+            from googletrans import Translator
+            client = self._clients.translator = Translator()
+        return client
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=config.TRANSLATE_POOL_SIZE, thread_name_prefix="translate")
+        return self._executor
+
+    def _memoized(self, op: str, src: str, dest: str, text: str, compute):
+        """Return a memoized result, or compute and store it. compute returns None for fallbacks, which are not stored."""
+        cached = self.memo.get(op, src, dest, text)
+        if cached is not None:
+            return cached
+        value = compute()
+        if value is not None:
+            self.memo.set(op, src, dest, text, value)
+        return value
+
+    async def _memoized_async(self, op: str, src: str, dest: str, text: str, compute):
+        """Like _memoized; concurrent misses for the same key share one upstream call."""
+        cached = await self.memo.get_async(op, src, dest, text)
+        if cached is not None:
+            return cached
+
+        async def _compute_and_store():
+            value = await compute()
+            if value is not None:
+                self.memo.set(op, src, dest, text, value)
+            return value
+        return await self.inflight.do(self.memo.make_key(op, src, dest, text), _compute_and_store)
         
-    def _detect_with_timeout(self, text: str, timeout: int = 5) -> str:
-        """Detect language with timeout"""
+    def _detect_with_timeout(self, text: str, timeout: int = 5) -> str | None:
+        """Detect language with timeout. Returns None on timeout."""
         def _detect():
             return self.translator.detect(text).lang
         
@@ -23,18 +80,32 @@ class TranslationService:
             return future.result(timeout=timeout)
         except FutureTimeoutError:
             logger.warning(f"Language detection timed out after {timeout}s")
-            return "en"
+            translation_fallback("detect", "timeout")
+            return None
         
+    def _detect_locally(self, text: str) -> str | None:
+        """Offline script/marker-word detection; None when not confident enough."""
+        if not config.LOCAL_DETECT_ENABLED:
+            return None
+        lang, confidence = language_detect.detect(text)
+        return lang if confidence >= config.LOCAL_DETECT_MIN_CONFIDENCE else None
+
     def detect_language(self, text: str) -> str:
         """Detect the language of input text with timeout"""
+        local = self._detect_locally(text)
+        if local is not None:
+            return local
         try:
-            return self._detect_with_timeout(text, timeout=5)
+            lang = self._memoized("detect", "auto", "", text,
+                                  lambda: self._detect_with_timeout(text, timeout=config.TRANSLATE_DETECT_TIMEOUT))
+            return lang or "en"
         except Exception as e:
             logger.error(f"Language detection failed: {e}")
+            translation_fallback("detect", "error")
             return "en"  # default to English
     
-    def _translate_with_timeout(self, text: str, src: str, dest: str, timeout: int = 8) -> str:
-        """Translate with timeout"""
+    def _translate_with_timeout(self, text: str, src: str, dest: str, timeout: int = 8) -> str | None:
+        """Translate with timeout. Returns None on timeout."""
         def _translate():
             return self.translator.translate(text, src=src, dest=dest).text
         
@@ -43,7 +114,8 @@ class TranslationService:
             return future.result(timeout=timeout)
         except FutureTimeoutError:
             logger.warning(f"Translation timed out after {timeout}s")
-            return text
+            translation_fallback("translate", "timeout")
+            return None
     
     def translate_to_english(self, text: str, source_lang: str = None) -> str:
         """Translate text to English with timeout"""
@@ -54,34 +126,172 @@ class TranslationService:
             if source_lang == "en":
                 return text
                 
-            return self._translate_with_timeout(text, src=source_lang, dest="en", timeout=8)
+            translated = self._memoized("translate", source_lang, "en", text,
+                                        lambda: self._translate_with_timeout(text, src=source_lang, dest="en", timeout=config.TRANSLATE_TIMEOUT))
+            return translated if translated is not None else text
         except Exception as e:
             logger.error(f"Translation to English failed: {e}")
+            translation_fallback("translate", "error")
             return text
-    
+
+    def _translate_segments(self, text: str, src: str, dest: str) -> str:
+        """Translate text sentence by sentence over the client pool; a segment that fails stays untranslated."""
+        pieces = segments.split(text, config.TRANSLATE_SEGMENT_CHARS)
+        todo = [piece for piece, translatable in pieces if translatable]
+        results = [self.memo.get("translate", src, dest, segment) for segment in todo]
+        futures = {
+            i: self.executor.submit(lambda segment=segment: self.translator.translate(segment, src=src, dest=dest).text)
+            for i, segment in enumerate(todo) if results[i] is None
+        }
+        # Segments beyond the pool size queue behind the others, so allow one timeout per round
+        rounds = -(-len(futures) // config.TRANSLATE_POOL_SIZE)
+        deadline = time.monotonic() + config.TRANSLATE_SEGMENT_TIMEOUT * rounds
+        for i, future in futures.items():
+            try:
+                results[i] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                future.cancel()
+                logger.warning(f"Translation of a segment timed out after {config.TRANSLATE_SEGMENT_TIMEOUT}s")
+                translation_fallback("translate", "timeout")
+                continue
+            except Exception as e:
+                logger.error(f"Translation of a segment failed: {e}")
+                translation_fallback("translate", "error")
+                continue
+            if results[i]:
+                self.memo.set("translate", src, dest, todo[i], results[i])
+        return segments.join(pieces, results)
+
     def translate_from_english(self, text: str, target_lang: str) -> str:
         """Translate text from English to target language with timeout. For Hindi/Marwari, return Romanized (Latin script)."""
         try:
             if target_lang == "en":
                 return text
-            # For Hindi and Marwari, return Romanized (Latin script)
-            if target_lang in ("hi", "mwr"):
-                # Googletrans transliteration only works for Hindi
-                translated = self.translator.translate(text, src="en", dest="hi")
-                # Use .pronunciation for Romanized output if available
-                romanized = getattr(translated, "pronunciation", None)
-                if romanized:
-                    return romanized
-                else:
-                    return translated.text  # fallback to native script
-            # All other languages: normal translation
-            return self._translate_with_timeout(text, src="en", dest=target_lang, timeout=8)
+            # Hindi and Marwari: translate to Hindi, then romanize locally (no googletrans pronunciation)
+            romanize = target_lang in ("hi", "mwr")
+            translated = self._translate_segments(text, src="en", dest="hi" if romanize else target_lang)
+            return transliterate.romanize(translated) if romanize else translated
         except Exception as e:
             logger.error(f"Translation from English failed: {e}")
+            translation_fallback("translate", "error")
             return text
     
+    async def _gtx_request(self, text: str, src: str, dest: str) -> list:
+        """Call the Google Translate gtx endpoint over the shared async connection pool.
+
+        Raises SchedulerRejected when TRANSLATE_RPM_LIMIT cannot fit the call in time.
+        """
+        await self.scheduler.acquire()
+        params = [("client", "gtx"), ("sl", src), ("tl", dest), ("dt", "t")]
+        client = http_client.get_client()
+        response = await client.post(config.TRANSLATE_BASE_URL, params=params, data={"q": text})
+        if response.status_code == 429:
+            self.scheduler.pause(5.0)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _gtx_text(data: list) -> str:
+        return "".join(part[0] for part in data[0] if part and part[0])
+
+    async def _detect_async_with_timeout(self, text: str) -> str | None:
+        timeout = config.TRANSLATE_DETECT_TIMEOUT
+        try:
+            data = await asyncio.wait_for(self._gtx_request(text, src="auto", dest="en"), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Language detection timed out after {timeout}s")
+            translation_fallback("detect", "timeout")
+            return None
+        except SchedulerRejected as e:
+            translation_fallback("detect", "overloaded")
+            logger.warning(str(e))
+            return None
+        return data[2] or None
+
+    async def detect_language_async(self, text: str) -> str:
+        """Async variant of detect_language"""
+        local = self._detect_locally(text)
+        if local is not None:
+            return local
+        try:
+            lang = await self._memoized_async("detect", "auto", "", text, lambda: self._detect_async_with_timeout(text))
+            return lang or "en"
+        except Exception as e:
+            logger.error(f"Language detection failed: {e}")
+            translation_fallback("detect", "error")
+            return "en"
+
+    async def _translate_async_with_timeout(self, text: str, src: str, dest: str, timeout: float | None = None) -> str | None:
+        """Translate over the shared pool. Returns None on timeout or an empty result."""
+        timeout = config.TRANSLATE_TIMEOUT if timeout is None else timeout
+        try:
+            data = await asyncio.wait_for(self._gtx_request(text, src=src, dest=dest), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Translation timed out after {timeout}s")
+            translation_fallback("translate", "timeout")
+            return None
+        except SchedulerRejected as e:
+            translation_fallback("translate", "overloaded")
+            logger.warning(str(e))
+            return None
+        return self._gtx_text(data) or None
+
+    async def _translate_segments_async(self, text: str, src: str, dest: str) -> str:
+        """Async variant of _translate_segments: segments run concurrently, TRANSLATE_POOL_SIZE at a time."""
+        pieces = segments.split(text, config.TRANSLATE_SEGMENT_CHARS)
+        todo = [piece for piece, translatable in pieces if translatable]
+        pool = asyncio.Semaphore(config.TRANSLATE_POOL_SIZE)
+
+        async def _fetch(segment: str) -> str | None:
+            # The timeout starts once a slot is free, so queued segments get their full budget
+            async with pool:
+                return await self._translate_async_with_timeout(segment, src=src, dest=dest,
+                                                                timeout=config.TRANSLATE_SEGMENT_TIMEOUT)
+
+        results = await asyncio.gather(
+            *(self._memoized_async("translate", src, dest, segment, lambda segment=segment: _fetch(segment)) for segment in todo),
+            return_exceptions=True,
+        )
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                logger.error(f"Translation of a segment failed: {result}")
+                translation_fallback("translate", "error")
+                results[i] = None
+        return segments.join(pieces, results)
+
+    async def translate_to_english_async(self, text: str, source_lang: str = None) -> str:
+        """Async variant of translate_to_english"""
+        try:
+            if source_lang is None:
+                source_lang = await self.detect_language_async(text)
+
+            if source_lang == "en":
+                return text
+
+            translated = await self._memoized_async("translate", source_lang, "en", text,
+                                                    lambda: self._translate_async_with_timeout(text, src=source_lang, dest="en"))
+            return translated if translated is not None else text
+        except Exception as e:
+            logger.error(f"Translation to English failed: {e}")
+            translation_fallback("translate", "error")
+            return text
+
+    async def translate_from_english_async(self, text: str, target_lang: str) -> str:
+        """Async variant of translate_from_english. For Hindi/Marwari, return Romanized (Latin script)."""
+        try:
+            if target_lang == "en":
+                return text
+            romanize = target_lang in ("hi", "mwr")
+            translated = await self._translate_segments_async(text, src="en", dest="hi" if romanize else target_lang)
+            return transliterate.romanize(translated) if romanize else translated
+        except Exception as e:
+            logger.error(f"Translation from English failed: {e}")
+            translation_fallback("translate", "error")
+            return text
+
     def get_supported_languages(self) -> dict:
         """Get list of supported languages"""
+        from googletrans import LANGUAGES
         return LANGUAGES
 
 # Global translator instance
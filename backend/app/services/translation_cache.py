@@ -0,0 +1,89 @@
+"""
+Memo for translation calls, keyed on (op, src, dest, text hash).
+
+Bot answers repeat heavily, so the same English paragraph is translated into
+the same language again and again. Results live in an in-memory LRU backed
+by a SQLite table (LRU-pruned to a row cap) and the most recently used rows
+are warm-loaded at startup. ``set`` only queues the SQLite write (see
+``SQLiteCache``) and async callers read through ``get_async``. Callers only store real results, never the
+fallbacks returned on timeout.
+"""
+import hashlib
+import logging
+from fastapi.concurrency import run_in_threadpool #type: ignore
+from .. import config
+from .cache import LRUCache, SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationMemo:
+    def __init__(self):
+        self.enabled = config.TRANSLATION_CACHE_ENABLED
+        self.memory = LRUCache(config.TRANSLATION_CACHE_SIZE, ttl=config.TRANSLATION_CACHE_TTL)
+        self.persistent = None
+        if self.enabled and config.TRANSLATION_CACHE_PERSIST:
+            # Opened on first use; nothing touches the file at import
+            self.persistent = SQLiteCache(
+                config.CACHE_DB_PATH, "translation_cache",
+                ttl=config.TRANSLATION_CACHE_TTL, max_rows=config.TRANSLATION_CACHE_MAX_ROWS,
+            )
+
+    @staticmethod
+    def make_key(op: str, src: str, dest: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{op}|{src}|{dest}|{digest}"
+
+    def get(self, op: str, src: str, dest: str, text: str) -> str | None:
+        if not self.enabled:
+            return None
+        key = self.make_key(op, src, dest, text)
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    async def get_async(self, op: str, src: str, dest: str, text: str) -> str | None:
+        """Like get, for the event loop: a memory hit returns directly, the SQLite read runs in the threadpool."""
+        if not self.enabled:
+            return None
+        key = self.make_key(op, src, dest, text)
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = await run_in_threadpool(self.persistent.get, key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, op: str, src: str, dest: str, text: str, value: str) -> None:
+        if not self.enabled:
+            return
+        key = self.make_key(op, src, dest, text)
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, value)
+
+    def warm(self, limit: int | None = None) -> int:
+        """Load the most recently used persisted entries into memory. Returns how many were loaded."""
+        if self.persistent is None:
+            return 0
+        limit = min(config.TRANSLATION_CACHE_WARM if limit is None else limit, self.memory.maxsize)
+        entries = self.persistent.most_recent(limit)
+        # Oldest first so the most recent end up at the hot end of the LRU
+        for key, value in reversed(entries):
+            self.memory.set(key, value)
+        logger.info("Translation memo warmed with %d entries", len(entries))
+        return len(entries)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "memory": self.memory.stats(),
+            "persistent": self.persistent.stats() if self.persistent is not None else None,
+        }
+
+    def close(self) -> None:
+        if self.persistent is not None:
+            self.persistent.close()
@@ -0,0 +1,231 @@
+"""
+Offline Devanagari to Romanized Hindi transliteration.
+
+Hindi and Marwari answers are shown in the Latin script the way students
+type it ("aapka admission kab hai"), not in a scholarly scheme with
+diacritics. ``romanize`` converts every Devanagari word in a string and
+leaves everything else untouched, so it can be applied to translations and
+to LLM output that slipped into Hindi script.
+
+Each word is parsed into (consonant, vowel) units and the inherent vowel
+(schwa) is dropped where Hindi speech drops it:
+
+- at the end of a word ("कमल" -> "kamal"), except after a conjunct ending
+  in य, र or व ("मित्र" -> "mitra")
+- inside a word between two single consonants, when a vowel precedes and a
+  pronounced vowel follows ("समझना" -> "samajhna", "करना" -> "karna");
+  scanned right to left so no three-consonant cluster is created
+
+Words whose usual Roman spelling does not follow from the rules (में ->
+"mein", चाहिए -> "chahiye", English loans such as कॉलेज -> "college") come
+from a small exception table.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+_SCHWA = "a"
+
+_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "ळ": "l", "व": "v",
+    "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+}
+
+# Consonant + nukta (after NFD normalization the nukta is a separate mark)
+_NUKTA_CONSONANTS = {
+    "क": "q", "ख": "kh", "ग": "gh", "ज": "z", "ड": "d", "ढ": "dh",
+    "फ": "f", "य": "y", "र": "r", "ळ": "l", "न": "n",
+}
+
+_VOWELS = {
+    "अ": "a", "आ": "aa", "इ": "i", "ई": "i", "उ": "u", "ऊ": "oo", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au", "ऑ": "o", "ऍ": "e", "ऎ": "e", "ऒ": "o",
+}
+
+_VOWEL_SIGNS = {
+    "ा": "aa", "ि": "i", "ी": "i", "ु": "u", "ू": "oo", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ॅ": "e", "ॉ": "o", "ॆ": "e", "ॊ": "o",
+}
+
+_NUKTA = "़"
+_VIRAMA = "्"
+_NASALS = ("ँ", "ं")  # chandrabindu, anusvara
+_VISARGA = "ः"
+_LABIALS = ("p", "b", "m")
+
+# A conjunct ending in one of these keeps its final schwa: "mitra", "vakya"
+_KEEP_FINAL_SCHWA_AFTER = ("y", "r", "v")
+
+# Long vowels are written short at the end of a word: "kaa" -> "ka", "hoo" -> "hu"
+_FINAL_SHORT = {"aa": "a", "oo": "u"}
+
+_EXCEPTIONS = {
+    # Function words with an established Hinglish spelling
+    "में": "mein", "मैं": "main", "हैं": "hain", "नहीं": "nahin", "हूँ": "hoon", "हूं": "hoon",
+    "यह": "yeh", "वह": "woh", "वो": "wo", "माँ": "maa", "लिए": "liye", "किए": "kiye",
+    "दिए": "diye", "गए": "gaye", "नए": "naye", "चाहिए": "chahiye", "चाहिये": "chahiye",
+    "कीजिए": "kijiye", "कीजिये": "kijiye", "दीजिए": "dijiye", "लीजिए": "lijiye",
+    "जाइए": "jaiye", "आइए": "aaiye", "बताइए": "bataiye", "रुपये": "rupaye", "रुपए": "rupaye",
+    "अच्छा": "achha", "अच्छी": "achhi", "अच्छे": "achhe",
+    # English campus vocabulary written in Devanagari
+    "कॉलेज": "college", "हॉस्टल": "hostel", "फीस": "fees", "फ़ीस": "fees",
+    "एडमिशन": "admission", "कोर्स": "course", "कोर्सेज": "courses", "लाइब्रेरी": "library",
+    "स्कॉलरशिप": "scholarship", "सेमेस्टर": "semester", "ऑनलाइन": "online", "ऑफलाइन": "offline",
+    "वेबसाइट": "website", "ईमेल": "email", "ऑफिस": "office", "फॉर्म": "form",
+    "डिपार्टमेंट": "department", "प्रिंसिपल": "principal", "लैब": "lab", "कैंपस": "campus",
+    "क्लास": "class", "सर्टिफिकेट": "certificate", "डॉक्यूमेंट": "document",
+    "डॉक्यूमेंट्स": "documents", "हेल्पलाइन": "helpline", "इंजीनियरिंग": "engineering",
+    "कंप्यूटर": "computer", "साइंस": "science", "एग्जाम": "exam", "प्लेसमेंट": "placement",
+    "मेस": "mess", "बस": "bus", "नंबर": "number", "फोन": "phone", "स्टूडेंट": "student",
+    "स्टूडेंट्स": "students", "कैंटीन": "canteen", "रिजल्ट": "result", "इंटरनेट": "internet",
+    "किलोमीटर": "kilometer",
+    "मार्च": "march", "अप्रैल": "april", "मई": "may", "जून": "june", "जुलाई": "july", "अगस्त": "august",
+}
+_EXCEPTIONS = {unicodedata.normalize("NFD", word): latin for word, latin in _EXCEPTIONS.items()}
+
+# Letters and signs of a word; danda and digits are punctuation here
+_WORD = re.compile("[ऀ-ॣॱ-ॿ‌‍]+")
+_DANDA = re.compile(r"\s*[।॥]")
+_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+_SENTENCE_END = ".!?।॥"
+_BLOCK = re.compile("[ऀ-ॿ]")
+
+
+def has_devanagari(text: str) -> bool:
+    return _BLOCK.search(text) is not None
+
+
+def _parse(word: str) -> list[list]:
+    """Split a word into [consonant, vowel, nasal, visarga] units.
+
+    vowel is the inherent schwa, a vowel sign's value, or None after a
+    virama; independent vowels have an empty consonant.
+    """
+    units: list[list] = []
+    i = 0
+    while i < len(word):
+        ch = word[i]
+        nxt = word[i + 1] if i + 1 < len(word) else ""
+        if ch in _CONSONANTS:
+            if nxt == _NUKTA:
+                latin = _NUKTA_CONSONANTS.get(ch, _CONSONANTS[ch])
+                i += 1
+            else:
+                latin = _CONSONANTS[ch]
+            if ch == "ञ" and units and units[-1][:2] == ["j", None]:
+                units[-1][0], latin = "g", "y"  # ज्ञ is pronounced "gy" in Hindi
+            units.append([latin, _SCHWA, "", ""])
+        elif ch in _VOWEL_SIGNS and units and units[-1][0]:
+            units[-1][1] = _VOWEL_SIGNS[ch]
+        elif ch == _VIRAMA and units and units[-1][0]:
+            units[-1][1] = None
+        elif ch in _VOWELS:
+            units.append(["", _VOWELS[ch], "", ""])
+        elif ch in _NASALS and units:
+            units[-1][2] = "n"
+        elif ch == _VISARGA and units:
+            units[-1][3] = "h"
+        elif ch == "ॐ":
+            units.append(["", "o", "", ""])
+            units.append(["m", None, "", ""])
+        # Nukta on a vowel, joiners, avagraha and other marks are not pronounced
+        i += 1
+    return units
+
+
+def _delete_schwas(units: list[list]) -> None:
+    last = len(units) - 1
+    if last > 0:
+        consonant, vowel, nasal, visarga = units[last]
+        after_conjunct = units[last - 1][1] is None
+        if (consonant and vowel == _SCHWA and not nasal and not visarga
+                and not (after_conjunct and consonant in _KEEP_FINAL_SCHWA_AFTER)):
+            units[last][1] = None
+    for i in range(last - 1, 0, -1):
+        consonant, vowel, nasal, visarga = units[i]
+        if not consonant or vowel != _SCHWA or nasal or visarga:
+            continue
+        # Needs a vowel before (not a cluster) and a consonant with a pronounced vowel after
+        if units[i - 1][1] is None:
+            continue
+        following_consonant, following_vowel = units[i + 1][0], units[i + 1][1]
+        if following_consonant and following_vowel is not None:
+            units[i][1] = None
+
+
+@lru_cache(maxsize=8192)
+def romanize_word(word: str) -> str:
+    """Romanize one Devanagari word (no spaces or punctuation)."""
+    word = unicodedata.normalize("NFD", word)
+    if word in _EXCEPTIONS:
+        return _EXCEPTIONS[word]
+    units = _parse(word)
+    _delete_schwas(units)
+    out = []
+    last = len(units) - 1
+    for i, (consonant, vowel, nasal, visarga) in enumerate(units):
+        out.append(consonant)
+        if vowel:
+            if i == last and consonant and vowel in _FINAL_SHORT:
+                vowel = _FINAL_SHORT[vowel]
+            out.append(vowel)
+        if nasal:
+            following = units[i + 1][0] if i < last else ""
+            out.append("m" if following.startswith(_LABIALS) else "n")
+        out.append(visarga)
+    return "".join(out)
+
+
+def _romanize(text: str, sentence_start: bool) -> str:
+    def replace(match: re.Match) -> str:
+        latin = romanize_word(match.group(0))
+        before = text[:match.start()].rstrip()
+        if (before[-1:] in _SENTENCE_END) if before else sentence_start:
+            latin = latin[:1].upper() + latin[1:]
+        return latin
+
+    text = _WORD.sub(replace, text)
+    return _DANDA.sub(".", text).translate(_DIGITS)
+
+
+def romanize(text: str) -> str:
+    """Romanize the Devanagari words in text; Latin text, numbers and punctuation are kept."""
+    if not has_devanagari(text):
+        return text
+    return _romanize(text, sentence_start=True)
+
+
+class StreamRomanizer:
+    """Romanizes a streamed answer delta by delta.
+
+    A Devanagari word cut at the end of a delta is held back until the next
+    delta completes it (schwa deletion depends on where the word ends).
+    """
+
+    def __init__(self):
+        self._held = ""
+        self._sentence_start = True
+
+    def feed(self, delta: str) -> str:
+        text = self._held + delta
+        start = len(text)
+        while start > 0 and _WORD.match(text, start - 1):
+            start -= 1
+        text, self._held = text[:start], text[start:]
+        return self._emit(text)
+
+    def flush(self) -> str:
+        text, self._held = self._held, ""
+        return self._emit(text)
+
+    def _emit(self, text: str) -> str:
+        romanized = _romanize(text, self._sentence_start) if has_devanagari(text) else text
+        stripped = romanized.rstrip()
+        if stripped:
+            self._sentence_start = stripped[-1] in _SENTENCE_END
+        return romanized
@@ -1,11 +1,71 @@
 """
 Ultra-fast local chatbot service - no model loading, instant responses
+
+Questions are scanned once by an Aho-Corasick automaton over every intent
+keyword. Matches are scored per intent (keyword weights, how much of the
+question they cover, and the margin over competing intents) into a
+confidence that /ask uses to decide whether to skip the LLM.
 """
 import logging
-import random
+import re
+import zlib
+from ..data.college_data import COLLEGE_INFO
+from . import language_detect
+from .retrieval import tokenize
+from .text_match import AhoCorasick, normalize_text
 
 logger = logging.getLogger(__name__)
 
+# Highest confidence an intent category can reach. Topic answers are generic
+# and can disagree with COLLEGE_INFO, so they stay below the tier-0 threshold
+# and are only used when the LLM is unavailable.
+CATEGORY_CAPS = {"greeting": 0.99, "identity": 0.97, "faq": 0.95, "topic": 0.75}
+
+# Words that carry no intent of their own; they do not count against coverage
+_FILLER_WORDS = frozenset("""
+    what whats is are the a an please pls plz tell me about can could you u i do does my your
+    to of for in on and or ok okay sir maam mam bhai ji kya hai ka ki ke batao bataiye there
+    this that any some give know want need when where how which why will shall should get
+""".split())
+
+# intent -> (category, {keyword phrase: weight}). An intent needs a total weight of 1.0 to
+# reach full confidence, so a lone ambiguous word ("help", "name") never answers at tier 0.
+_INTENT_KEYWORDS = {
+    "hi": ("greeting", {"hi": 1.0, "hii": 1.0, "hiii": 1.0, "hey": 1.0, "hey there": 1.0}),
+    "hello": ("greeting", {"hello": 1.0, "helo": 1.0, "namaste": 1.0, "namaskar": 1.0, "good morning": 1.0,
+                           "good afternoon": 1.0, "good evening": 1.0}),
+    "name": ("identity", {"your name": 2.0, "name": 0.5, "call you": 1.5}),
+    "who": ("identity", {"who are you": 2.0, "who r u": 2.0, "who is this": 1.5, "kaun ho": 2.0,
+                         "aap kaun": 2.0, "yourself": 1.5, "introduce yourself": 2.0}),
+    "what": ("identity", {"what are you": 2.0, "are you a bot": 2.0, "are you human": 2.0, "are you a robot": 2.0,
+                          "are you real": 2.0}),
+    "help": ("identity", {"help": 0.5, "what can you do": 2.0, "how can you help": 2.0, "madad": 0.5,
+                          "what do you know": 2.0, "options": 0.5}),
+    "admission": ("topic", {"admission": 1.0, "admissions": 1.0, "apply": 0.8, "application": 0.8, "enroll": 0.8}),
+    "eligibility": ("topic", {"eligibility": 1.0, "eligible": 1.0, "criteria": 0.8, "minimum marks": 1.0}),
+    "fees": ("topic", {"fee": 1.0, "fees": 1.0, "tuition": 1.0, "fee structure": 1.5, "cost": 0.6}),
+    "scholarship": ("topic", {"scholarship": 1.0, "scholarships": 1.0, "fee waiver": 1.0, "concession": 0.8}),
+    "hostel": ("topic", {"hostel": 1.0, "accommodation": 1.0, "room": 0.5, "rooms": 0.5}),
+    "mess": ("topic", {"mess": 1.0, "food": 0.8, "meals": 0.8, "canteen": 0.6}),
+    "exam": ("topic", {"exam": 1.0, "exams": 1.0, "examination": 1.0, "test": 0.5, "pariksha": 1.0}),
+    "result": ("topic", {"result": 1.0, "results": 1.0, "grade": 0.8, "marksheet": 0.8, "cgpa": 0.8}),
+    "opening": ("topic", {"opening": 1.0, "classes start": 1.5, "academic year": 1.0, "semester start": 1.0}),
+    "timing": ("topic", {"timing": 1.0, "timings": 1.0, "college time": 1.0, "hours": 0.6}),
+    "course": ("topic", {"course": 1.0, "courses": 1.0, "program": 0.8, "programs": 0.8, "branch": 0.8}),
+    "library": ("topic", {"library": 1.0, "books": 0.6}),
+    "sports": ("topic", {"sports": 1.0, "sport": 1.0, "gym": 0.8, "cricket": 0.8, "swimming": 0.8}),
+}
+
+_FAQ_PAIR = re.compile(r"^Q:\s*(.+?)\s*\nA:\s*(.+?)\s*$", re.MULTILINE)
+
+
+def faq_pairs(text: str) -> list[tuple[str, str]]:
+    """(question, answer) pairs from the FREQUENTLY ASKED QUESTIONS block of the info sheet."""
+    start = text.find("=== FREQUENTLY ASKED QUESTIONS ===")
+    if start == -1:
+        return []
+    return _FAQ_PAIR.findall(text[start:])
+
 class UltraFastChatService:
     def __init__(self):
         logger.info("Ultra-fast chat service initialized")
@@ -124,28 +184,109 @@ class UltraFastChatService:
             "help": "Main college admission, fees, hostel, exam, courses ke baare me batata hun. Kya specific information chahiye?"
         }
 
-    def generate_response(self, question: str, context: str = "") -> dict:
-        logger.info(f"Processing question: {question}")
-        
-        question_lower = question.lower()
-        
-        # Check for Hindi/mixed language indicators
-        hindi_indicators = ["kya", "hai", "kab", "kaise", "kitna", "kahan", "kyun", "kaun"]
-        is_hindi_mixed = any(word in question_lower for word in hindi_indicators)
-        
-        # Find matching keywords and responses
-        for keyword in self.responses.keys():
-            if keyword in question_lower:
-                if is_hindi_mixed and keyword in self.hindi_responses:
-                    response = self.hindi_responses[keyword]
-                else:
-                    response = random.choice(self.responses[keyword])
-                
-                return {
-                    "answer": response,
-                    "confidence": 0.9,
-                    "source": "ultra-fast-local"
-                }
+        self._build_matcher()
+
+    def _build_matcher(self) -> None:
+        """Compile every intent keyword (plus FAQ content words) into one automaton."""
+        self.intents: dict[str, dict] = {}
+        patterns = []
+        for intent, (category, keywords) in _INTENT_KEYWORDS.items():
+            self.intents[intent] = {"category": category, "keywords": len(keywords)}
+            for phrase, weight in keywords.items():
+                patterns.append((normalize_text(phrase), (intent, weight)))
+        # FAQ entries answer with the sheet's own text; their keywords are the question's content words
+        self.faq_answers: dict[str, str] = {}
+        for i, (question, answer) in enumerate(faq_pairs(COLLEGE_INFO)):
+            intent = f"faq:{i}"
+            words = sorted(set(tokenize(question)) - _FILLER_WORDS)
+            if not words:
+                continue
+            self.faq_answers[intent] = answer
+            self.intents[intent] = {"category": "faq", "keywords": len(words)}
+            for word in words:
+                patterns.append((word, (intent, 1.0)))
+        self.matcher = AhoCorasick(patterns)
+
+    def classify(self, question: str) -> tuple[str | None, float]:
+        """Return (best intent, calibrated confidence in [0, 1]) for a question."""
+        text = normalize_text(question)
+        if not text:
+            return None, 0.0
+        # Word index for each character offset, to measure how much of the question matched
+        word_at = []
+        words = text.split(" ")
+        for w, word in enumerate(words):
+            word_at.extend([w] * len(word))
+            word_at.append(w)
+        content = {w for w, word in enumerate(words) if word not in _FILLER_WORDS}
+
+        scores: dict[str, float] = {}
+        covered: dict[str, set[int]] = {}
+        seen: dict[str, set[str]] = {}
+        for start, end, (intent, weight) in self.matcher.iter_word_matches(text):
+            phrase = text[start:end]
+            if phrase in seen.setdefault(intent, set()):
+                continue
+            seen[intent].add(phrase)
+            scores[intent] = scores.get(intent, 0.0) + weight
+            covered.setdefault(intent, set()).update(word_at[start:end])
+        if not scores:
+            return None, 0.0
+
+        greeting_words = set()
+        for intent in scores:
+            if self.intents[intent]["category"] == "greeting":
+                greeting_words |= covered[intent]
+
+        best_intent, best_confidence = None, 0.0
+        for intent, score in scores.items():
+            category = self.intents[intent]["category"]
+            # A greeting in front of a real question is not competition, just politeness.
+            # FAQ entries are specific, so they only compete with each other.
+            rivals = [s for other, s in scores.items()
+                      if other != intent and self.intents[other]["category"] != "greeting"
+                      and (category != "faq" or self.intents[other]["category"] == "faq")]
+            margin = score ** 2 / (score ** 2 + max(rivals) ** 2) if rivals else 1.0
+            words_covered = covered[intent] if category == "greeting" else covered[intent] | greeting_words
+            coverage = len(words_covered & content) / len(content) if content else 1.0
+            strength = min(1.0, score)
+            confidence = CATEGORY_CAPS[category] * coverage * margin * strength
+            if category == "faq":
+                # Most of the FAQ's own keywords must be present too
+                confidence *= len(seen[intent]) / self.intents[intent]["keywords"]
+            if confidence > best_confidence:
+                best_intent, best_confidence = intent, confidence
+        return best_intent, round(best_confidence, 4)
+
+    def answer_for(self, intent: str, hindi: bool = False, question: str = "") -> str:
+        """Canned answer for an intent; the Romanized Hindi variant when asked and available.
+
+        The variant is picked from the normalized question, so the same question always gets
+        the same reply (and the same cache entry).
+        """
+        if intent in self.faq_answers:
+            return self.faq_answers[intent]
+        if hindi and intent in self.hindi_responses:
+            return self.hindi_responses[intent]
+        variants = self.identity_responses.get(intent) or self.responses[intent]
+        return variants[zlib.crc32(normalize_text(question).encode("utf-8")) % len(variants)]
+
+    def generate_response(self, question: str, context: str = "", hindi: bool | None = None) -> dict:
+        """Local intent answer or a generic fallback. hindi=None detects Hinglish from the question itself."""
+        if hindi is None:
+            lang, lang_confidence = language_detect.detect(question)
+            is_hindi_mixed = lang == "hi" and lang_confidence >= 0.8
+        else:
+            is_hindi_mixed = hindi
+
+        intent, confidence = self.classify(question)
+        if intent is not None:
+            return {
+                "answer": self.answer_for(intent, hindi=is_hindi_mixed, question=question),
+                "confidence": confidence,
+                "intent": intent,
+                "source": "ultra-fast-local"
+            }
         
         # Fallback responses
         if is_hindi_mixed:
@@ -155,7 +296,8 @@ class UltraFastChatService:
         
         return {
             "answer": fallback,
-            "confidence": 0.7,
+            "confidence": 0.2,
+            "intent": None,
             "source": "ultra-fast-local"
         }
 
@@ -0,0 +1,144 @@
+"""
+Token accounting for LLM calls.
+
+Every Groq call (plain or streamed) reports its ``usage`` block here. Totals
+are kept in memory per (hour, model, user language, source: ask, ask-stream,
+ask-batch or warmup) and flushed
+to ``token_usage`` every USAGE_FLUSH_INTERVAL seconds. A one-minute sliding
+window gives the current tokens-per-minute of this worker, and Groq's
+``x-ratelimit-*`` response headers (which cover every worker sharing the
+key) are kept so we can see a 429 coming.
+"""
+import logging
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session #type: ignore
+from .. import config
+from ..models.database import TokenUsage
+from .analytics import apply_counter_deltas, hour_bucket
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("requests", "prompt_tokens", "completion_tokens", "total_tokens", "rate_limited")
+_RATE_LIMIT_HEADERS = (
+    "x-ratelimit-limit-tokens", "x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens",
+    "x-ratelimit-limit-requests", "x-ratelimit-remaining-requests", "x-ratelimit-reset-requests",
+)
+_WINDOW = 60.0
+
+
+def _averages(counter: Counter) -> dict:
+    requests = counter["requests"]
+    return {
+        **{name: counter[name] for name in COUNTERS},
+        "avg_prompt_tokens": round(counter["prompt_tokens"] / requests, 1) if requests else 0.0,
+        "avg_completion_tokens": round(counter["completion_tokens"] / requests, 1) if requests else 0.0,
+    }
+
+
+class UsageLedger:
+    def __init__(self):
+        self._pending: dict[tuple, Counter] = {}
+        self._totals: dict[tuple, Counter] = {}  # since process start, keyed without the hour
+        self._window: deque[tuple[float, int]] = deque()
+        self._lock = threading.Lock()
+        self.rate_limits: dict[str, str] = {}
+        self.rate_limits_at: datetime | None = None
+
+    def record(self, model: str, language: str, source: str, usage: dict | None, headers=None) -> None:
+        """Add one call's usage block ({"prompt_tokens", "completion_tokens", "total_tokens"})."""
+        usage = usage or {}
+        deltas = {
+            "requests": 1,
+            "prompt_tokens": usage.get("prompt_tokens") or 0,
+            "completion_tokens": usage.get("completion_tokens") or 0,
+        }
+        deltas["total_tokens"] = usage.get("total_tokens") or deltas["prompt_tokens"] + deltas["completion_tokens"]
+        self._add(model, language, source, deltas, headers)
+
+    def record_rate_limited(self, model: str, language: str, source: str, headers=None) -> None:
+        self._add(model, language, source, {"rate_limited": 1}, headers)
+
+    def _add(self, model: str, language: str, source: str, deltas: dict, headers) -> None:
+        key = (model, language or "en", source)
+        now = time.monotonic()
+        with self._lock:
+            self._pending.setdefault((hour_bucket(None),) + key, Counter()).update(deltas)
+            self._totals.setdefault(key, Counter()).update(deltas)
+            if deltas.get("total_tokens"):
+                self._window.append((now, deltas["total_tokens"]))
+            self._expire(now)
+            if headers is not None:
+                limits = {name: headers[name] for name in _RATE_LIMIT_HEADERS if name in headers}
+                if limits:
+                    self.rate_limits = limits
+                    self.rate_limits_at = datetime.utcnow()
+
+    def _expire(self, now: float) -> None:
+        while self._window and self._window[0][0] < now - _WINDOW:
+            self._window.popleft()
+
+    def tokens_per_minute(self) -> tuple[int, int]:
+        """(tokens, requests) recorded by this worker in the last 60 seconds."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return sum(tokens for _, tokens in self._window), len(self._window)
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            apply_counter_deltas(TokenUsage.__table__, ("bucket", "model", "language_code", "source"), COUNTERS, pending)
+        except Exception as e:
+            logger.error(f"Token usage flush failed, will retry: {e}")
+            with self._lock:
+                for key, deltas in pending.items():
+                    self._pending.setdefault(key, Counter()).update(deltas)
+            return 0
+        return len(pending)
+
+    def snapshot(self) -> dict:
+        tokens, requests = self.tokens_per_minute()
+        tpm_limit = config.GROQ_TPM_LIMIT / config.SCHEDULER_WORKERS  # this worker's share
+        with self._lock:
+            totals = {key: Counter(counter) for key, counter in self._totals.items()}
+        overall = Counter()
+        for counter in totals.values():
+            overall.update(counter)
+        return {
+            "tokens_per_minute": tokens,
+            "requests_per_minute": requests,
+            "tpm_limit": tpm_limit,
+            "tpm_utilization": round(tokens / tpm_limit, 4) if tpm_limit else None,
+            "rate_limit_headers": self.rate_limits,
+            "rate_limit_headers_at": self.rate_limits_at,
+            "since_start": _averages(overall),
+            "by_key": [
+                {"model": model, "language": language, "source": source, **_averages(counter)}
+                for (model, language, source), counter in sorted(totals.items())
+            ],
+        }
+
+
+def ledger_summary(db: Session, hours: int = 24) -> dict:
+    """Totals and per-request averages from the token_usage table for the last `hours` hours."""
+    since = hour_bucket(None) - timedelta(hours=max(1, hours) - 1)
+    overall, by_language, by_source = Counter(), {}, {}
+    for row in db.query(TokenUsage).filter(TokenUsage.bucket >= since):
+        counts = {name: getattr(row, name) or 0 for name in COUNTERS}
+        overall.update(counts)
+        by_language.setdefault(row.language_code, Counter()).update(counts)
+        by_source.setdefault(row.source, Counter()).update(counts)
+    return {
+        "from": since,
+        "totals": _averages(overall),
+        "by_language": {key: _averages(c) for key, c in sorted(by_language.items())},
+        "by_source": {key: _averages(c) for key, c in sorted(by_source.items())},
+    }
+
+
+usage_ledger = UsageLedger()
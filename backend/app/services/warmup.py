@@ -0,0 +1,212 @@
+"""
+Startup warm-up: precomputed answers for the questions most users ask.
+
+The seed set is the FAQ block of COLLEGE_INFO (asked in English and, for
+each WARMUP_LANGUAGES entry, in that language) plus the WARMUP_TOP_N most
+frequent questions among recent conversations. Each seed goes through the
+normal /ask pipeline once, WARMUP_CONCURRENCY at a time, and the result is
+kept in ``precomputed_answers``, keyed on the question as the user types it
+and the language the client sends. /ask checks that store right after admin
+overrides, so a warm question skips detection, translation and the LLM.
+
+Keys include the knowledge version, so editing COLLEGE_INFO or ingesting
+documents turns the old answers into misses until the next warm-up.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Awaitable, Callable
+from fastapi.concurrency import run_in_threadpool #type: ignore
+from sqlalchemy import func #type: ignore
+from .. import config
+from ..data.college_data import COLLEGE_INFO
+from ..database import SessionLocal
+from ..models.database import Conversation
+from . import retrieval
+from .answer_cache import normalize_question
+from .session_memory import is_follow_up
+from .translation import translator_service
+from .ultra_fast_chat_service import faq_pairs
+
+logger = logging.getLogger(__name__)
+
+# Only real answers are worth pinning
+STORABLE_SOURCES = frozenset({"groq-ai", "gemini", "answer-cache", "local-intent", "precomputed"})
+_SKIPPED_HISTORY_SOURCES = ("admin-override", "error", "error-fallback", "config-error")
+
+Answerer = Callable[[str, str], Awaitable[dict]]
+
+
+class PrecomputedAnswers:
+    def __init__(self):
+        self._answers: dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(question: str, language: str) -> str:
+        raw = "\x1f".join((normalize_question(question), language, retrieval.knowledge_version()))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question: str, language: str) -> dict | None:
+        if not self._answers:
+            return None
+        value = self._answers.get(self.make_key(question, language))
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(value, source="precomputed")
+
+    def set(self, question: str, language: str, value: dict) -> None:
+        self._answers[self.make_key(question, language)] = dict(value)
+
+    def clear(self) -> None:
+        self._answers.clear()
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "answers": len(self._answers),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _top_questions(limit: int) -> list[tuple[str, str]]:
+    """(question, detected language) pairs asked most often among the last WARMUP_HISTORY_ROWS conversations."""
+    if limit <= 0:
+        return []
+    db = SessionLocal()
+    try:
+        newest = db.query(func.max(Conversation.id)).scalar() or 0
+        rows = (
+            db.query(Conversation.user_message, Conversation.language_detected, func.count().label("asked"))
+            .filter(Conversation.id > newest - config.WARMUP_HISTORY_ROWS)
+            .filter(Conversation.source.is_(None) | Conversation.source.notin_(_SKIPPED_HISTORY_SOURCES))
+            .group_by(Conversation.user_message, Conversation.language_detected)
+            .order_by(func.count().desc())
+            .limit(limit * 2)  # room for the follow-ups dropped below
+            .all()
+        )
+    finally:
+        db.close()
+    # The follow-up heuristics only know English; other languages are kept as they are
+    questions = [(q, lang or "en") for q, lang, _ in rows if q and not (lang in (None, "en") and is_follow_up(q))]
+    return questions[:limit]
+
+
+class Warmup:
+    def __init__(self, store: PrecomputedAnswers):
+        self.store = store
+        self.enabled = config.WARMUP_ENABLED
+        self.languages = [lang.strip() for lang in config.WARMUP_LANGUAGES.split(",") if lang.strip()]
+        self.state = "idle"
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._answer: Answerer | None = None
+        self._task: asyncio.Task | None = None
+
+    def set_answerer(self, answer: Answerer) -> None:
+        """answer(question, language) runs the /ask pipeline without persisting anything."""
+        self._answer = answer
+
+    @property
+    def ready(self) -> bool:
+        # A failed warm-up must not keep the worker out of rotation forever
+        return not self.enabled or self.state in ("done", "failed")
+
+    def _seeds(self, history: list[tuple[str, str]]) -> list[tuple[str, str, bool]]:
+        """(question, language, translate question from English first) work items."""
+        seeds = []
+        for question, _ in faq_pairs(COLLEGE_INFO):
+            seeds.append((question, "auto", False))
+            for language in self.languages:
+                seeds.append((question, language, False))
+                if language != "en":
+                    seeds.append((question, language, True))
+        for question, language in history:
+            seeds.append((question, "auto", False))
+            seeds.append((question, language, False))
+        return list(dict.fromkeys(seeds))
+
+    async def _warm_one(self, question: str, language: str, translate: bool) -> None:
+        if translate:
+            question = await translator_service.translate_from_english_async(question, target_lang=language)
+        result = await self._answer(question, language)
+        if result.get("source") not in STORABLE_SOURCES:
+            raise RuntimeError(f"not storable ({result.get('source')})")
+        self.store.set(question, language, result)
+
+    async def run(self) -> dict:
+        if self._answer is None:
+            raise RuntimeError("Warm-up has no answer pipeline")
+        self.state, self.done, self.failed, self.total = "running", 0, 0, 0
+        self.started_at, self.finished_at = time.time(), None
+        try:
+            history = await run_in_threadpool(_top_questions, config.WARMUP_TOP_N)
+            seeds = self._seeds(history)
+            self.total = len(seeds)
+            logger.info(f"Warm-up started: {self.total} questions ({len(history)} from history), "
+                        f"languages {','.join(self.languages)}")
+            pending = iter(seeds)
+
+            async def worker():
+                for question, language, translate in pending:
+                    try:
+                        await self._warm_one(question, language, translate)
+                        self.done += 1
+                    except Exception as e:
+                        self.failed += 1
+                        logger.warning(f"Warm-up of {question!r} ({language}) failed: {e}")
+
+            await asyncio.gather(*(worker() for _ in range(max(1, config.WARMUP_CONCURRENCY))))
+            self.state = "done"
+        except asyncio.CancelledError:
+            self.state = "cancelled"
+            raise
+        except Exception as e:
+            self.state = "failed"
+            logger.error(f"Warm-up failed: {e}")
+        finally:
+            self.finished_at = time.time()
+        logger.info(f"Warm-up finished in {self.finished_at - self.started_at:.1f}s: "
+                    f"{self.done} answers precomputed, {self.failed} failed")
+        return self.status()
+
+    def start(self) -> bool:
+        """Run the warm-up in the background; False if one is already running."""
+        if self._task is not None and not self._task.done():
+            return False
+        self._task = asyncio.create_task(self.run())
+        return True
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    def status(self) -> dict:
+        end = self.finished_at or time.time()
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "state": self.state,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "progress": round((self.done + self.failed) / self.total, 4) if self.total else (1.0 if self.ready else 0.0),
+            "elapsed_seconds": round(end - self.started_at, 1) if self.started_at else None,
+            "precomputed": self.store.stats(),
+        }
+
+
+precomputed_answers = PrecomputedAnswers()
+warmup_runner = Warmup(precomputed_answers)
@@ -0,0 +1 @@
+# Benchmarks and load-test helpers (run from the backend directory with python -m bench.<name>)
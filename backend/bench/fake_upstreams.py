@@ -0,0 +1,231 @@
+"""
+Local stand-ins for the Groq chat-completions API and the Google Translate
+gtx endpoint, for load-testing /ask without network access or quota.
+
+    python -m bench.fake_upstreams [--port 9100] [--llm-latency lognormal:400:0.5]
+                                   [--llm-error-rate 0.01] [--llm-429-rate 0.02]
+                                   [--translate-latency lognormal:80:0.4] ...
+
+Point the backend at it with:
+
+    GROQ_BASE_URL=http://127.0.0.1:9100/openai/v1/chat/completions
+    TRANSLATE_BASE_URL=http://127.0.0.1:9100/translate_a/single
+    GROQ_API_KEY=fake
+
+Latencies are "fixed:MS", "uniform:LO_MS:HI_MS" or "lognormal:MEDIAN_MS:SIGMA".
+For the chat server the latency is the time to the first token; streamed
+answers then arrive at --tokens-per-second. Responses carry ``usage`` (and
+``x_groq.usage`` when streaming) and ``x-ratelimit-*`` headers computed from a
+one-minute window against --tpm-limit, which also produces real 429s when
+the load exceeds it. The translator echoes its input (answers stay readable)
+and reports the source language from the offline detector.
+
+Only the async gtx translation path uses TRANSLATE_BASE_URL; the googletrans
+fallback (sync paths) still talks to Google.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from collections import deque
+from fastapi import FastAPI, Request #type: ignore
+from fastapi.responses import JSONResponse, StreamingResponse #type: ignore
+
+_FILLER = (
+    "The college office can help with the details. Please check the notice board and the official website "
+    "for the latest dates, fees and documents required. Students may also visit the help desk during working hours."
+).split()
+
+
+class Latency:
+    """A latency distribution in milliseconds, parsed from "kind:args"."""
+
+    def __init__(self, spec: str):
+        kind, _, rest = spec.partition(":")
+        params = [float(p) for p in rest.split(":") if p]
+        if kind == "fixed" and len(params) == 1:
+            self._sample = lambda: params[0]
+        elif kind == "uniform" and len(params) == 2:
+            self._sample = lambda: random.uniform(params[0], params[1])
+        elif kind == "lognormal" and len(params) == 2:
+            mu = math.log(max(params[0], 0.001))
+            self._sample = lambda: random.lognormvariate(mu, params[1])
+        else:
+            raise argparse.ArgumentTypeError(f"bad latency spec {spec!r} (fixed:MS, uniform:LO:HI, lognormal:MEDIAN:SIGMA)")
+        self.spec = spec
+
+    def seconds(self) -> float:
+        return max(0.0, self._sample()) / 1000
+
+    def __repr__(self) -> str:
+        return self.spec
+
+
+class _TokenWindow:
+    """Tokens served in the last minute, for x-ratelimit-* headers and 429s."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._events: deque[tuple[float, int]] = deque()
+        self._used = 0
+
+    def used(self) -> int:
+        cutoff = time.monotonic() - 60
+        while self._events and self._events[0][0] < cutoff:
+            self._used -= self._events.popleft()[1]
+        return self._used
+
+    def add(self, tokens: int) -> None:
+        self._events.append((time.monotonic(), tokens))
+        self._used += tokens
+
+    def exhausted(self) -> bool:
+        return bool(self.limit) and self.used() >= self.limit
+
+    def headers(self) -> dict:
+        if not self.limit:
+            return {}
+        remaining = max(0, self.limit - self.used())
+        reset = 60 - (time.monotonic() - self._events[0][0]) if self._events else 0
+        return {
+            "x-ratelimit-limit-tokens": str(self.limit),
+            "x-ratelimit-remaining-tokens": str(remaining),
+            "x-ratelimit-reset-tokens": f"{max(0.0, reset):.2f}s",
+        }
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _answer(messages: list[dict], words: int) -> str:
+    question = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    filler = (_FILLER * (words // len(_FILLER) + 1))[:max(0, words - len(question.split()))]
+    return f"About {question.strip().rstrip('?')}: " + " ".join(filler)
+
+
+def _failure(rate_429: float, error_rate: float, window: _TokenWindow | None = None) -> JSONResponse | None:
+    roll = random.random()
+    if roll < rate_429 or (window is not None and window.exhausted()):
+        headers = {"retry-after": "1", **(window.headers() if window else {})}
+        return JSONResponse({"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+                            status_code=429, headers=headers)
+    if roll < rate_429 + error_rate:
+        return JSONResponse({"error": {"message": "Injected upstream failure", "type": "server_error"}}, status_code=500)
+    return None
+
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    app = FastAPI(title="Fake upstreams")
+    window = _TokenWindow(args.tpm_limit)
+    counts = {"chat": 0, "chat_stream": 0, "translate": 0, "429": 0, "500": 0}
+
+    def _count_failure(response: JSONResponse) -> JSONResponse:
+        counts[str(response.status_code)] += 1
+        return response
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "counts": counts, "tokens_last_minute": window.used()}
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(args.llm_latency.seconds())
+        failure = _failure(args.llm_429_rate, args.llm_error_rate, window)
+        if failure is not None:
+            return _count_failure(failure)
+
+        messages = body.get("messages", [])
+        answer = _answer(messages, args.answer_words)
+        usage = {"prompt_tokens": sum(_tokens(m.get("content", "")) for m in messages), "completion_tokens": _tokens(answer)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        window.add(usage["total_tokens"])
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get("model", "fake")
+
+        if not body.get("stream"):
+            counts["chat"] += 1
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": usage,
+            }, headers=window.headers())
+
+        counts["chat_stream"] += 1
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        delay = 1 / args.tokens_per_second if args.tokens_per_second > 0 else 0
+
+        def _chunk(delta: dict, finish: str | None = None, **extra) -> str:
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                       "choices": [{"index": 0, "delta": delta, "finish_reason": finish}], **extra}
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            yield _chunk({"role": "assistant", "content": ""})
+            for i, word in enumerate(answer.split(" ")):
+                yield _chunk({"content": word if i == 0 else " " + word})
+                if delay:
+                    await asyncio.sleep(delay)
+            yield _chunk({}, "stop", x_groq={"usage": usage})
+            if include_usage:
+                yield f"data: {json.dumps({'id': completion_id, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=window.headers())
+
+    async def _translate(request: Request):
+        params = request.query_params
+        form = await request.form() if request.method == "POST" else {}
+        text = form.get("q") or params.get("q") or ""
+        await asyncio.sleep(args.translate_latency.seconds())
+        failure = _failure(args.translate_429_rate, args.translate_error_rate)
+        if failure is not None:
+            return _count_failure(failure)
+        counts["translate"] += 1
+
+        source = params.get("sl", "auto")
+        if source == "auto":
+            from app.services import language_detect
+            source = language_detect.detect(text)[0] or "en"
+        parts = [[text, text, None, None, 1]]
+        if "rm" in params.getlist("dt"):
+            parts.append([None, None, text])
+        return JSONResponse([parts, None, source])
+
+    app.add_api_route("/translate_a/single", _translate, methods=["GET", "POST"])
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--llm-latency", type=Latency, default=Latency("lognormal:400:0.5"),
+                        help="Time to the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0, help="Streaming pace after the first token")
+    parser.add_argument("--answer-words", type=int, default=60)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-429-rate", type=float, default=0.0)
+    parser.add_argument("--tpm-limit", type=int, default=0, help="Tokens per minute before answering 429 (0: unlimited)")
+    parser.add_argument("--translate-latency", type=Latency, default=Latency("lognormal:80:0.4"))
+    parser.add_argument("--translate-error-rate", type=float, default=0.0)
+    parser.add_argument("--translate-429-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn #type: ignore
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Cold-start profile: how long a fresh worker takes to import the app and to become ready.
+
+    python -m bench.import_profile [--module app.main] [--runs 5] [--top 15]
+                                   [--serve] [--port 9200] [--json]
+
+Each run imports the module in a new interpreter with ``-X importtime`` and
+reports the median wall time plus the slowest imports (cumulative and self
+time, from the run with the median total). --serve also starts uvicorn in a
+subprocess per run and times how long until /health/live and /health/ready
+answer 200, which includes the lifespan startup (database, caches, warm-up).
+
+Runs use the current environment, so set DATABASE_URL / CACHE_DB_PATH to
+scratch files and point GROQ_BASE_URL at bench/fake_upstreams.py as for the
+load test.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx #type: ignore
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, self microseconds, cumulative microseconds) from ``-X importtime`` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def profile_import(module: str) -> dict:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = parse_importtime(proc.stderr)
+    return {"wall_ms": wall * 1000, "rows": rows}
+
+
+def _wait_for(client: httpx.Client, url: str, started: float, deadline: float) -> float | None:
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(url).status_code == 200:
+                return (time.perf_counter() - started) * 1000
+        except Exception:
+            pass  # not listening yet (httpx 0.13 raises httpcore errors here)
+        time.sleep(0.02)
+    return None
+
+
+def profile_serve(module: str, port: int, timeout: float) -> dict:
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=2) as client:
+            deadline = started + timeout
+            live = _wait_for(client, base + "/health/live", started, deadline)
+            ready = _wait_for(client, base + "/health/ready", started, deadline)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return {"live_ms": live, "ready_ms": ready}
+
+
+def _ms(values: list[float | None]) -> float | None:
+    values = [v for v in values if v is not None]
+    return round(statistics.median(values), 1) if values else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--serve", action="store_true", help="Also time uvicorn start to /health/live and /health/ready")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for readiness per --serve run")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    imports = [profile_import(args.module) for _ in range(args.runs)]
+    walls = [run["wall_ms"] for run in imports]
+    median_run = sorted(imports, key=lambda run: run["wall_ms"])[len(imports) // 2]
+    slowest = sorted(median_run["rows"], key=lambda row: row[2], reverse=True)[:args.top]
+    summary = {
+        "module": args.module,
+        "runs": args.runs,
+        "import_wall_ms": {"median": _ms(walls), "min": round(min(walls), 1), "max": round(max(walls), 1)},
+        "modules_imported": len(median_run["rows"]),
+        "slowest": [{"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cum_us / 1000, 1)}
+                    for name, self_us, cum_us in slowest],
+    }
+    if args.serve:
+        serves = [profile_serve(args.module, args.port, args.timeout) for _ in range(args.runs)]
+        summary["serve"] = {
+            "live_ms": _ms([run["live_ms"] for run in serves]),
+            "ready_ms": _ms([run["ready_ms"] for run in serves]),
+            "not_ready": sum(run["ready_ms"] is None for run in serves),
+        }
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    wall = summary["import_wall_ms"]
+    print(f"import {args.module}: median {wall['median']} ms (min {wall['min']}, max {wall['max']}) "
+          f"over {args.runs} runs, {summary['modules_imported']} modules")
+    print(f"{'cumulative':>11} {'self':>9}   module")
+    for row in summary["slowest"]:
+        print(f"{row['cumulative_ms']:>9.1f}ms {row['self_ms']:>7.1f}ms   {row['module']}")
+    if args.serve:
+        serve = summary["serve"]
+        print(f"uvicorn start -> /health/live {serve['live_ms']} ms, -> /health/ready {serve['ready_ms']} ms"
+              + (f" ({serve['not_ready']} runs never ready)" if serve["not_ready"] else ""))
+
+
+if __name__ == "__main__":
+    main()
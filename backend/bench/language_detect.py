@@ -0,0 +1,100 @@
+"""
+Accuracy and latency benchmark for the offline language detector.
+
+    python -m bench.language_detect [--samples bench/data/language_samples.tsv] [--threshold 0.8] [--remote]
+
+Reports how much of the labelled sample is answered locally (confidence at or
+above the threshold), accuracy on those answers, the end-to-end accuracy when
+low-confidence samples are counted as deferred to googletrans, and per-call
+latency. --remote also times the googletrans detector on the same sample
+(needs network access).
+"""
+import argparse
+import os
+import statistics
+import time
+from app.services import language_detect
+
+DEFAULT_SAMPLES = os.path.join(os.path.dirname(__file__), "data", "language_samples.tsv")
+
+
+def load_samples(path: str) -> list[tuple[str, str]]:
+    samples = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip() or line.startswith("#"):
+                continue
+            label, text = line.rstrip("\n").split("\t", 1)
+            samples.append((label, text))
+    return samples
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run(samples: list[tuple[str, str]], threshold: float, repeat: int) -> None:
+    local = correct = 0
+    errors = []
+    for label, text in samples:
+        lang, confidence = language_detect.detect(text)
+        if confidence >= threshold:
+            local += 1
+            if lang == label:
+                correct += 1
+            else:
+                errors.append((label, lang, round(confidence, 2), text))
+
+    timings = []
+    for _ in range(repeat):
+        for _, text in samples:
+            start = time.perf_counter()
+            language_detect.detect(text)
+            timings.append((time.perf_counter() - start) * 1e6)
+
+    n = len(samples)
+    print(f"samples:               {n}")
+    print(f"answered locally:      {local} ({local / n:.0%}) at confidence >= {threshold}")
+    print(f"local accuracy:        {correct / local:.1%}" if local else "local accuracy:        n/a")
+    print(f"deferred to remote:    {n - local}")
+    print(f"latency per call (us): mean {statistics.mean(timings):.1f}  p50 {percentile(timings, 50):.1f}  "
+          f"p99 {percentile(timings, 99):.1f}")
+    for label, lang, confidence, text in errors:
+        print(f"  wrong: expected {label} got {lang} ({confidence}): {text}")
+
+
+def run_remote(samples: list[tuple[str, str]]) -> None:
+    from app.services.translation import translator_service
+
+    timings = []
+    correct = 0
+    for label, text in samples:
+        start = time.perf_counter()
+        lang = translator_service._detect_with_timeout(text)
+        timings.append((time.perf_counter() - start) * 1e3)
+        correct += lang == label
+    print(f"remote accuracy:       {correct / len(samples):.1%}")
+    print(f"remote latency (ms):   mean {statistics.mean(timings):.1f}  p99 {percentile(timings, 99):.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default=DEFAULT_SAMPLES)
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Confidence needed to skip the remote detector (default: LOCAL_DETECT_MIN_CONFIDENCE)")
+    parser.add_argument("--repeat", type=int, default=200, help="Timing passes over the sample")
+    parser.add_argument("--remote", action="store_true", help="Also benchmark the googletrans detector")
+    args = parser.parse_args()
+
+    from app import config
+
+    threshold = config.LOCAL_DETECT_MIN_CONFIDENCE if args.threshold is None else args.threshold
+    samples = load_samples(args.samples)
+    run(samples, threshold, args.repeat)
+    if args.remote:
+        run_remote(samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Closed-loop load generator for /ask and /ask/stream.
+
+    python -m bench.load_test [--url http://127.0.0.1:8000] [--concurrency 20]
+                              [--requests 500 | --duration 30] [--stream]
+                              [--mix en=0.6,hi=0.3,ta=0.1] [--mix hi=1] [--unique]
+
+Questions are drawn from the labelled language sample. Each --mix runs as its
+own phase (after --warmup requests that are not measured) and is reported
+with throughput, error rate, how often the detected language differed from
+the sample's label, and p50/p95/p99 latency per language and overall; with
+--stream, the time to the first answer delta is reported as well. --unique
+appends a request counter to each question so the answer cache cannot serve
+it.
+
+Run against the fake upstreams (bench/fake_upstreams.py) to measure the
+backend itself without network access or Groq quota.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+import httpx #type: ignore
+from .language_detect import DEFAULT_SAMPLES, load_samples, percentile
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        language, _, weight = part.partition("=")
+        mix[language.strip()] = float(weight or 1)
+    return mix
+
+
+class Phase:
+    def __init__(self, name: str):
+        self.name = name
+        self.latency: dict[str, list[float]] = defaultdict(list)
+        self.first_delta: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.misdetected: Counter = Counter()
+        self.elapsed = 0.0
+
+    def record(self, language: str, seconds: float, detected: str | None, first_delta: float | None) -> None:
+        self.latency[language].append(seconds * 1000)
+        if detected != language:
+            self.misdetected[language] += 1
+        if first_delta is not None:
+            self.first_delta[language].append(first_delta * 1000)
+
+    def summary(self) -> dict:
+        def _stats(values: list[float]) -> dict:
+            if not values:
+                return {"n": 0}
+            return {
+                "n": len(values),
+                "mean": round(statistics.mean(values), 1),
+                "p50": round(percentile(values, 50), 1),
+                "p95": round(percentile(values, 95), 1),
+                "p99": round(percentile(values, 99), 1),
+            }
+
+        everything = [v for values in self.latency.values() for v in values]
+        completed = len(everything)
+        failed = sum(self.errors.values())
+        return {
+            "mix": self.name,
+            "requests": completed + failed,
+            "errors": dict(self.errors),
+            "error_rate": round(failed / (completed + failed), 4) if completed + failed else 0.0,
+            "throughput_rps": round(completed / self.elapsed, 1) if self.elapsed else 0.0,
+            "misdetected": dict(self.misdetected),
+            "latency_ms": {"all": _stats(everything), **{k: _stats(v) for k, v in sorted(self.latency.items())}},
+            "first_delta_ms": {k: _stats(v) for k, v in sorted(self.first_delta.items())},
+        }
+
+
+def _client(concurrency: int, timeout: float) -> httpx.AsyncClient:
+    # httpx 0.13 (pinned by googletrans) calls the pool settings PoolLimits
+    if hasattr(httpx, "Limits"):
+        return httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(max_connections=concurrency))
+    return httpx.AsyncClient(timeout=timeout, pool_limits=httpx.PoolLimits(max_connections=concurrency))
+
+
+async def _ask(client: httpx.AsyncClient, url: str, body: dict) -> tuple[str | None, None]:
+    response = await client.post(f"{url}/ask", json=body)
+    response.raise_for_status()
+    return response.json().get("language_detected"), None
+
+
+async def _ask_stream(client: httpx.AsyncClient, url: str, body: dict, started: float) -> tuple[str | None, float | None]:
+    first_delta = detected = None
+    async with client.stream("POST", f"{url}/ask/stream", json=body) as response:
+        response.raise_for_status()
+        event = None
+        async for line in response.aiter_lines():
+            line = line.strip()
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                if event is None and first_delta is None:
+                    first_delta = time.perf_counter() - started
+                elif event == "meta":
+                    detected = json.loads(line[len("data:"):]).get("language_detected")
+            elif not line:
+                event = None
+    return detected, first_delta
+
+
+async def run_phase(args: argparse.Namespace, name: str, mix: dict[str, float], by_language: dict[str, list[str]],
+                    measure: bool, total: int | None, duration: float | None) -> Phase:
+    phase = Phase(name)
+    languages = [language for language in mix if by_language.get(language)]
+    weights = [mix[language] for language in languages]
+    if not languages:
+        raise SystemExit(f"No samples for any language in mix {name!r}")
+    counter = iter(range(10 ** 9))
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while True:
+            n = next(counter)
+            if total is not None and n >= total:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            language = random.choices(languages, weights)[0]
+            question = random.choice(by_language[language])
+            if args.unique:
+                question = f"{question} #{n}"
+            body = {"question": question, "language": language if args.send_language else "auto"}
+            started = time.perf_counter()
+            try:
+                if args.stream:
+                    detected, first_delta = await _ask_stream(client, args.url, body, started)
+                else:
+                    detected, first_delta = await _ask(client, args.url, body)
+            except httpx.HTTPError as e:
+                if measure:
+                    phase.errors[type(e).__name__] += 1
+                continue
+            if measure:
+                phase.record(language, time.perf_counter() - started, detected, first_delta)
+
+    async with _client(args.concurrency, args.timeout) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+        phase.elapsed = time.perf_counter() - started
+    return phase
+
+
+def _print(summary: dict) -> None:
+    print(f"\n== mix {summary['mix']}")
+    print(f"requests {summary['requests']}  errors {summary['error_rate']:.2%} {summary['errors'] or ''}  "
+          f"throughput {summary['throughput_rps']} req/s")
+    if summary["misdetected"]:
+        print("misdetected  " + "  ".join(f"{k}={v}" for k, v in sorted(summary["misdetected"].items())))
+    print(f"{'language':<10}{'n':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}   (ms)")
+    for language, s in summary["latency_ms"].items():
+        if s["n"]:
+            print(f"{language:<10}{s['n']:>7}{s['mean']:>10}{s['p50']:>10}{s['p95']:>10}{s['p99']:>10}")
+    if summary["first_delta_ms"]:
+        print("first delta:")
+        for language, s in summary["first_delta_ms"].items():
+            if s["n"]:
+                print(f"{language:<10}{s['n']:>7}{s['mean']:>10}{s['p50']:>10}{s['p95']:>10}{s['p99']:>10}")
+
+
+async def _main(args: argparse.Namespace) -> list[dict]:
+    by_language: dict[str, list[str]] = defaultdict(list)
+    for label, text in load_samples(args.samples):
+        by_language[label].append(text)
+    mixes = args.mix or [",".join(f"{language}={len(texts)}" for language, texts in sorted(by_language.items()))]
+
+    summaries = []
+    for spec in mixes:
+        mix = parse_mix(spec)
+        if args.warmup:
+            await run_phase(args, spec, mix, by_language, measure=False, total=args.warmup, duration=None)
+        phase = await run_phase(args, spec, mix, by_language, measure=True,
+                                total=None if args.duration else args.requests, duration=args.duration)
+        summary = phase.summary()
+        summaries.append(summary)
+        if not args.json:
+            _print(summary)
+    return summaries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per mix")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds per mix (overrides --requests)")
+    parser.add_argument("--warmup", type=int, default=0, help="Unmeasured requests before each mix")
+    parser.add_argument("--mix", action="append",
+                        help="language=weight,... (repeatable; default: the sample's own distribution)")
+    parser.add_argument("--stream", action="store_true", help="Use /ask/stream")
+    parser.add_argument("--unique", action="store_true", help="Make every question unique to bypass the answer cache")
+    parser.add_argument("--send-language", action="store_true",
+                        help="Send the sample's label as `language` instead of auto-detecting")
+    parser.add_argument("--samples", default=DEFAULT_SAMPLES)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Print one JSON summary per mix")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    summaries = asyncio.run(_main(args))
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Golden-set check and throughput benchmark for the offline Devanagari romanizer.
+
+    python -m bench.transliterate [--golden bench/data/transliteration_golden.tsv] [--repeat 200]
+
+Compares ``romanize`` with every expected line of the golden set (exit code 1
+on any mismatch, so it can gate changes to the rules or exceptions), then
+times it over the same text: per-call latency with the per-word cache
+cleared before each pass (cold) and left in place (warm), and overall
+throughput in Devanagari characters and words per second.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from app.services import transliterate
+
+DEFAULT_GOLDEN = os.path.join(os.path.dirname(__file__), "data", "transliteration_golden.tsv")
+
+
+def load_golden(path: str) -> list[tuple[str, str]]:
+    pairs = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip() or line.startswith("#"):
+                continue
+            source, expected = line.rstrip("\n").split("\t", 1)
+            pairs.append((source, expected))
+    return pairs
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def check(pairs: list[tuple[str, str]]) -> int:
+    wrong = [(source, expected, got) for source, expected in pairs
+             if (got := transliterate.romanize(source)) != expected]
+    print(f"golden pairs:          {len(pairs)}")
+    print(f"exact matches:         {len(pairs) - len(wrong)} ({(len(pairs) - len(wrong)) / len(pairs):.1%})")
+    for source, expected, got in wrong:
+        print(f"  wrong: {source!r} expected {expected!r} got {got!r}")
+    return len(wrong)
+
+
+def time_calls(texts: list[str], repeat: int, cold: bool) -> tuple[list[float], float]:
+    timings = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        if cold:
+            transliterate.romanize_word.cache_clear()
+        for text in texts:
+            start = time.perf_counter()
+            transliterate.romanize(text)
+            timings.append((time.perf_counter() - start) * 1e6)
+    return timings, time.perf_counter() - started
+
+
+def bench(pairs: list[tuple[str, str]], repeat: int) -> None:
+    texts = [source for source, _ in pairs]
+    chars = sum(len(text) for text in texts) * repeat
+    words = sum(len(text.split()) for text in texts) * repeat
+    for label, cold in (("cold", True), ("warm", False)):
+        timings, elapsed = time_calls(texts, repeat, cold)
+        print(f"{label} latency (us):     mean {statistics.mean(timings):.1f}  p50 {percentile(timings, 50):.1f}  "
+              f"p99 {percentile(timings, 99):.1f}")
+        print(f"{label} throughput:       {words / elapsed:,.0f} words/s  {chars / elapsed:,.0f} chars/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--golden", default=DEFAULT_GOLDEN)
+    parser.add_argument("--repeat", type=int, default=200, help="Timing passes over the golden set")
+    args = parser.parse_args()
+
+    pairs = load_golden(args.golden)
+    mismatches = check(pairs)
+    bench(pairs, args.repeat)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
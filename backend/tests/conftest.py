@@ -0,0 +1,27 @@
+"""
+Shared fixtures. The app reads DATABASE_URL when it is first imported, so the
+tests point it at a scratch SQLite file before anything from ``app`` loads.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="sihbot-tests-"), "test.db")
+
+from app.database import SessionLocal, engine, init_db  # noqa: E402
+from app.models.database import Base  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created, empty tables."""
+    init_db()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
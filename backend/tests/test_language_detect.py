@@ -0,0 +1,41 @@
+import pytest
+
+from app.services import language_detect
+
+
+@pytest.mark.parametrize("text, language", [
+    ("हॉस्टल की फीस कितनी है?", "hi"),
+    ("ফি কত?", "bn"),
+    ("ਫੀਸ ਕਿੰਨੀ ਹੈ", "pa"),
+    ("தமிழ் கேள்வி", "ta"),
+    ("سوال کیا ہے", "ur"),
+])
+def test_native_scripts(text, language):
+    detected, confidence = language_detect.detect(text)
+    assert detected == language
+    assert confidence >= 0.9
+
+
+def test_mixed_script_leans_on_the_native_one():
+    assert language_detect.detect("College में admission कब है")[0] == "hi"
+
+
+@pytest.mark.parametrize("text, language", [
+    ("When is the exam?", "en"),
+    ("What are the hostel fees?", "en"),
+    ("hostel fees kitni hai?", "hi"),
+    ("kya hostel me wifi hai", "hi"),
+])
+def test_latin_script_english_or_romanized_hindi(text, language):
+    detected, confidence = language_detect.detect(text)
+    assert detected == language
+    assert confidence >= 0.8
+
+
+def test_other_latin_languages_have_low_confidence():
+    # Left for the remote detector
+    assert language_detect.detect("¿Cuál es la cuota?")[1] < 0.5
+
+
+def test_no_letters():
+    assert language_detect.detect("12345") == ("en", 0.0)
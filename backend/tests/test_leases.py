@@ -0,0 +1,37 @@
+import time
+
+from app.services import leases
+
+
+def test_one_holder_at_a_time(db):
+    assert leases.acquire("job", 60, "worker-a")
+    assert not leases.acquire("job", 60, "worker-b")
+    assert leases.acquire("job", 60, "worker-a")  # renewal by the holder
+
+
+def test_release_only_by_the_holder(db):
+    assert leases.acquire("job", 60, "worker-a")
+    leases.release("job", "worker-b")
+    assert not leases.acquire("job", 60, "worker-b")
+    leases.release("job", "worker-a")
+    assert leases.acquire("job", 60, "worker-b")
+
+
+def test_expired_lease_can_be_taken_over(db):
+    assert leases.acquire("job", 0.05, "worker-a")
+    time.sleep(0.1)
+    assert leases.acquire("job", 60, "worker-b")
+    assert not leases.acquire("job", 60, "worker-a")
+
+
+def test_run_holders_are_unique_within_a_process(db):
+    first, second = leases.new_holder(), leases.new_holder()
+    assert first != second and first.startswith(leases.HOLDER)
+    assert leases.acquire("retention", 60, first)
+    assert not leases.acquire("retention", 60, second)
+    assert not leases.acquire("retention", 60)  # nor the process-wide holder
+
+
+def test_leases_are_independent(db):
+    assert leases.acquire("a", 60)
+    assert leases.acquire("b", 60, "someone-else")
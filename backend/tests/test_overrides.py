@@ -0,0 +1,75 @@
+from app.models.database import AdminOverride
+from app.services.overrides import OverrideMatcher, _required_literal, _split_top_level
+
+
+def _add(db, pattern, response, language="en", **fields):
+    row = AdminOverride(question_pattern=pattern, override_response=response, language_code=language, **fields)
+    db.add(row)
+    db.commit()
+    return row
+
+
+def test_required_literals():
+    assert _split_top_level("fee.*deadline|(a|b)x") == ["fee.*deadline", "(a|b)x"]
+    assert _required_literal("fee.*deadline") == "deadline"
+    assert _required_literal("exams? postponed") == "postponed"
+    assert _required_literal(".*") is None
+
+
+def test_keyword_and_regex_patterns(db):
+    _add(db, "exam postponed", "Exams move to 5 May.")
+    _add(db, "fee.*deadline|last.*date.*fee", "Pay fees by 30 June.")
+    matcher = OverrideMatcher()
+    matcher.refresh(db)
+    assert matcher.match("Is the exam postponed?", "en")["answer"] == "Exams move to 5 May."
+    assert matcher.match("what is the last date to pay the fee", "en")["answer"] == "Pay fees by 30 June."
+    assert matcher.match("Is the postponed exam on Monday?", "en") is None  # keywords match as a phrase
+    assert matcher.match("When do classes start?", "en") is None
+
+
+def test_language_choice(db):
+    _add(db, "hostel closed", "Hostel band hai.", language="hi")
+    _add(db, "library", "Library open till 8 PM.", language="all")
+    matcher = OverrideMatcher()
+    matcher.refresh(db)
+    assert matcher.match("is the hostel closed", "hi")["answer"] == "Hostel band hai."
+    # Only a Hindi override matches: no answer in the wrong language
+    assert matcher.match("is the hostel closed", "en") is None
+    result = matcher.match("library timings", "ta")
+    assert result["answer"] == "Library open till 8 PM." and result["language_detected"] == "ta"
+
+
+def test_newest_override_wins(db):
+    _add(db, "results", "Old notice.")
+    _add(db, "results", "New notice.")
+    matcher = OverrideMatcher()
+    matcher.refresh(db)
+    assert matcher.match("results", "en")["answer"] == "New notice."
+
+
+def test_refresh_picks_up_edits_and_deletes(db):
+    first = _add(db, "exam postponed", "Exams move to 5 May.")
+    matcher = OverrideMatcher()
+    assert matcher.refresh(db)
+    assert not matcher.refresh(db)  # unchanged
+
+    first.override_response = "Exams move to 9 May."
+    db.commit()
+    assert matcher.refresh(db)
+    assert matcher.match("exam postponed", "en")["answer"] == "Exams move to 9 May."
+
+    # A hard delete hidden by an insert (same row count) still drops the deleted row
+    db.delete(first)
+    _add(db, "library shut", "Library closed today.")
+    assert matcher.refresh(db)
+    assert len(matcher) == 1
+    assert matcher.match("exam postponed", "en") is None
+    assert matcher.match("is the library shut", "en")["answer"] == "Library closed today."
+
+
+def test_inactive_and_invalid_rows_are_skipped(db):
+    _add(db, "exam postponed", "Exams move to 5 May.", is_active=False)
+    _add(db, "fee(deadline", "Broken regex.")
+    matcher = OverrideMatcher()
+    matcher.refresh(db)
+    assert len(matcher) == 0
@@ -0,0 +1,33 @@
+from app.services import segments
+
+
+def test_layout_is_kept_verbatim():
+    text = "Fees:\n- Tuition is Rs. 45,000. Hostel extra.\n2) Apply online!"
+    pieces = segments.split(text)
+    assert pieces == [
+        ("Fees:", True), ("\n", False),
+        ("- ", False), ("Tuition is Rs. 45,000. Hostel extra.", True), ("\n", False),
+        ("2) ", False), ("Apply online!", True),
+    ]
+    assert segments.join(pieces, [None] * 3) == text
+
+
+def test_abbreviations_do_not_end_sentences():
+    pieces = segments.split("Meet Dr. Sharma in room 4. Bring your ID.", max_chars=10)
+    assert [piece for piece, translatable in pieces if translatable] == ["Meet Dr. Sharma in room 4.", "Bring your ID."]
+
+
+def test_sentences_are_grouped_up_to_max_chars():
+    text = "One. Two. Three."
+    assert [p for p, t in segments.split(text) if t] == [text]
+    assert [p for p, t in segments.split(text, max_chars=5) if t] == ["One.", "Two.", "Three."]
+
+
+def test_join_replaces_only_translated_pieces():
+    pieces = segments.split("## Hostel\n\n* Rooms: 2 beds.  Wi-Fi free.", max_chars=12)
+    translated = segments.join(pieces, ["Chhatravas", None, "Wi-Fi muft."])
+    assert translated == "## Chhatravas\n\n* Rooms: 2 beds.  Wi-Fi muft."
+
+
+def test_blank_text():
+    assert segments.join(segments.split("\n\n"), []) == "\n\n"
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app.services.singleflight import SingleFlight
+
+
+def _flight() -> SingleFlight:
+    flight = SingleFlight("test")
+    flight.enabled = True
+    return flight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = _flight()
+    calls = 0
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"answer": "42"}
+
+    async def main():
+        return await asyncio.gather(*(flight.do("q", upstream) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert calls == 1
+    assert all(result == {"answer": "42"} for result in results)
+    assert flight.stats()["collapsed"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_keys_are_forgotten_after_the_call():
+    flight = _flight()
+    calls = 0
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def main():
+        return await flight.do("q", upstream), await flight.do("q", upstream)
+
+    assert asyncio.run(main()) == (1, 2)
+
+
+def test_errors_reach_every_waiter():
+    flight = _flight()
+
+    async def upstream():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("q", upstream) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats()["errors"] == 1
+
+
+def test_cancelled_caller_leaves_the_call_to_the_others():
+    flight = _flight()
+
+    async def upstream():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("q", upstream))
+        second = asyncio.ensure_future(flight.do("q", upstream))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
+    assert flight.stats()["abandoned"] == 0
+
+
+def test_last_waiter_cancelling_cancels_the_call():
+    flight = _flight()
+    finished = False
+
+    async def upstream():
+        nonlocal finished
+        await asyncio.sleep(0.05)
+        finished = True
+
+    async def main():
+        waiter = asyncio.ensure_future(flight.do("q", upstream))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0.06)
+
+    asyncio.run(main())
+    assert not finished
+    assert flight.stats()["abandoned"] == 1
+    assert flight.stats()["in_flight"] == 0
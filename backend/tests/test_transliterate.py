@@ -0,0 +1,33 @@
+import pytest
+
+from app.services import transliterate
+
+
+@pytest.mark.parametrize("word, expected", [
+    ("कमल", "kamal"),        # final schwa dropped
+    ("मित्र", "mitra"),       # kept after a conjunct ending in र
+    ("समझना", "samajhna"),   # medial schwa dropped
+    ("करना", "karna"),
+    ("संपर्क", "sampark"),    # anusvara before a labial
+    ("में", "mein"),          # exception table
+    ("कॉलेज", "college"),
+])
+def test_romanize_word(word, expected):
+    assert transliterate.romanize_word(word) == expected
+
+
+def test_romanize_keeps_latin_text_numbers_and_punctuation():
+    assert transliterate.romanize("plain english") == "plain english"
+    assert transliterate.romanize("Fees ₹४५,००० है") == "Fees ₹45,000 hai"
+
+
+def test_sentences_start_with_a_capital():
+    assert transliterate.romanize("आपका एडमिशन कब है। करना") == "Aapka admission kab hai. Karna"
+
+
+def test_stream_holds_back_words_cut_between_deltas():
+    romanizer = transliterate.StreamRomanizer()
+    out = [romanizer.feed(delta) for delta in ("आपका एड", "मिशन कब", " है।")]
+    out.append(romanizer.flush())
+    assert out == ["Aapka ", "admission ", "kab hai.", ""]
+    assert "".join(out) == transliterate.romanize("आपका एडमिशन कब है।")
@@ -58,7 +58,7 @@ function App() {
     setTyping(true)
     
     try {
-      const response = await fetch(`${API_BASE}/ask`, {
+      const response = await fetch(`${API_BASE}/ask/stream`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ 
@@ -68,23 +68,60 @@ function App() {
         }),
       })
       
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         const errorText = await response.text()
         throw new Error(`HTTP ${response.status}: ${errorText}`)
       }
       
-      const data = await response.json()
-      setMessages((m) => [...m, { 
-        role: 'bot', 
-        text: data.answer, 
-        id: Date.now() + 1,
-        conversationId: data.conversation_id,
-        confidence: data.confidence 
-      }])
+      // Render the answer as it streams in: one bot bubble, grown delta by delta
+      const botId = Date.now() + 1
+      let started = false
+      const appendDelta = (delta) => {
+        if (!started) {
+          started = true
+          setTyping(false)
+          setMessages((m) => [...m, { role: 'bot', text: delta, id: botId }])
+          return
+        }
+        setMessages((m) => m.map((msg) => msg.id === botId ? { ...msg, text: msg.text + delta } : msg))
+      }
+      const handleEvent = (event, data) => {
+        if (event === 'meta') {
+          // Update session ID if new
+          if (data.session_id && data.session_id !== sessionId) {
+            setSessionId(data.session_id)
+          }
+        } else if (event === 'done') {
+          setMessages((m) => m.map((msg) => msg.id === botId ? {
+            ...msg,
+            conversationId: data.conversation_id,
+            confidence: data.confidence
+          } : msg))
+        } else if (data.delta) {
+          appendDelta(data.delta)
+        }
+      }
       
-      // Update session ID if new
-      if (data.session_id && data.session_id !== sessionId) {
-        setSessionId(data.session_id)
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      while (true) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        // SSE frames are separated by a blank line
+        let boundary
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const frame = buffer.slice(0, boundary)
+          buffer = buffer.slice(boundary + 2)
+          let event = 'message'
+          let payload = ''
+          for (const line of frame.split('\n')) {
+            if (line.startsWith('event:')) event = line.slice(6).trim()
+            else if (line.startsWith('data:')) payload += line.slice(5).trim()
+          }
+          if (payload) handleEvent(event, JSON.parse(payload))
+        }
       }
       
     } catch (error) {